@@ -0,0 +1,232 @@
+"""
+Per-round store of players' in-progress answers.
+
+Drafts are cheap to save (a single cache write, no scoring and no broadcasts)
+and are turned into PlayerAnswer rows for players who did not submit when the
+server closes the round at its deadline (see close_round).
+
+Saved drafts are also written to the AnswerDraft table in batches: each worker
+buffers the latest draft per player and round and upserts the whole buffer
+every ANSWER_DRAFT_FLUSH_SECONDS, so a player typing (or many players
+auto-saving at the end of a round) costs one query per batch instead of one
+per save. The database copy survives cache evictions and is visible to the
+worker that closes the round, whichever one that is.
+"""
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, transaction
+from .models import AnswerDraft, GameSession, RoomPlayer
+from .scheduler import round_scheduler
+
+DRAFT_KEY = 'answer_draft:{game_session_id}:{round_number}:{room_player_id}'
+FLUSH_TIMER_KEY = 'answer_drafts:flush'
+
+# (game_session_id, round_number, room_player_id) -> answers not yet in the database
+_pending_drafts = {}
+_pending_lock = threading.Lock()
+
+
+def clean_answers(answers, selected_types):
+    """
+    Keep only answers for the game session's categories, as stripped strings.
+
+    Args:
+        answers: Dictionary mapping game type keys to answers
+        selected_types: The game session's selected types
+    """
+    validated_answers = {}
+    for game_type, answer in answers.items():
+        if game_type not in selected_types:
+            continue
+        # Clean answer (handle None, empty strings, and non-strings)
+        if not answer or not isinstance(answer, str):
+            validated_answers[game_type] = ""
+        else:
+            # Store the answer as-is (we'll validate letter match during scoring)
+            validated_answers[game_type] = answer.strip()
+    return validated_answers
+
+
+def save_draft(game_session_id, round_number, room_player_id, answers):
+    """
+    Store a player's current answers for a round, replacing the previous draft.
+    The cache is written immediately, the database with the next batch.
+
+    Args:
+        game_session_id: The game session ID
+        round_number: The round the answers belong to
+        room_player_id: The player's RoomPlayer ID
+        answers: Cleaned answers (see clean_answers)
+    """
+    cache.set(
+        DRAFT_KEY.format(game_session_id=game_session_id, round_number=round_number, room_player_id=room_player_id),
+        answers,
+        timeout=settings.ANSWER_DRAFT_TIMEOUT
+    )
+    key = (game_session_id, round_number, room_player_id)
+    flush_seconds = settings.ANSWER_DRAFT_FLUSH_SECONDS
+    if flush_seconds <= 0:
+        _write_drafts({key: answers})
+        return
+    with _pending_lock:
+        first_pending = not _pending_drafts
+        _pending_drafts[key] = answers
+    if first_pending:
+        round_scheduler.schedule(FLUSH_TIMER_KEY, flush_seconds, flush_drafts_internal)
+
+
+def _upsert_drafts(drafts):
+    AnswerDraft.objects.bulk_create(
+        [
+            AnswerDraft(
+                game_session_id=game_session_id,
+                round_number=round_number,
+                player_id=room_player_id,
+                answers=answers
+            )
+            for (game_session_id, round_number, room_player_id), answers in drafts.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['game_session', 'player', 'round_number'],
+        update_fields=['answers', 'updated_at']
+    )
+
+
+def _write_drafts(drafts):
+    """
+    Upsert drafts into the AnswerDraft table in one query. If the batch fails
+    because a player or game session was deleted after its draft was saved,
+    the drafts of deleted rows are dropped and the rest written again.
+    
+    Args:
+        drafts: Dictionary mapping (game_session_id, round_number, room_player_id) to answers
+    
+    Returns:
+        Number of drafts written
+    """
+    try:
+        with transaction.atomic():
+            _upsert_drafts(drafts)
+        return len(drafts)
+    except IntegrityError:
+        existing_players = set(RoomPlayer.objects.filter(
+            id__in={room_player_id for _, _, room_player_id in drafts}
+        ).values_list('id', flat=True))
+        existing_sessions = set(GameSession.objects.filter(
+            id__in={game_session_id for game_session_id, _, _ in drafts}
+        ).values_list('id', flat=True))
+        drafts = {
+            key: answers for key, answers in drafts.items()
+            if key[0] in existing_sessions and key[2] in existing_players
+        }
+        if not drafts:
+            return 0
+        with transaction.atomic():
+            _upsert_drafts(drafts)
+        return len(drafts)
+
+
+def flush_drafts():
+    """
+    Write this worker's buffered drafts to the database. Returns the number of
+    drafts written. Drafts of deleted players or game sessions are dropped;
+    drafts that fail to write for other reasons stay buffered for the next flush.
+    """
+    round_scheduler.cancel(FLUSH_TIMER_KEY)
+    with _pending_lock:
+        drafts = dict(_pending_drafts)
+        _pending_drafts.clear()
+    if not drafts:
+        return 0
+    try:
+        written = _write_drafts(drafts)
+    except Exception:
+        with _pending_lock:
+            # Keep newer drafts saved while this batch was being written
+            for key, answers in drafts.items():
+                _pending_drafts.setdefault(key, answers)
+        raise
+    return written
+
+
+def discard_pending_drafts(game_session_id=None, room_player_id=None):
+    """
+    Drop this worker's buffered drafts of a deleted game session or player, so
+    they are never written (see api/signals.py).
+    
+    Args:
+        game_session_id: Optional ID of a deleted game session
+        room_player_id: Optional ID of a deleted RoomPlayer
+    """
+    with _pending_lock:
+        for key in list(_pending_drafts):
+            if key[0] == game_session_id or key[2] == room_player_id:
+                del _pending_drafts[key]
+
+
+def flush_drafts_internal():
+    """
+    Flush buffered drafts from the round scheduler's thread pool. Manages its
+    own database connection and never raises; failed drafts are retried with
+    the next batch.
+    """
+    try:
+        close_old_connections()
+        flush_drafts()
+    except Exception as e:
+        import traceback
+        print(f"Error writing answer drafts: {e}")
+        traceback.print_exc()
+        with _pending_lock:
+            has_pending = bool(_pending_drafts)
+        if has_pending:
+            round_scheduler.schedule(FLUSH_TIMER_KEY, settings.ANSWER_DRAFT_FLUSH_SECONDS, flush_drafts_internal)
+    finally:
+        close_old_connections()
+
+
+def get_drafts(game_session_id, round_number, room_player_ids):
+    """
+    Returns {room_player_id: answers} for the players that saved a draft.
+    Drafts missing from the cache are read from the database.
+
+    Args:
+        game_session_id: The game session ID
+        round_number: The round number
+        room_player_ids: Players to look up
+    """
+    keys = {
+        DRAFT_KEY.format(game_session_id=game_session_id, round_number=round_number, room_player_id=room_player_id): room_player_id
+        for room_player_id in room_player_ids
+    }
+    drafts = {keys[key]: answers for key, answers in cache.get_many(list(keys)).items()}
+    missing_player_ids = [room_player_id for room_player_id in room_player_ids if room_player_id not in drafts]
+    if missing_player_ids:
+        drafts.update(
+            AnswerDraft.objects.filter(
+                game_session_id=game_session_id,
+                round_number=round_number,
+                player_id__in=missing_player_ids
+            ).values_list('player_id', 'answers')
+        )
+    return drafts
+
+
+def clear_drafts(game_session_id, round_number, room_player_ids):
+    """
+    Delete the drafts of a round.
+
+    Args:
+        game_session_id: The game session ID
+        round_number: The round number
+        room_player_ids: Players whose drafts are deleted
+    """
+    cache.delete_many([
+        DRAFT_KEY.format(game_session_id=game_session_id, round_number=round_number, room_player_id=room_player_id)
+        for room_player_id in room_player_ids
+    ])
+    with _pending_lock:
+        for room_player_id in room_player_ids:
+            _pending_drafts.pop((game_session_id, round_number, room_player_id), None)
+    AnswerDraft.objects.filter(game_session_id=game_session_id, round_number=round_number).delete()
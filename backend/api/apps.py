@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Register signal handlers (room snapshot, player and submission counters, WebSocket user cache invalidation)
+        from . import signals  # noqa: F401
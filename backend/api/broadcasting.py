@@ -0,0 +1,263 @@
+"""
+Delivery of WebSocket broadcasts to room groups.
+
+Room updates for the same room requested within ROOM_BROADCAST_COALESCE_SECONDS
+are merged into a single serialized snapshot and group_send. Notifications that
+must be delivered individually (player submitted, game started, ...) are sent
+right away, after flushing any pending room update for that room, so clients
+always see events in the order they were requested.
+
+Events are handed to the BroadcastOutbox, which performs the channel layer I/O
+in the background, so HTTP requests never wait on group_send. The client
+frames (JSON and MessagePack) are encoded once per event before it is sent,
+so consumers only forward them (see api.wire_format).
+"""
+import asyncio
+import collections
+import threading
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections
+from .scheduler import round_scheduler
+from .wire_format import attach_frames
+
+# Number of locks serializing sends per room; rooms share them by hash, so the
+# coalescer holds a fixed set of locks however many rooms it has seen
+ROOM_LOCK_STRIPES = 64
+
+
+class BroadcastOutbox:
+    """
+    Fire-and-forget FIFO of channel layer events.
+
+    enqueue() returns immediately. Events are sent in order by a single drain
+    task, on the ASGI event loop when one is bound with bind_loop() (Daphne),
+    or on a short-lived daemon thread with its own event loop otherwise
+    (runserver over WSGI, management commands).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = collections.deque()
+        self._draining = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self._loop = None
+        self.stats = {'enqueued': 0, 'sent': 0, 'failed': 0}
+
+    def bind_loop(self, loop):
+        """
+        Drain the outbox on the given (running) event loop from now on.
+
+        Args:
+            loop: The ASGI server event loop
+        """
+        self._loop = loop
+
+    def enqueue(self, group, event):
+        """
+        Queue an event for group_send without waiting for it to be sent.
+
+        Args:
+            group: Channel layer group name
+            event: Event dict (must have a 'type')
+        """
+        with self._lock:
+            self._queue.append((group, event))
+            self.stats['enqueued'] += 1
+            self._idle.clear()
+            if self._draining:
+                return
+            self._draining = True
+
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(loop.create_task, self._drain())
+        else:
+            thread = threading.Thread(target=asyncio.run, args=(self._drain(),), daemon=True)
+            thread.start()
+
+    def wait_idle(self, timeout=None):
+        """
+        Block until every queued event has been sent. Returns False on timeout.
+
+        Args:
+            timeout: Maximum number of seconds to wait (None waits forever)
+        """
+        return self._idle.wait(timeout)
+
+    async def _drain(self):
+        channel_layer = get_channel_layer()
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._draining = False
+                    self._idle.set()
+                    return
+                group, event = self._queue.popleft()
+            if channel_layer is None:
+                continue
+            try:
+                await channel_layer.group_send(group, event)
+                self.stats['sent'] += 1
+            except Exception as e:
+                # Log error and keep draining the remaining events
+                import traceback
+                self.stats['failed'] += 1
+                print(f"Error sending {event.get('type')} to {group}: {e}")
+                traceback.print_exc()
+
+
+broadcast_outbox = BroadcastOutbox()
+
+
+def deliver(group, event):
+    """
+    Send an event to a channel layer group from sync code.
+
+    Goes through the outbox unless ROOM_BROADCAST_OUTBOX is disabled, in which
+    case the event is sent synchronously.
+
+    Args:
+        group: Channel layer group name
+        event: Event dict (must have a 'type')
+    """
+    if settings.WS_PREENCODE_FRAMES:
+        event = attach_frames(event)
+    if getattr(settings, 'ROOM_BROADCAST_OUTBOX', True):
+        broadcast_outbox.enqueue(group, event)
+        return
+    channel_layer = get_channel_layer()
+    if channel_layer:
+        async_to_sync(channel_layer.group_send)(group, event)
+
+
+async def adeliver(group, event):
+    """
+    Send an event to a channel layer group from async code (no thread hop).
+
+    Args:
+        group: Channel layer group name
+        event: Event dict (must have a 'type')
+    """
+    if settings.WS_PREENCODE_FRAMES:
+        event = attach_frames(event)
+    channel_layer = get_channel_layer()
+    if channel_layer:
+        await channel_layer.group_send(group, event)
+
+
+class RoomBroadcastCoalescer:
+    """
+    Debounces room updates per room and keeps them ordered with notifications.
+
+    Args:
+        send_room_update: Callable taking a room ID (and optionally the room
+            object) that builds and sends the room update. It is called at
+            most once per window per room; deferred calls only get the ID so
+            the room is reloaded at send time, from the round scheduler's
+            thread pool.
+        window: Coalescing window in seconds, or None to read
+            settings.ROOM_BROADCAST_COALESCE_SECONDS on every call
+    """
+
+    def __init__(self, send_room_update, window=None):
+        self.send_room_update = send_room_update
+        self.window = window
+        self._lock = threading.Lock()
+        self._room_locks = tuple(threading.Lock() for _ in range(ROOM_LOCK_STRIPES))
+        self._pending = {}
+        self.stats = {'requested': 0, 'sent': 0, 'merged': 0, 'notifications': 0}
+
+    def get_window(self):
+        if self.window is not None:
+            return self.window
+        return getattr(settings, 'ROOM_BROADCAST_COALESCE_SECONDS', 0)
+
+    def _timer_key(self, room_id):
+        return ('room_update', id(self), room_id)
+
+    def _room_lock(self, room_id):
+        return self._room_locks[hash(room_id) % ROOM_LOCK_STRIPES]
+
+    def room_update(self, room_id, room=None):
+        """
+        Request a room update broadcast. Updates requested while one is already
+        pending for the room are merged into it.
+
+        Args:
+            room_id: The room ID
+            room: Optional room object, used only when the update is sent right away
+        """
+        room_id = str(room_id)
+        window = self.get_window()
+        with self._lock:
+            self.stats['requested'] += 1
+            if room_id in self._pending:
+                self.stats['merged'] += 1
+                return
+            if window > 0:
+                self._pending[room_id] = True
+                round_scheduler.schedule(self._timer_key(room_id), window, self._flush_deferred, room_id)
+                return
+        # Coalescing disabled: send right away
+        with self._room_lock(room_id):
+            self._send(room_id, room)
+
+    def flush(self, room_id):
+        """
+        Send the pending room update for a room now (no-op if none is pending).
+        """
+        room_id = str(room_id)
+        with self._room_lock(room_id):
+            with self._lock:
+                pending = self._pending.pop(room_id, None)
+            if pending is None:
+                return
+            round_scheduler.cancel(self._timer_key(room_id))
+            self._send(room_id)
+
+    def _flush_deferred(self, room_id):
+        # Runs in the scheduler's thread pool, which has no request cycle to
+        # close its database connection
+        try:
+            close_old_connections()
+            self.flush(room_id)
+        finally:
+            close_old_connections()
+
+    def flush_all(self):
+        """Send every pending room update now."""
+        with self._lock:
+            room_ids = list(self._pending)
+        for room_id in room_ids:
+            self.flush(room_id)
+
+    def notify(self, room_id, event):
+        """
+        Send a notification event to the room group, after any pending room update.
+        """
+        room_id = str(room_id)
+        with self._room_lock(room_id):
+            with self._lock:
+                pending = self._pending.pop(room_id, None)
+                self.stats['notifications'] += 1
+            if pending is not None:
+                round_scheduler.cancel(self._timer_key(room_id))
+                self._send(room_id)
+            deliver(f'room_{room_id}', event)
+
+    def _send(self, room_id, room=None):
+        with self._lock:
+            self.stats['sent'] += 1
+        try:
+            if room is None:
+                self.send_room_update(room_id)
+            else:
+                self.send_room_update(room_id, room)
+        except Exception as e:
+            # Log error but don't crash the caller (or the scheduler's worker)
+            import traceback
+            print(f"Error broadcasting room update for room {room_id}: {e}")
+            traceback.print_exc()
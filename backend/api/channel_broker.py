@@ -0,0 +1,254 @@
+"""
+Local channel broker for api.channel_layer.BrokerChannelLayer.
+
+A broker is a small asyncio server on a Unix domain socket (run it with
+`python manage.py run_channel_broker`). Worker processes connect to it and
+exchange MessagePack frames; the broker keeps the group-membership index
+(which worker processes have channels in which group) and routes frames
+between workers. It never looks inside messages and never buffers them for
+long: frames for a worker whose socket is backed up by more than
+MAX_PEER_BUFFER_BYTES are dropped.
+
+Frames (MessagePack arrays), worker -> broker:
+    ['hello', worker_id]            identify the connection (first frame)
+    ['sub', group] / ['unsub', group]
+    ['group', group, payload]       forwarded to every other member worker
+    ['send', channel, payload]      forwarded to the worker owning channel
+    ['add', group, channel] / ['discard', group, channel]
+                                    forwarded to the worker owning channel
+    ['ping', token]                 answered with ['pong', token]
+
+payload is the message, already MessagePack-encoded by the sending worker, so
+a group_send costs the broker one small frame per member worker.
+"""
+import asyncio
+import logging
+import os
+import stat
+import zlib
+import msgpack
+
+logger = logging.getLogger(__name__)
+
+# Largest frame accepted on a broker connection
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+# Unsent bytes after which frames for a peer are dropped instead of buffered
+MAX_PEER_BUFFER_BYTES = 8 * 1024 * 1024
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def pack_frame(frame):
+    """
+    Encode a broker frame.
+
+    Args:
+        frame: Frame list
+    """
+    return msgpack.packb(frame, use_bin_type=True)
+
+
+async def read_frames(reader):
+    """
+    Yields the frames read from a broker connection until it is closed.
+
+    Args:
+        reader: asyncio StreamReader
+
+    Raises:
+        msgpack.UnpackException: If a frame is malformed or larger than MAX_FRAME_BYTES
+    """
+    unpacker = msgpack.Unpacker(raw=False, max_buffer_size=MAX_FRAME_BYTES)
+    while True:
+        data = await reader.read(READ_CHUNK_BYTES)
+        if not data:
+            return
+        unpacker.feed(data)
+        for frame in unpacker:
+            yield frame
+
+
+def shard_for(key, shards):
+    """
+    Returns the index of the broker responsible for a group name or worker ID.
+
+    Args:
+        key: Group name or worker ID
+        shards: Number of brokers
+    """
+    return zlib.crc32(key.encode('utf-8')) % shards
+
+
+def channel_worker(channel):
+    """
+    Returns the worker ID embedded in a process-specific channel name
+    ('<prefix>.<worker_id>!<suffix>'), or None for other channels.
+
+    Args:
+        channel: Channel name
+    """
+    name, specific, _ = channel.partition('!')
+    if not specific:
+        return None
+    return name.rsplit('.', 1)[-1]
+
+
+class _Peer:
+    """
+    One worker connection. Frames sent to it while the broker handles a read
+    are written with a single write at the end of the event loop iteration.
+    """
+
+    def __init__(self, writer, stats):
+        self.writer = writer
+        self.stats = stats
+        self.worker = None
+        self.pending = []
+
+    def send(self, frame):
+        transport = self.writer.transport
+        if transport.is_closing() or transport.get_write_buffer_size() > MAX_PEER_BUFFER_BYTES:
+            self.stats['dropped'] += 1
+            return
+        if not self.pending:
+            asyncio.get_running_loop().call_soon(self.flush)
+        self.pending.append(frame)
+
+    def flush(self):
+        if self.pending and not self.writer.transport.is_closing():
+            self.writer.write(b''.join(self.pending))
+        self.pending = []
+
+
+class ChannelBroker:
+    """
+    Routes frames between the worker processes of a BrokerChannelLayer.
+
+    Args:
+        path: Unix domain socket path to listen on
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.server = None
+        self.groups = {}
+        self.worker_groups = {}
+        self.peers = {}
+        self._handlers = set()
+        self.stats = {
+            'connections': 0,
+            'frames': 0,
+            'forwarded': 0,
+            'dropped': 0,
+        }
+
+    async def start(self):
+        """Start listening, replacing a stale socket file left by a previous broker."""
+        try:
+            if stat.S_ISSOCK(os.stat(self.path).st_mode):
+                os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self.server = await asyncio.start_unix_server(self._serve, path=self.path)
+
+    async def serve_forever(self):
+        """Start the broker and serve until cancelled."""
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """Stop listening and disconnect every worker."""
+        if self.server is None:
+            return
+        self.server.close()
+        for peers in list(self.peers.values()):
+            for peer in peers:
+                peer.writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self.server.wait_closed()
+        self.server = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def _serve(self, reader, writer):
+        peer = _Peer(writer, self.stats)
+        self.stats['connections'] += 1
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            async for frame in read_frames(reader):
+                self.stats['frames'] += 1
+                if not self._handle(peer, frame):
+                    logger.warning("Closing channel broker connection after invalid frame %r", frame[:1])
+                    break
+        except (OSError, ValueError, msgpack.UnpackException) as e:
+            logger.warning("Channel broker connection failed: %s", e)
+        finally:
+            self._disconnect(peer)
+            self._handlers.discard(handler)
+            writer.close()
+
+    def _handle(self, peer, frame):
+        """Handles one frame. Returns False if the frame is invalid."""
+        if not isinstance(frame, list) or not frame:
+            return False
+        op = frame[0]
+        if op == 'hello' and peer.worker is None and len(frame) == 2:
+            peer.worker = frame[1]
+            self.peers.setdefault(peer.worker, []).append(peer)
+        elif peer.worker is None:
+            return False
+        elif op == 'group' and len(frame) == 3:
+            data = pack_frame(frame)
+            for worker in self.groups.get(frame[1], ()):
+                if worker != peer.worker:
+                    self._send_to_worker(worker, data)
+        elif op in ('send', 'add', 'discard') and len(frame) == 3:
+            worker = channel_worker(frame[2] if op != 'send' else frame[1])
+            if worker is not None:
+                self._send_to_worker(worker, pack_frame(frame))
+        elif op == 'sub' and len(frame) == 2:
+            self.groups.setdefault(frame[1], set()).add(peer.worker)
+            self.worker_groups.setdefault(peer.worker, set()).add(frame[1])
+        elif op == 'unsub' and len(frame) == 2:
+            self._unsubscribe(peer.worker, frame[1])
+        elif op == 'ping' and len(frame) == 2:
+            peer.send(pack_frame(['pong', frame[1]]))
+        else:
+            return False
+        return True
+
+    def _send_to_worker(self, worker, data):
+        peers = self.peers.get(worker)
+        if not peers:
+            self.stats['dropped'] += 1
+            return
+        peers[-1].send(data)
+        self.stats['forwarded'] += 1
+
+    def _unsubscribe(self, worker, group):
+        members = self.groups.get(group)
+        if members is not None:
+            members.discard(worker)
+            if not members:
+                del self.groups[group]
+        groups = self.worker_groups.get(worker)
+        if groups is not None:
+            groups.discard(group)
+
+    def _disconnect(self, peer):
+        """Forgets a connection, and the groups of its worker if it was the last one."""
+        peers = self.peers.get(peer.worker)
+        if peers is None:
+            return
+        peers.remove(peer)
+        if peers:
+            return
+        del self.peers[peer.worker]
+        for group in self.worker_groups.pop(peer.worker, set()):
+            self._unsubscribe(peer.worker, group)
@@ -0,0 +1,405 @@
+"""
+Channel layer that shares groups between worker processes through local
+brokers (api.channel_broker) instead of Redis.
+
+Every worker process owns the channels it creates: their messages wait in
+bounded per-channel queues in that process, and the process keeps the index
+of which of its channels are in which group. A broker only knows which
+processes have members in a group, so a group_send is one frame to the broker
+plus one frame per other member process, however large the group; each
+process then fans the message out to its own channels. Groups (and the
+process-specific channels of each worker) are sharded over the configured
+broker sockets by a hash of their name.
+
+The broker connections are served by a background event loop thread, so the
+layer can be used from any event loop (the ASGI server, the broadcast outbox
+thread, async_to_sync calls). Frames posted during one loop iteration go out
+in a single write. While a broker is unreachable its frames are kept up to
+MAX_PENDING_FRAMES and the connection is retried every RECONNECT_SECONDS.
+
+Channels without a '!' (not process-specific) are local to the process.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+import logging
+import threading
+import time
+import uuid
+import msgpack
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+from api.channel_broker import (
+    MAX_PEER_BUFFER_BYTES, channel_worker, pack_frame, read_frames, shard_for
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attempts to (re)connect to a broker
+RECONNECT_SECONDS = 1.0
+
+# Frames kept per broker while it is unreachable or backed up (oldest are dropped)
+MAX_PENDING_FRAMES = 10000
+
+
+def _wake(waiters):
+    for waiter in waiters:
+        if not waiter.done():
+            waiter.set_result(None)
+
+
+class _ChannelQueue:
+    """Messages of one local channel, as (expires, message) pairs, and the receive() waiting for them."""
+
+    __slots__ = ('messages', 'capacity', 'waiter')
+
+    def __init__(self, capacity):
+        self.messages = collections.deque()
+        self.capacity = capacity
+        self.waiter = None
+
+
+class BrokerChannelLayer(BaseChannelLayer):
+    """
+    Channel layer for several worker processes on one host, without Redis.
+
+    Args:
+        sockets: Unix socket paths of the brokers (one per shard, in the same
+            order in every worker)
+        expiry: Seconds a message waits in a channel queue before it is dropped
+        group_expiry: Seconds after which a group membership is forgotten
+        capacity: Messages per channel queue; group messages to a full queue
+            are dropped, send() to a full local queue raises ChannelFull
+        channel_capacity: Per-channel capacity overrides ({glob or regex: capacity})
+    """
+
+    extensions = ['groups', 'flush']
+
+    def __init__(self, sockets, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.channel_capacity = self.compile_capacities(self.channel_capacity)
+        if not sockets:
+            raise ValueError("BrokerChannelLayer needs at least one broker socket")
+        self.sockets = list(sockets)
+        self.group_expiry = group_expiry
+        self.worker_id = uuid.uuid4().hex[:16]
+        self._lock = threading.RLock()
+        self._channels = {}
+        self._groups = {}
+        self._outbox = [collections.deque(maxlen=MAX_PENDING_FRAMES) for _ in self.sockets]
+        self._writers = [None] * len(self.sockets)
+        self._flush_scheduled = False
+        self._pings = {}
+        self._ping_ids = itertools.count()
+        self._loop = None
+        self._thread = None
+        self._closed = False
+        self.stats = {
+            'delivered': 0,
+            'dropped_full': 0,
+            'dropped_pending': 0,
+            'expired': 0,
+        }
+
+    # Channel layer API
+
+    async def new_channel(self, prefix='specific'):
+        """Returns a new process-specific channel name owned by this worker."""
+        self._start()
+        channel = f'{prefix}.{self.worker_id}!{uuid.uuid4().hex}'
+        with self._lock:
+            self._channels[channel] = _ChannelQueue(self.get_capacity(channel))
+        return channel
+
+    async def send(self, channel, message):
+        """
+        Send a message to a channel, in this process or through the broker.
+
+        Raises:
+            ChannelFull: If the channel is local and its queue is full
+        """
+        assert isinstance(message, dict), "message is not a dict"
+        self.valid_channel_name(channel)
+        payload = msgpack.packb(message, use_bin_type=True)
+        worker = channel_worker(channel)
+        if worker is not None and worker != self.worker_id:
+            self._start()
+            self._post(shard_for(worker, len(self.sockets)), ['send', channel, payload])
+            return
+        with self._lock:
+            queue = self._channels.get(channel)
+            if queue is None and worker is None:
+                queue = self._channels[channel] = _ChannelQueue(self.get_capacity(channel))
+            if queue is not None and len(queue.messages) >= queue.capacity:
+                raise ChannelFull(channel)
+        self._deliver([channel], payload)
+
+    async def receive(self, channel):
+        """Receive the first message that arrives on a local channel."""
+        self.valid_channel_name(channel)
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                queue = self._channels.get(channel)
+                if queue is None:
+                    queue = self._channels[channel] = _ChannelQueue(self.get_capacity(channel))
+                now = time.monotonic()
+                while queue.messages:
+                    expires, message = queue.messages.popleft()
+                    if expires > now:
+                        return message
+                    self.stats['expired'] += 1
+                waiter = queue.waiter = loop.create_future()
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if queue.waiter is waiter:
+                        queue.waiter = None
+                    if not queue.messages and self._channels.get(channel) is queue:
+                        del self._channels[channel]
+                raise
+
+    async def group_add(self, group, channel):
+        """Add a channel to a group."""
+        self.valid_group_name(group)
+        self.valid_channel_name(channel)
+        self._start()
+        worker = channel_worker(channel)
+        if worker is not None and worker != self.worker_id:
+            self._post(shard_for(worker, len(self.sockets)), ['add', group, channel])
+        else:
+            self._add_member(group, channel)
+
+    async def group_discard(self, group, channel):
+        """Remove a channel from a group."""
+        self.valid_group_name(group)
+        self.valid_channel_name(channel)
+        self._start()
+        worker = channel_worker(channel)
+        if worker is not None and worker != self.worker_id:
+            self._post(shard_for(worker, len(self.sockets)), ['discard', group, channel])
+        else:
+            self._discard_member(group, channel)
+
+    async def group_send(self, group, message):
+        """
+        Send a message to every channel of a group: one frame to the group's
+        broker for the other workers, and a direct fan-out to the members in
+        this process. Members whose queue is full miss the message.
+        """
+        assert isinstance(message, dict), "message is not a dict"
+        self.valid_group_name(group)
+        self._start()
+        payload = msgpack.packb(message, use_bin_type=True)
+        self._post(shard_for(group, len(self.sockets)), ['group', group, payload])
+        with self._lock:
+            channels = self._live_members(group)
+        if channels:
+            self._deliver(channels, payload)
+
+    async def flush(self):
+        """Drop every local queue and group membership."""
+        with self._lock:
+            groups = list(self._groups)
+            self._groups.clear()
+            self._channels.clear()
+            for group in groups:
+                self._post(shard_for(group, len(self.sockets)), ['unsub', group])
+
+    # Extras
+
+    async def sync(self):
+        """Wait until every broker has handled the frames this process posted so far."""
+        self._start()
+        futures = []
+        with self._lock:
+            for shard in range(len(self.sockets)):
+                token = next(self._ping_ids)
+                futures.append(self._pings.setdefault(token, concurrent.futures.Future()))
+                self._post(shard, ['ping', token])
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+
+    def get_stats(self):
+        """Returns a copy of the layer's counters."""
+        return dict(self.stats)
+
+    def close(self):
+        """Disconnect from the brokers and stop the background loop thread."""
+        with self._lock:
+            self._closed = True
+            loop, thread = self._loop, self._thread
+        if loop is None:
+            return
+
+        def stop():
+            for writer in self._writers:
+                if writer is not None:
+                    writer.close()
+            loop.stop()
+
+        loop.call_soon_threadsafe(stop)
+        thread.join()
+        loop.close()
+
+    # Local groups and queues
+
+    def _add_member(self, group, channel):
+        with self._lock:
+            members = self._groups.setdefault(group, {})
+            if not members:
+                self._post(shard_for(group, len(self.sockets)), ['sub', group])
+            members[channel] = time.monotonic()
+
+    def _discard_member(self, group, channel):
+        with self._lock:
+            members = self._groups.get(group)
+            if members is None:
+                return
+            members.pop(channel, None)
+            if not members:
+                del self._groups[group]
+                self._post(shard_for(group, len(self.sockets)), ['unsub', group])
+
+    def _live_members(self, group):
+        """Returns the local channels of a group, forgetting expired memberships."""
+        members = self._groups.get(group)
+        if not members:
+            return []
+        cutoff = time.monotonic() - self.group_expiry
+        expired = [channel for channel, added in members.items() if added < cutoff]
+        for channel in expired:
+            self._discard_member(group, channel)
+        return list(self._groups.get(group, ()))
+
+    def _deliver(self, channels, payload):
+        """
+        Queue a message (MessagePack payload) on local channels and wake their
+        receivers; each channel gets its own shallow copy of the message.
+        """
+        message = msgpack.unpackb(payload, raw=False)
+        expires = time.monotonic() + self.expiry
+        wakeups = {}
+        with self._lock:
+            for channel in channels:
+                queue = self._channels.get(channel)
+                if queue is None:
+                    continue
+                if len(queue.messages) >= queue.capacity:
+                    self.stats['dropped_full'] += 1
+                    continue
+                queue.messages.append((expires, dict(message)))
+                self.stats['delivered'] += 1
+                if queue.waiter is not None:
+                    wakeups.setdefault(queue.waiter.get_loop(), []).append(queue.waiter)
+                    queue.waiter = None
+        for loop, waiters in wakeups.items():
+            try:
+                loop.call_soon_threadsafe(_wake, waiters)
+            except RuntimeError:
+                # The receiving loop has been closed
+                pass
+
+    # Broker connections (background loop)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None or self._closed:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name='channel-layer', daemon=True)
+            self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        tasks = [self._loop.create_task(self._maintain_connection(shard)) for shard in range(len(self.sockets))]
+        try:
+            self._loop.run_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+    async def _maintain_connection(self, shard):
+        path = self.sockets[shard]
+        while not self._closed:
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+            except OSError as e:
+                logger.warning("Channel broker %s unavailable: %s", path, e)
+                await asyncio.sleep(RECONNECT_SECONDS)
+                continue
+            writer.write(pack_frame(['hello', self.worker_id]))
+            with self._lock:
+                for group in self._groups:
+                    if shard_for(group, len(self.sockets)) == shard:
+                        writer.write(pack_frame(['sub', group]))
+                self._writers[shard] = writer
+            self._flush_outbox()
+            try:
+                async for frame in read_frames(reader):
+                    self._handle_frame(frame)
+            except (OSError, ValueError, msgpack.UnpackException) as e:
+                logger.warning("Channel broker %s connection failed: %s", path, e)
+            finally:
+                with self._lock:
+                    self._writers[shard] = None
+                writer.close()
+            if not self._closed:
+                logger.warning("Lost connection to channel broker %s, reconnecting", path)
+                await asyncio.sleep(RECONNECT_SECONDS)
+
+    def _post(self, shard, frame):
+        """Queue a frame for a broker; may be called from any thread."""
+        with self._lock:
+            pending = self._outbox[shard]
+            if len(pending) == pending.maxlen:
+                self.stats['dropped_pending'] += 1
+            pending.append(pack_frame(frame))
+            if self._flush_scheduled or self._loop is None:
+                return
+            self._flush_scheduled = True
+            loop = self._loop
+        try:
+            loop.call_soon_threadsafe(self._flush_outbox)
+        except RuntimeError:
+            # The layer has been closed
+            pass
+
+    def _flush_outbox(self):
+        """Writes the queued frames of every connected broker, one write per broker."""
+        retry = False
+        with self._lock:
+            self._flush_scheduled = False
+            for shard, pending in enumerate(self._outbox):
+                writer = self._writers[shard]
+                if writer is None or not pending:
+                    continue
+                if writer.transport.get_write_buffer_size() > MAX_PEER_BUFFER_BYTES:
+                    retry = True
+                    continue
+                writer.write(b''.join(pending))
+                pending.clear()
+        if retry:
+            self._loop.call_later(0.01, self._flush_outbox)
+
+    def _handle_frame(self, frame):
+        op = frame[0]
+        if op == 'group':
+            with self._lock:
+                channels = self._live_members(frame[1])
+            if channels:
+                self._deliver(channels, frame[2])
+        elif op == 'send':
+            self._deliver([frame[1]], frame[2])
+        elif op == 'add':
+            self._add_member(frame[1], frame[2])
+        elif op == 'discard':
+            self._discard_member(frame[1], frame[2])
+        elif op == 'pong':
+            with self._lock:
+                future = self._pings.pop(frame[1], None)
+            if future is not None:
+                future.set_result(None)
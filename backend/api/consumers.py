@@ -1,13 +1,103 @@
+import asyncio
 import json
+import threading
+from collections import deque
+from django.conf import settings
+from django.db.models import Exists
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.auth.models import User
-from rest_framework_simplejwt.tokens import UntypedToken
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from jwt import decode as jwt_decode
-from django.conf import settings
-from .models import Room, RoomPlayer
-from .serializers.room_serializer import RoomSerializer, RoomPlayerSerializer
+from .models import Room, RoomPlayer, GameSession
+from .room_cache import get_room_snapshot
+from .utils import is_round_expired
+from .rate_limit import TokenBucket
+from .wire_format import (
+    JSON_FORMAT, negotiate, base_format, finish_frame, encode_frame, decode_frame, get_frame,
+    use_wire_format, release_wire_format
+)
+from .answer_drafts import clean_answers, save_draft
+from .token_auth import get_user_for_token
+from .serializers.player_answer_serializer import SubmitAnswerSerializer
+
+# Client -> server message types; anything else is counted as 'unknown'
+INBOUND_TYPES = ('player_joined', 'player_left', 'player_removed', 'resync', 'draft_answers', 'ack')
+
+_inbound_lock = threading.Lock()
+_inbound_stats = {}
+
+
+def _count_inbound(stat):
+    with _inbound_lock:
+        _inbound_stats[stat] = _inbound_stats.get(stat, 0) + 1
+
+
+def get_inbound_stats():
+    """
+    Returns a copy of this process's inbound WebSocket message counters: one per
+    message type, plus 'unknown', 'invalid' (not a JSON object) and
+    'rate_limited' (dropped by the per-connection limit).
+    """
+    with _inbound_lock:
+        return dict(_inbound_stats)
+
+
+def reset_inbound_stats():
+    """Resets this process's inbound WebSocket message counters."""
+    with _inbound_lock:
+        _inbound_stats.clear()
+
+
+# Close code for sockets evicted for falling behind: the client reconnects and
+# starts again from the full room_update sent on connect
+RESYNC_CLOSE_CODE = 4008
+
+# Close code for sockets of players no longer in the room (removed, left, room
+# deleted): the client must not reconnect
+MEMBERSHIP_CLOSE_CODE = 4003
+NOT_A_MEMBER = 'You are not a member of this room.'
+
+# Kinds of queued room state frames (see RoomConsumer.queue_frame)
+ROOM_UPDATE = 'room_update'
+ROOM_PATCH = 'room_patch'
+
+_outbound_lock = threading.Lock()
+_outbound_stats = {
+    'queued': 0, 'sent': 0, 'collapsed': 0, 'discarded': 0, 'evicted': 0, 'stalled': 0, 'depth': 0, 'max_depth': 0,
+}
+
+
+def _count_outbound(stat, count=1):
+    with _outbound_lock:
+        _outbound_stats[stat] += count
+        if stat == 'queued':
+            _outbound_stats['depth'] += count
+        elif stat in ('sent', 'collapsed', 'discarded'):
+            _outbound_stats['depth'] -= count
+
+
+def _record_depth(depth):
+    with _outbound_lock:
+        _outbound_stats['max_depth'] = max(_outbound_stats['max_depth'], depth)
+
+
+def get_outbound_stats():
+    """
+    Returns a copy of this process's outbound WebSocket frame metrics: 'queued',
+    'sent', 'collapsed' (room state frames superseded before being sent),
+    'discarded' (frames of closed sockets), 'evicted' (sockets closed for
+    falling behind), 'stalled' (times a writer waited for a client ack),
+    'depth' (frames waiting now, all sockets together) and 'max_depth'
+    (longest queue of a single socket).
+    """
+    with _outbound_lock:
+        return dict(_outbound_stats)
+
+
+def reset_outbound_stats():
+    """Resets this process's outbound WebSocket counters (not the current depth)."""
+    with _outbound_lock:
+        for stat in _outbound_stats:
+            if stat != 'depth':
+                _outbound_stats[stat] = 0
 
 
 class RoomConsumer(AsyncWebsocketConsumer):
@@ -15,154 +105,385 @@ class RoomConsumer(AsyncWebsocketConsumer):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.room_group_name = f'room_{self.room_id}'
         self.channel_name = self.channel_name
+        self.inbound_limiter = TokenBucket(settings.WS_INBOUND_RATE, settings.WS_INBOUND_BURST)
+        # MessagePack or compressed JSON if the client offers the subprotocol, JSON text otherwise
+        self.wire_format = negotiate(self.scope.get('subprotocols', []))
+        # Frames go out through a per-socket queue and writer task, so a slow
+        # client delays only its own socket, never the channel layer. Clients
+        # that ack room versions get at most WS_MAX_UNACKED_FRAMES room state
+        # frames ahead of what they applied; the rest waits in the queue
+        self.outbox = deque()
+        self.outbox_ready = asyncio.Event()
+        self.unacked_versions = deque()
+        self.ack_ready = asyncio.Event()
+        self.flow_control = False
+        self.outbox_writer = None
+        self.evicted = False
+        self.closing_code = None
+        self.wire_format_used = False
         
-        try:
-            user = await self.get_user_from_token()
-            if not user:
-                await self.close()
-                return
-            self.user = user
-        except Exception:
-            await self.close()
-            return
-        
-        room = await self.get_room()
-        if not room:
-            await self.close()
-            return
-        
-        is_in_room = await self.is_user_in_room(room, user)
-        if not is_in_room:
+        # Authenticate, check membership and load the room snapshot in one hop
+        connection_state = await self.load_connection_state()
+        if connection_state is None:
             await self.close()
             return
+        self.user, self.room_player_id, version, snapshot = connection_state
         
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
         
-        await self.accept()
-        await self.send_room_update()
+        await self.accept(subprotocol=None if self.wire_format == JSON_FORMAT else self.wire_format)
+        # Broadcasts from this process pre-encode the formats of its open sockets
+        use_wire_format(self.wire_format)
+        self.wire_format_used = True
+        self.outbox_writer = asyncio.ensure_future(self.drain_outbox())
+        # The initial document goes to this socket only; joining the room is
+        # broadcast by the REST views, not by connecting
+        await self.send_snapshot(version, snapshot)
     
     async def disconnect(self, close_code):
+        self.stop_outbox()
+        if getattr(self, 'wire_format_used', False):
+            release_wire_format(self.wire_format)
+            self.wire_format_used = False
         if hasattr(self, 'room_group_name'):
             await self.channel_layer.group_discard(
                 self.room_group_name,
                 self.channel_name
             )
     
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         try:
-            data = json.loads(text_data)
-            message_type = data.get('type')
-            
-            if message_type == 'player_joined':
-                await self.handle_player_joined()
-            elif message_type == 'player_left':
-                await self.handle_player_left()
-            elif message_type == 'player_removed':
-                await self.handle_player_removed(data.get('player_id'))
-        except json.JSONDecodeError:
-            pass
-    
-    async def handle_player_joined(self):
-        await self.send_room_update()
-    
-    async def handle_player_left(self):
-        await self.send_room_update()
-    
-    async def handle_player_removed(self, player_id):
-        await self.send_room_update()
+            data = decode_frame(text_data, bytes_data, self.wire_format)
+        except ValueError:
+            _count_inbound('invalid')
+            return
+        if not isinstance(data, dict):
+            _count_inbound('invalid')
+            return
+        message_type = data.get('type')
+        if message_type == 'ack':
+            # Acks are bounded by the frames sent and never rate limited
+            _count_inbound('ack')
+            self.handle_ack(data.get('version'))
+            return
+        if not self.inbound_limiter.allow():
+            _count_inbound('rate_limited')
+            return
+        _count_inbound(message_type if message_type in INBOUND_TYPES else 'unknown')
+        
+        if message_type in ('player_joined', 'player_left', 'player_removed', 'resync'):
+            # Membership changes are broadcast by the REST views; clients that
+            # still announce them only get their own view refreshed
+            await self.handle_resync()
+        elif message_type == 'draft_answers':
+            await self.handle_draft_answers(data.get('answers'), data.get('id'))
+    
+    async def handle_resync(self):
+        """
+        Send the full room document to this socket only (the client missed a room_patch version).
+        """
+        version, snapshot = await self.get_snapshot()
+        if snapshot is not None:
+            await self.send_snapshot(version, snapshot)
+    
+    def handle_ack(self, version):
+        """
+        The client applied the room state up to version: release the room
+        state frames it acknowledges. The first ack turns on flow control
+        for this socket.
+        """
+        if not isinstance(version, int) or isinstance(version, bool):
+            return
+        self.flow_control = True
+        while self.unacked_versions and self.unacked_versions[0] <= version:
+            self.unacked_versions.popleft()
+        self.ack_ready.set()
+    
+    async def handle_draft_answers(self, answers, draft_id=None):
+        """
+        Save this player's in-progress answers for the current round (see
+        api.answer_drafts) and acknowledge to this socket only.
+        
+        Args:
+            answers: The answers dict sent by the client
+            draft_id: Optional client-chosen ID, echoed in the reply so the
+                client can tell which draft it acknowledges
+        """
+        round_number, error = await self.save_answer_draft(answers)
+        if error:
+            reply = {
+                'type': 'draft_error',
+                'error': error
+            }
+        else:
+            reply = {
+                'type': 'draft_saved',
+                'round_number': round_number
+            }
+        if draft_id is not None:
+            reply['id'] = draft_id
+        await self.send_message(reply)
+        if error == NOT_A_MEMBER:
+            await self.close_after_outbox(MEMBERSHIP_CLOSE_CODE)
+    
+    async def send_snapshot(self, version, snapshot):
+        """
+        Send a cached room snapshot (JSON bytes) as a room_update.
+        """
+        await self.queue_frame(self.snapshot_frame(version, snapshot), ROOM_UPDATE, version)
+    
+    def snapshot_frame(self, version, snapshot):
+        """
+        Returns the room_update frame of a cached room snapshot (JSON bytes);
+        JSON-based sockets get it without decoding it.
+        """
+        if base_format(self.wire_format) != JSON_FORMAT:
+            return encode_frame({'type': 'room_update', 'data': json.loads(snapshot), 'version': version}, self.wire_format)
+        return finish_frame(
+            '{"type": "room_update", "data": ' + snapshot.decode('utf-8') + ', "version": ' + json.dumps(version) + '}',
+            self.wire_format
+        )
+    
+    async def send_message(self, message):
+        """
+        Send a message to this socket only, in the socket's wire format.
+        """
+        await self.queue_frame(encode_frame(message, self.wire_format))
+    
+    async def send_frame(self, frame):
+        if isinstance(frame, bytes):
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
+    
+    async def queue_frame(self, frame, room_state=None, version=None):
+        """
+        Queue a frame for this socket's writer task.
+        
+        Room state frames are only sent while the client has fewer than
+        WS_MAX_UNACKED_FRAMES of them unacknowledged (once it acks at all, see
+        handle_ack), so frames pile up here for a client that falls behind
+        even when the server's send() never blocks.
+        
+        A room state frame (room_state ROOM_UPDATE or ROOM_PATCH) replaces the
+        room state frames still waiting: a room_update simply supersedes them,
+        a room_patch no longer applies to what the client has, so all of them
+        become one room_update built from the latest snapshot when it is sent.
+        A socket with WS_MAX_PENDING_FRAMES frames waiting is closed with
+        RESYNC_CLOSE_CODE.
+        
+        Args:
+            frame: Frame in the socket's wire format
+            room_state: ROOM_UPDATE, ROOM_PATCH, or None for other messages
+            version: Room version of a room state frame
+        """
+        if self.evicted or self.closing_code is not None:
+            return
+        if room_state is not None:
+            collapsed = sum(1 for entry in self.outbox if entry[0] is not None)
+            if collapsed:
+                self.outbox = deque(entry for entry in self.outbox if entry[0] is None)
+                _count_outbound('collapsed', collapsed)
+                if room_state == ROOM_PATCH:
+                    room_state, frame, version = ROOM_UPDATE, None, None
+        max_pending = settings.WS_MAX_PENDING_FRAMES
+        if max_pending > 0 and len(self.outbox) >= max_pending:
+            await self.evict()
+            return
+        self.outbox.append((room_state, frame, version))
+        _count_outbound('queued')
+        _record_depth(len(self.outbox))
+        self.outbox_ready.set()
+    
+    async def drain_outbox(self):
+        """
+        Writer task: sends the queued frames in order. A frame of None is the
+        latest room snapshot, loaded when its turn comes. A room state frame
+        waits at the head of the queue while the client's ack window is full.
+        """
+        while True:
+            if not self.outbox:
+                if self.closing_code is not None:
+                    await self.close(code=self.closing_code)
+                    return
+                self.outbox_ready.clear()
+                await self.outbox_ready.wait()
+                continue
+            if (
+                self.outbox[0][0] is not None
+                and self.flow_control
+                and self.closing_code is None
+                and len(self.unacked_versions) >= settings.WS_MAX_UNACKED_FRAMES > 0
+            ):
+                _count_outbound('stalled')
+                self.ack_ready.clear()
+                await self.ack_ready.wait()
+                continue
+            room_state, frame, version = self.outbox.popleft()
+            _count_outbound('sent')
+            if frame is None:
+                version, snapshot = await self.get_snapshot()
+                if snapshot is None:
+                    continue
+                frame = self.snapshot_frame(version, snapshot)
+            if room_state is not None and version is not None:
+                self.unacked_versions.append(version)
+            await self.send_frame(frame)
+    
+    def stop_outbox(self):
+        """Stop the writer task and drop the frames still waiting."""
+        if getattr(self, 'outbox_writer', None) is not None:
+            self.outbox_writer.cancel()
+            self.outbox_writer = None
+        if getattr(self, 'outbox', None):
+            _count_outbound('discarded', len(self.outbox))
+            self.outbox.clear()
+    
+    async def close_after_outbox(self, code):
+        """
+        Close the socket once the frames already queued have been sent; frames
+        queued after this call are dropped.
+        """
+        if self.closing_code is None:
+            self.closing_code = code
+            self.outbox_ready.set()
+            self.ack_ready.set()
+    
+    async def evict(self):
+        """
+        Close a socket that fell too far behind; the client reconnects and
+        starts from a full room_update.
+        """
+        self.evicted = True
+        self.stop_outbox()
+        _count_outbound('evicted')
+        await self.close(code=RESYNC_CLOSE_CODE)
+    
+    async def forward(self, event, room_state=None):
+        """
+        Send a broadcast event's frame, pre-encoded once for all sockets (see api.wire_format).
+        """
+        await self.queue_frame(get_frame(event, self.wire_format), room_state, event.get('version'))
     
     async def room_update(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'room_update',
-            'data': event['data']
-        }))
+        await self.forward(event, ROOM_UPDATE)
+    
+    async def room_patch(self, event):
+        """
+        Send only the fields that changed since base_version (JSON Patch operations).
+        """
+        await self.forward(event, ROOM_PATCH)
     
     async def player_removed_notification(self, event):
         """
-        Send a notification when a player is removed from the room.
+        Send a notification when a player is removed from the room; the
+        removed player's socket is closed after it.
         """
-        await self.send(text_data=json.dumps({
-            'type': 'player_removed_notification',
-            'removed_user_id': event['removed_user_id']
-        }))
+        await self.forward(event)
+        if event.get('removed_user_id') == self.user.id:
+            await self.close_after_outbox(MEMBERSHIP_CLOSE_CODE)
     
     async def room_deleted_notification(self, event):
         """
-        Send a notification when the room is deleted.
+        Send a notification when the room is deleted, then close the socket.
         """
-        await self.send(text_data=json.dumps({
-            'type': 'room_deleted_notification',
-            'room_id': event['room_id']
-        }))
+        await self.forward(event)
+        await self.close_after_outbox(MEMBERSHIP_CLOSE_CODE)
     
     async def game_started_notification(self, event):
         """
         Send a notification when the game is started by the host.
         """
-        await self.send(text_data=json.dumps({
-            'type': 'game_started_notification',
-            'room_id': event['room_id'],
-            'game_session': event['game_session']
-        }))
+        await self.forward(event)
     
     async def player_submitted_notification(self, event):
         """
         Send a notification when a player submits their answers.
         """
-        await self.send(text_data=json.dumps({
-            'type': 'player_submitted_notification',
-            'player_username': event['player_username'],
-            'all_players_submitted': event['all_players_submitted']
-        }))
-    
-    async def send_room_update(self):
-        room = await self.get_room()
-        if room:
-            room_data = await self.serialize_room(room)
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'room_update',
-                    'data': room_data
-                }
-            )
+        await self.forward(event)
     
-    @database_sync_to_async
-    def get_user_from_token(self):
+    async def round_closed_notification(self, event):
+        """
+        Send a notification when the server closed a round whose timer ran out.
+        """
+        await self.forward(event)
+    
+    async def round_results(self, event):
+        """
+        Send the scored answers of a finished round (and the running totals).
+        """
+        await self.forward(event)
+    
+    def get_token(self):
         query_string = self.scope.get('query_string', b'').decode()
-        token = None
-        
         for param in query_string.split('&'):
             if 'token=' in param:
-                token = param.split('token=')[1]
-                break
-        
+                return param.split('token=')[1]
+        return None
+    
+    @database_sync_to_async
+    def load_connection_state(self):
+        """
+        Returns (user, room_player_id, version, snapshot) for a member of an
+        active room, or None if the connection must be refused. With warm
+        caches this is a single query (the membership check).
+        """
+        token = self.get_token()
         if not token:
             return None
-        
-        try:
-            UntypedToken(token)
-            decoded_data = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user_id = decoded_data.get('user_id')
-            return User.objects.get(id=user_id)
-        except (InvalidToken, TokenError, User.DoesNotExist):
+        user = get_user_for_token(token)
+        if user is None:
             return None
+        room_player_id = RoomPlayer.objects.filter(
+            room_id=self.room_id, room__is_active=True, user=user
+        ).values_list('id', flat=True).first()
+        if room_player_id is None:
+            return None
+        version, snapshot = get_room_snapshot(self.room_id)
+        return user, room_player_id, version, snapshot
     
     @database_sync_to_async
-    def get_room(self):
+    def get_snapshot(self):
         try:
-            return Room.objects.get(id=self.room_id, is_active=True)
+            return get_room_snapshot(self.room_id)
         except Room.DoesNotExist:
-            return None
+            return None, None
     
     @database_sync_to_async
-    def is_user_in_room(self, room, user):
-        return RoomPlayer.objects.filter(room=room, user=user).exists()
-    
-    @database_sync_to_async
-    def serialize_room(self, room):
-        serializer = RoomSerializer(room)
-        return serializer.data
+    def save_answer_draft(self, answers):
+        """
+        Validate and store a draft like SaveDraftView, with one query for the
+        game session and this socket's membership (a player removed or gone
+        since connecting gets NOT_A_MEMBER). Returns (round_number, error).
+        """
+        game_session = GameSession.objects.filter(room_id=self.room_id).annotate(
+            is_member=Exists(RoomPlayer.objects.filter(
+                id=self.room_player_id, room_id=self.room_id, room__is_active=True
+            ))
+        ).only(
+            'id', 'letter', 'is_completed', 'current_round', 'selected_types',
+            'round_start_time', 'round_timer_seconds'
+        ).first()
+        if game_session is not None and not game_session.is_member:
+            return None, NOT_A_MEMBER
+        if game_session is None or not game_session.letter:
+            return None, 'Game has not started yet.'
+        if game_session.is_completed:
+            return None, 'Game is already completed.'
+        if is_round_expired(game_session):
+            return None, 'Round time is over.'
+        
+        serializer = SubmitAnswerSerializer(data={'answers': answers})
+        if not serializer.is_valid():
+            return None, 'Invalid answers.'
+        
+        save_draft(
+            game_session.id,
+            game_session.current_round,
+            self.room_player_id,
+            clean_answers(serializer.validated_data['answers'], game_session.selected_types)
+        )
+        return game_session.current_round, None
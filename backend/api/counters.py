@@ -0,0 +1,87 @@
+"""
+Denormalized counters behind the "have all players submitted?" check.
+
+Room.player_count and GameSession.submitted_count are updated with F()
+expressions, from the RoomPlayer and PlayerAnswer signals (see api/signals.py)
+and from bulk inserts and deletes that bypass them, so concurrent joins and
+submits never lose an update. Deleting answers has no per-row signal (it would
+turn bulk deletes into one UPDATE per answer): a leaving player's answer is
+uncounted before the player is deleted, and views deleting a game's answers
+reset the count once. submitted_count counts the answers of submitted_round; the
+first answer to a newer current round starts it over, so code that changes
+current_round never has to reset it.
+"""
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+from .models import Room, GameSession, PlayerAnswer
+
+
+def add_players(room_id, delta):
+    """
+    Adjust a room's player count.
+
+    Args:
+        room_id: ID of the room
+        delta: Number of players joined (negative for players who left)
+    """
+    Room.objects.filter(pk=room_id).update(player_count=F('player_count') + delta)
+
+
+def add_submissions(game_session_id, round_number, delta):
+    """
+    Count answers submitted to a round. Answers to a round that is not the
+    current one are not counted.
+
+    Args:
+        game_session_id: ID of the game session
+        round_number: Round the answers belong to
+        delta: Number of answers created
+    """
+    GameSession.objects.filter(pk=game_session_id, current_round=round_number).update(
+        submitted_count=Case(
+            When(submitted_round=round_number, then=F('submitted_count') + delta),
+            default=Value(delta)
+        ),
+        submitted_round=round_number
+    )
+
+
+def remove_player_submissions(room_id, room_player_id):
+    """
+    Stop counting the answer of a player who is about to be removed from a
+    room (their answers go with them). One UPDATE, whatever the number of answers.
+
+    Args:
+        room_id: ID of the player's room
+        room_player_id: ID of the RoomPlayer
+    """
+    GameSession.objects.filter(room_id=room_id, submitted_count__gt=0).filter(
+        Exists(PlayerAnswer.objects.filter(
+            game_session=OuterRef('pk'), player_id=room_player_id, round_number=OuterRef('submitted_round')
+        ))
+    ).update(submitted_count=F('submitted_count') - 1)
+
+
+def reset_submissions(game_session_id):
+    """
+    Stop counting any answers, after all answers of a game session were deleted.
+
+    Args:
+        game_session_id: ID of the game session
+    """
+    GameSession.objects.filter(pk=game_session_id).update(submitted_count=0)
+
+
+def get_submission_counts(game_session):
+    """
+    Returns (current round, answers submitted to it, players in the room),
+    read fresh from the database in one query.
+
+    Args:
+        game_session: The game session object
+    """
+    current_round, submitted_round, submitted_count, player_count = GameSession.objects.filter(
+        pk=game_session.pk
+    ).values_list('current_round', 'submitted_round', 'submitted_count', 'room__player_count').get()
+    if submitted_round != current_round:
+        submitted_count = 0
+    return current_round, submitted_count, player_count
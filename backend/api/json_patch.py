@@ -0,0 +1,103 @@
+"""
+Minimal JSON Patch (RFC 6902) diff/apply for JSON documents.
+
+Only 'add', 'remove' and 'replace' operations are produced. Lists are diffed
+by trimming their common prefix and suffix, so appending or removing a single
+player produces a single operation instead of replacing the whole list.
+The frontend mirrors apply_patch in src/lib/websocket.js.
+"""
+
+
+def _escape(key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def make_patch(old, new, path=''):
+    """
+    Returns a list of JSON Patch operations turning `old` into `new`.
+
+    Args:
+        old: Previous JSON document
+        new: New JSON document
+        path: JSON Pointer of the documents (used for recursion)
+    """
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({'op': 'remove', 'path': f'{path}/{_escape(key)}'})
+        for key, value in new.items():
+            key_path = f'{path}/{_escape(key)}'
+            if key not in old:
+                ops.append({'op': 'add', 'path': key_path, 'value': value})
+            else:
+                ops.extend(make_patch(old[key], value, key_path))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        return _make_list_patch(old, new, path)
+    return [{'op': 'replace', 'path': path, 'value': new}]
+
+
+def _make_list_patch(old, new, path):
+    prefix = 0
+    while prefix < len(old) and prefix < len(new) and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < len(old) - prefix and suffix < len(new) - prefix
+        and old[len(old) - 1 - suffix] == new[len(new) - 1 - suffix]
+    ):
+        suffix += 1
+    old_middle = old[prefix:len(old) - suffix]
+    new_middle = new[prefix:len(new) - suffix]
+
+    if len(old_middle) == len(new_middle):
+        # Same length: elements changed in place
+        ops = []
+        for offset, (old_item, new_item) in enumerate(zip(old_middle, new_middle)):
+            ops.extend(make_patch(old_item, new_item, f'{path}/{prefix + offset}'))
+        return ops
+
+    ops = [{'op': 'remove', 'path': f'{path}/{prefix}'} for _ in old_middle]
+    for offset, item in enumerate(new_middle):
+        ops.append({'op': 'add', 'path': f'{path}/{prefix + offset}', 'value': item})
+    return ops
+
+
+def apply_patch(document, ops):
+    """
+    Applies JSON Patch operations to a document and returns the result.
+    The document is modified in place unless the root itself is replaced.
+
+    Args:
+        document: JSON document
+        ops: List of operations as produced by make_patch
+    """
+    for op in ops:
+        if op['path'] == '':
+            document = op.get('value')
+            continue
+        tokens = [_unescape(token) for token in op['path'].split('/')[1:]]
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            if op['op'] == 'add':
+                parent.insert(len(parent) if last == '-' else int(last), op['value'])
+            elif op['op'] == 'remove':
+                del parent[int(last)]
+            else:
+                parent[int(last)] = op['value']
+        else:
+            if op['op'] == 'remove':
+                del parent[last]
+            else:
+                parent[last] = op['value']
+    return document
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.player_scores import iter_game_sessions, check_player_scores
+
+
+class Command(BaseCommand):
+    help = "Check that PlayerScore running totals match historical PlayerAnswer rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'game_session_ids', nargs='*', type=int,
+            help="Only check these game sessions (default: all)"
+        )
+
+    def handle(self, *args, **options):
+        inconsistent = 0
+        for game_session in iter_game_sessions(options['game_session_ids']):
+            for room_player_id, stored, expected in check_player_scores(game_session):
+                inconsistent += 1
+                self.stdout.write(
+                    f"Game session {game_session.id}, player {room_player_id}: "
+                    f"stored {stored}, expected {expected}"
+                )
+        if inconsistent:
+            raise CommandError(
+                f"{inconsistent} inconsistent player scores found. "
+                f"Run 'manage.py rebuild_player_scores' to fix them."
+            )
+        self.stdout.write(self.style.SUCCESS("All player scores are consistent."))
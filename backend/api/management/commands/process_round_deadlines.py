@@ -0,0 +1,41 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api.round_deadlines import get_worker_id, process_due_deadlines
+
+
+class Command(BaseCommand):
+    help = "Apply due round deadlines. Any number of these workers can run at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Process the currently due deadlines and exit"
+        )
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help="Seconds between polls (default: ROUND_DEADLINE_POLL_SECONDS)"
+        )
+        parser.add_argument(
+            '--worker-id', default=None,
+            help="Identifier recorded on claimed deadlines (default: host:pid)"
+        )
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or get_worker_id()
+        interval = options['interval'] or settings.ROUND_DEADLINE_POLL_SECONDS
+        while True:
+            try:
+                processed = process_due_deadlines(worker_id)
+            except Exception as e:
+                # Keep polling; claimed deadlines are retried once their lease expires
+                processed = 0
+                self.stderr.write(f"Error processing round deadlines: {e}")
+            finally:
+                close_old_connections()
+            if processed:
+                self.stdout.write(f"{worker_id}: applied {processed} round deadlines")
+            if options['once']:
+                return
+            time.sleep(interval)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from api.player_scores import iter_game_sessions, rebuild_player_scores
+
+
+class Command(BaseCommand):
+    help = "Rebuild the PlayerScore running totals from historical PlayerAnswer rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'game_session_ids', nargs='*', type=int,
+            help="Only rebuild these game sessions (default: all)"
+        )
+
+    def handle(self, *args, **options):
+        sessions = 0
+        rows = 0
+        for game_session in iter_game_sessions(options['game_session_ids']):
+            rows += rebuild_player_scores(game_session)
+            sessions += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {rows} player scores for {sessions} game sessions."
+        ))
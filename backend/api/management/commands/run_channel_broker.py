@@ -0,0 +1,23 @@
+import asyncio
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.channel_broker import ChannelBroker
+
+
+class Command(BaseCommand):
+    help = "Run a channel broker for the 'broker' channel layer. Run one per socket in CHANNEL_BROKER_SOCKETS."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket', default=None,
+            help="Unix socket path to listen on (default: the first of CHANNEL_BROKER_SOCKETS)"
+        )
+
+    def handle(self, *args, **options):
+        path = options['socket'] or settings.CHANNEL_BROKER_SOCKETS[0]
+        broker = ChannelBroker(path)
+        self.stdout.write(f"Channel broker listening on {path}")
+        try:
+            asyncio.run(broker.serve_forever())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_gamesession_reduce_timer_on_complete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoundScoreState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.IntegerField(default=1, help_text='Round number this state belongs to')),
+                ('state', models.JSONField(default=dict, help_text='Per-category answer histograms and per-player contributions (see api.scoring)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('game_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='round_score_states', to='api.gamesession')),
+            ],
+            options={
+                'unique_together': {('game_session', 'round_number')},
+            },
+        ),
+    ]
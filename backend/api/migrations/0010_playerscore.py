@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_roundscorestate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_points', models.IntegerField(default=0, help_text='Total points across all finalized rounds')),
+                ('rounds_played', models.IntegerField(default=0, help_text='Number of finalized rounds the player submitted answers for')),
+                ('round_points', models.JSONField(default=dict, help_text='Dictionary mapping round number to points earned in that round')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('game_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_scores', to='api.gamesession')),
+                ('room_player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='api.roomplayer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['game_session', '-total_points'], name='playerscore_leaderboard_idx')],
+                'unique_together': {('game_session', 'room_player')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_playerscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoundDeadline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.IntegerField(help_text='Round to advance when the deadline is due')),
+                ('due_at', models.DateTimeField(help_text='When the round should be advanced')),
+                ('claimed_by', models.CharField(blank=True, help_text='Worker currently processing this deadline', max_length=255, null=True)),
+                ('claimed_until', models.DateTimeField(blank=True, help_text="When the worker's claim expires", null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('game_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='round_deadlines', to='api.gamesession')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['due_at'], name='rounddeadline_due_idx')],
+                'unique_together': {('game_session', 'round_number')},
+            },
+        ),
+    ]
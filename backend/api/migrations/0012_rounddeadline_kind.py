@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_rounddeadline'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='rounddeadline',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='rounddeadline',
+            name='kind',
+            field=models.CharField(choices=[('advance', 'Advance to the next round'), ('expire', 'Close the round when its timer runs out')], default='advance', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='rounddeadline',
+            name='round_number',
+            field=models.IntegerField(help_text='Round the deadline applies to'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='rounddeadline',
+            unique_together={('game_session', 'round_number', 'kind')},
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_rounddeadline_kind'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round_number', models.IntegerField(help_text='Round number this draft belongs to')),
+                ('answers', models.JSONField(default=dict, help_text="Dictionary mapping game type keys to player's draft answers")),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('game_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_drafts', to='api.gamesession')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_drafts', to='api.roomplayer')),
+            ],
+            options={
+                'unique_together': {('game_session', 'player', 'round_number')},
+            },
+        ),
+    ]
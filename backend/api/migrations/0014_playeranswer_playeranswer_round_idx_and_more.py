@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_answerdraft'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playeranswer',
+            index=models.Index(fields=['game_session', 'round_number', 'player'], name='playeranswer_round_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomplayer',
+            index=models.Index(fields=['room', 'joined_at'], name='roomplayer_room_joined_idx'),
+        ),
+    ]
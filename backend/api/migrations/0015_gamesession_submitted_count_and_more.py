@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    Room = apps.get_model('api', 'Room')
+    RoomPlayer = apps.get_model('api', 'RoomPlayer')
+    GameSession = apps.get_model('api', 'GameSession')
+    PlayerAnswer = apps.get_model('api', 'PlayerAnswer')
+    players = RoomPlayer.objects.filter(room=OuterRef('pk')).order_by().values('room').annotate(n=Count('*')).values('n')
+    Room.objects.update(player_count=Coalesce(Subquery(players), 0))
+    answers = PlayerAnswer.objects.filter(
+        game_session=OuterRef('pk'), round_number=OuterRef('current_round')
+    ).order_by().values('game_session').annotate(n=Count('*')).values('n')
+    GameSession.objects.update(submitted_round=models.F('current_round'), submitted_count=Coalesce(Subquery(answers), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_playeranswer_playeranswer_round_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='submitted_count',
+            field=models.IntegerField(default=0, help_text='Number of answers submitted for submitted_round (maintained by api.counters)'),
+        ),
+        migrations.AddField(
+            model_name='gamesession',
+            name='submitted_round',
+            field=models.IntegerField(default=1, help_text='Round counted by submitted_count'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='player_count',
+            field=models.IntegerField(default=0, help_text='Number of players in the room (maintained by api.counters)'),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
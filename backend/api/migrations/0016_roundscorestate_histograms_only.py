@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_gamesession_submitted_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='roundscorestate',
+            name='state',
+            field=models.JSONField(default=dict, help_text="Per-category answer histograms of the round's submissions (see api.scoring)"),
+        ),
+    ]
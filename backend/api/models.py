@@ -23,12 +23,47 @@ GAME_TYPE_CHOICES = [
 ]
 
 
-class Room(models.Model):
+class CounterFieldsModel(models.Model):
+    """
+    Base for models with counter columns maintained by F() updates (see
+    api.counters). A plain save() of an instance loaded earlier would write
+    back stale counts, so counters are only saved when listed in update_fields.
+    """
+    counter_fields = ()
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is None and not self._state.adding:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class RoomQuerySet(models.QuerySet):
+    def with_details(self):
+        """
+        Loads everything RoomSerializer needs (host, game session, players and
+        their users) so serializing a room costs a constant number of queries.
+        """
+        return self.select_related('host', 'game_session').prefetch_related(
+            models.Prefetch('players', queryset=RoomPlayer.objects.select_related('user'))
+        )
+
+
+class Room(CounterFieldsModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     host = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hosted_rooms')
     name = models.CharField(max_length=100, default='Letter Game Room')
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
+    player_count = models.IntegerField(default=0, help_text="Number of players in the room (maintained by api.counters)")
+    
+    objects = RoomQuerySet.as_manager()
+    counter_fields = ('player_count',)
     
     class Meta:
         ordering = ['-created_at']
@@ -45,12 +80,16 @@ class RoomPlayer(models.Model):
     class Meta:
         unique_together = ['room', 'user']
         ordering = ['joined_at']
+        indexes = [
+            # A room's players in join order (RoomSerializer, round scoring)
+            models.Index(fields=['room', 'joined_at'], name='roomplayer_room_joined_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} in {self.room.name}"
 
 
-class GameSession(models.Model):
+class GameSession(CounterFieldsModel):
     """
     Game session model to store game rules (letter and selected types) for a room.
     """
@@ -66,9 +105,13 @@ class GameSession(models.Model):
     round_timer_seconds = models.IntegerField(default=60, help_text="Timer duration in seconds for each round")
     reduce_timer_on_complete_seconds = models.IntegerField(default=15, help_text="Reduce timer to this many seconds when a player completes all categories (if time left is greater)")
     round_start_time = models.DateTimeField(null=True, blank=True, help_text="Timestamp when the current round started")
+    submitted_round = models.IntegerField(default=1, help_text="Round counted by submitted_count")
+    submitted_count = models.IntegerField(default=0, help_text="Number of answers submitted for submitted_round (maintained by api.counters)")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    counter_fields = ('submitted_round', 'submitted_count')
+    
     class Meta:
         ordering = ['-created_at']
     
@@ -112,6 +155,101 @@ class PlayerAnswer(models.Model):
     class Meta:
         unique_together = ['game_session', 'player', 'round_number']
         ordering = ['-submitted_at']
+        indexes = [
+            # The answers of one round: counts and submitted players are answered
+            # from the index alone (the unique index leads with player instead)
+            models.Index(fields=['game_session', 'round_number', 'player'], name='playeranswer_round_idx'),
+        ]
     
     def __str__(self):
         return f"{self.player.user.username} - {self.points} points"
+
+
+class AnswerDraft(models.Model):
+    """
+    A player's last saved in-progress answers for a round.
+    Drafts live in the cache and are written here in batches (see
+    api.answer_drafts), so whichever worker closes the round can read them.
+    """
+    game_session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='answer_drafts')
+    player = models.ForeignKey(RoomPlayer, on_delete=models.CASCADE, related_name='answer_drafts')
+    round_number = models.IntegerField(help_text="Round number this draft belongs to")
+    answers = models.JSONField(default=dict, help_text="Dictionary mapping game type keys to player's draft answers")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['game_session', 'player', 'round_number']
+    
+    def __str__(self):
+        return f"{self.player_id} draft for round {self.round_number}"
+
+
+class RoundScoreState(models.Model):
+    """
+    Incrementally maintained scoring state for one round of a game session.
+    Updated on every submit so the last submit only materializes the points.
+    """
+    game_session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='round_score_states')
+    round_number = models.IntegerField(default=1, help_text="Round number this state belongs to")
+    state = models.JSONField(default=dict, help_text="Per-category answer histograms of the round's submissions (see api.scoring)")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['game_session', 'round_number']
+    
+    def __str__(self):
+        return f"Score state for {self.game_session_id} - round {self.round_number}"
+
+
+class PlayerScore(models.Model):
+    """
+    Denormalized running score of a player in a game session.
+    Updated once per round when the round's scores are finalized.
+    """
+    game_session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='player_scores')
+    room_player = models.ForeignKey(RoomPlayer, on_delete=models.CASCADE, related_name='scores')
+    total_points = models.IntegerField(default=0, help_text="Total points across all finalized rounds")
+    rounds_played = models.IntegerField(default=0, help_text="Number of finalized rounds the player submitted answers for")
+    round_points = models.JSONField(default=dict, help_text="Dictionary mapping round number to points earned in that round")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['game_session', 'room_player']
+        indexes = [
+            models.Index(fields=['game_session', '-total_points'], name='playerscore_leaderboard_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.room_player_id} - {self.total_points} points"
+
+
+class RoundDeadline(models.Model):
+    """
+    Persistent deadline for a game session round: either advancing to the next
+    round or closing the round when its timer runs out.
+    Any worker can claim a due deadline for a lease period; the deadline row is
+    deleted in the same transaction that applies it.
+    """
+    ADVANCE = 'advance'
+    EXPIRE = 'expire'
+    KIND_CHOICES = [
+        (ADVANCE, 'Advance to the next round'),
+        (EXPIRE, 'Close the round when its timer runs out'),
+    ]
+    
+    game_session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='round_deadlines')
+    round_number = models.IntegerField(help_text="Round the deadline applies to")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=ADVANCE)
+    due_at = models.DateTimeField(help_text="When the round should be advanced")
+    claimed_by = models.CharField(max_length=255, null=True, blank=True, help_text="Worker currently processing this deadline")
+    claimed_until = models.DateTimeField(null=True, blank=True, help_text="When the worker's claim expires")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['game_session', 'round_number', 'kind']
+        indexes = [
+            models.Index(fields=['due_at'], name='rounddeadline_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.game_session_id} round {self.round_number} {self.kind} due {self.due_at}"
@@ -0,0 +1,138 @@
+"""
+Maintenance of the denormalized PlayerScore table (running totals per player).
+"""
+from django.db import transaction
+from .models import GameSession, PlayerAnswer, PlayerScore
+from .serializers.player_answer_serializer import get_round_completeness
+
+
+def record_round_points(game_session, round_number, round_points):
+    """
+    Store the finalized points of one round in the players' running scores.
+    Recording the same round again replaces its previous points, so this is
+    safe to call every time a round is (re)scored.
+
+    Args:
+        game_session: The game session object
+        round_number: The finalized round
+        round_points: Dictionary mapping RoomPlayer id to points earned in the round
+
+    Returns:
+        Dictionary mapping RoomPlayer id to the player's new total points
+    """
+    if not round_points:
+        return {}
+    round_key = str(round_number)
+    with transaction.atomic():
+        existing = {
+            player_score.room_player_id: player_score
+            for player_score in PlayerScore.objects.select_for_update().filter(
+                game_session=game_session,
+                room_player_id__in=list(round_points)
+            )
+        }
+        player_scores = []
+        for room_player_id, points in round_points.items():
+            player_score = existing.get(room_player_id) or PlayerScore(
+                game_session=game_session,
+                room_player_id=room_player_id
+            )
+            player_score.round_points = {**player_score.round_points, round_key: points}
+            player_score.total_points = sum(player_score.round_points.values())
+            player_score.rounds_played = len(player_score.round_points)
+            player_scores.append(player_score)
+        PlayerScore.objects.bulk_create(
+            player_scores,
+            update_conflicts=True,
+            unique_fields=['game_session', 'room_player'],
+            update_fields=['total_points', 'rounds_played', 'round_points', 'updated_at']
+        )
+    return {player_score.room_player_id: player_score.total_points for player_score in player_scores}
+
+
+def get_finalized_rounds(game_session):
+    """
+    Returns the round numbers of a game session whose scores are final:
+    every round before the current one, plus the current round once all
+    players have submitted (or the game is completed).
+    """
+    finalized_rounds = list(range(1, game_session.current_round))
+    current_round = game_session.current_round
+    if game_session.is_completed or get_round_completeness(game_session, [current_round])[current_round]:
+        finalized_rounds.append(current_round)
+    return finalized_rounds
+
+
+def compute_player_scores(game_session):
+    """
+    Computes running scores from historical PlayerAnswer rows.
+
+    Returns:
+        Dictionary mapping RoomPlayer id to {round number (str): points}
+    """
+    expected = {}
+    for room_player_id, round_number, points in PlayerAnswer.objects.filter(
+        game_session=game_session,
+        round_number__in=get_finalized_rounds(game_session)
+    ).values_list('player_id', 'round_number', 'points'):
+        expected.setdefault(room_player_id, {})[str(round_number)] = points or 0
+    return expected
+
+
+def rebuild_player_scores(game_session):
+    """
+    Replaces the PlayerScore rows of a game session with ones rebuilt from PlayerAnswer rows.
+
+    Returns:
+        Number of PlayerScore rows written
+    """
+    expected = compute_player_scores(game_session)
+    with transaction.atomic():
+        PlayerScore.objects.filter(game_session=game_session).delete()
+        PlayerScore.objects.bulk_create([
+            PlayerScore(
+                game_session=game_session,
+                room_player_id=room_player_id,
+                round_points=round_points,
+                total_points=sum(round_points.values()),
+                rounds_played=len(round_points)
+            )
+            for room_player_id, round_points in expected.items()
+        ])
+    return len(expected)
+
+
+def check_player_scores(game_session):
+    """
+    Compares stored PlayerScore rows with scores recomputed from PlayerAnswer rows.
+
+    Returns:
+        List of (room_player_id, stored round points, expected round points)
+        tuples for every player whose running score is inconsistent
+    """
+    expected = compute_player_scores(game_session)
+    stored = {
+        room_player_id: (round_points, total_points, rounds_played)
+        for room_player_id, round_points, total_points, rounds_played in PlayerScore.objects.filter(
+            game_session=game_session
+        ).values_list('room_player_id', 'round_points', 'total_points', 'rounds_played')
+    }
+    mismatches = []
+    for room_player_id in sorted(set(expected) | set(stored)):
+        expected_rounds = expected.get(room_player_id, {})
+        stored_rounds, total_points, rounds_played = stored.get(room_player_id, ({}, 0, 0))
+        if (
+            stored_rounds != expected_rounds
+            or total_points != sum(stored_rounds.values())
+            or rounds_played != len(stored_rounds)
+        ):
+            mismatches.append((room_player_id, stored_rounds, expected_rounds))
+    return mismatches
+
+
+def iter_game_sessions(game_session_ids=None):
+    """Yields the game sessions to process (all of them if no ids are given)."""
+    game_sessions = GameSession.objects.order_by('id')
+    if game_session_ids:
+        game_sessions = game_sessions.filter(id__in=game_session_ids)
+    return game_sessions.iterator()
@@ -0,0 +1,33 @@
+"""
+Token bucket rate limiter for per-connection limits (e.g. inbound WebSocket messages).
+"""
+import time
+
+
+class TokenBucket:
+    """
+    Allows `rate` events per second on average, with bursts of up to `burst`.
+    Not thread-safe; meant to be owned by a single connection.
+
+    Args:
+        rate: Tokens added per second (0 or less disables the limit)
+        burst: Bucket capacity
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def allow(self):
+        """Take one token. Returns False if the bucket is empty."""
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
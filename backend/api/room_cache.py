@@ -0,0 +1,139 @@
+"""
+Versioned cache of serialized room snapshots shared by REST and WebSocket paths.
+
+Every room has a version number that is bumped on any Room, RoomPlayer or
+GameSession write (see api/signals.py). The serialized room document is
+cached as JSON bytes together with the version it was built for, so all
+readers reuse one serialization until the next mutation.
+"""
+import json
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from rest_framework.utils.encoders import JSONEncoder
+from .models import Room
+from .serializers.room_serializer import RoomSerializer
+
+VERSION_KEY = 'room_version:{room_id}'
+SNAPSHOT_KEY = 'room_snapshot:{room_id}'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _count(stat):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def get_cache_stats():
+    """Returns a copy of this process's snapshot cache hit/miss/invalidation counters."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    """Resets this process's snapshot cache counters."""
+    with _stats_lock:
+        for stat in _stats:
+            _stats[stat] = 0
+
+
+def with_room_details(room):
+    """
+    Returns the room with everything RoomSerializer needs loaded.
+    Rooms already loaded with Room.objects.with_details() are returned as-is,
+    anything else is reloaded from the database.
+
+    Args:
+        room: The room object
+    """
+    if 'players' in getattr(room, '_prefetched_objects_cache', {}):
+        return room
+    return Room.objects.with_details().get(pk=room.pk)
+
+
+def get_room_version(room_id):
+    """
+    Returns the current version of a room, starting at 1.
+
+    Args:
+        room_id: The room ID
+    """
+    key = VERSION_KEY.format(room_id=room_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _bump(room_id):
+    key = VERSION_KEY.format(room_id=room_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Version key missing (first write or evicted): start over, the
+        # snapshot is dropped below so no stale document can match it
+        cache.add(key, 1, timeout=None)
+    cache.delete(SNAPSHOT_KEY.format(room_id=room_id))
+    _count('invalidations')
+
+
+def bump_room_version(room_id):
+    """
+    Invalidates the cached snapshot of a room.
+    Inside a transaction the version is bumped again on commit, so a reader
+    that cached the pre-commit state during the transaction is invalidated too.
+
+    Args:
+        room_id: The room ID
+    """
+    _bump(room_id)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(room_id))
+
+
+def get_room_snapshot(room_id, room=None):
+    """
+    Returns (version, JSON bytes) of the serialized room, serializing it only
+    if the cached snapshot is missing or older than the room's version.
+
+    Args:
+        room_id: The room ID
+        room: Optional room object to serialize on a cache miss (saves a reload
+            if it was loaded with Room.objects.with_details())
+
+    Raises:
+        Room.DoesNotExist: If the room does not exist
+    """
+    # Read the version before loading the room, so a write racing with this
+    # read can only make the stored snapshot newer than its version, not older
+    version = get_room_version(room_id)
+    snapshot_key = SNAPSHOT_KEY.format(room_id=room_id)
+    cached = cache.get(snapshot_key)
+    if cached is not None and cached[0] == version:
+        _count('hits')
+        return cached
+
+    _count('misses')
+    if room is None:
+        room = Room.objects.with_details().get(pk=room_id)
+    else:
+        room = with_room_details(room)
+    data = json.dumps(RoomSerializer(room).data, cls=JSONEncoder).encode('utf-8')
+    cache.set(snapshot_key, (version, data), timeout=settings.ROOM_SNAPSHOT_TIMEOUT)
+    return version, data
+
+
+def get_room_data(room_id, room=None):
+    """
+    Returns the serialized room as a dict, served from the snapshot cache.
+
+    Args:
+        room_id: The room ID
+        room: Optional room object (see get_room_snapshot)
+    """
+    version, data = get_room_snapshot(room_id, room)
+    return json.loads(data)
@@ -0,0 +1,152 @@
+"""
+Durable round deadlines shared by all workers.
+
+schedule_round_deadline() stores when a round should be advanced, or closed
+because its timer ran out (RoundDeadline.EXPIRE). Any worker
+can run process_due_deadlines(): it claims due deadlines for a lease period
+(select_for_update(skip_locked=True) so concurrent workers split the work
+instead of waiting on each other), then advances each round and deletes its
+deadline in one transaction, so every deadline is applied exactly once even
+if a worker dies mid-way (its claim simply expires).
+"""
+import os
+import socket
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import RoundDeadline
+
+
+def get_worker_id():
+    """Returns an identifier for this worker process."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def schedule_round_deadline(game_session, delay_seconds, round_number=None, kind=RoundDeadline.ADVANCE):
+    """
+    Store (or move) a round deadline. Returns the deadline.
+
+    Args:
+        game_session: The game session
+        delay_seconds: Seconds from now until the deadline is due
+        round_number: Round the deadline applies to (default: the current round)
+        kind: RoundDeadline.ADVANCE or RoundDeadline.EXPIRE
+    """
+    if round_number is None:
+        round_number = game_session.current_round
+    deadline, _ = RoundDeadline.objects.update_or_create(
+        game_session=game_session,
+        round_number=round_number,
+        kind=kind,
+        defaults={
+            'due_at': timezone.now() + timedelta(seconds=delay_seconds),
+            'claimed_by': None,
+            'claimed_until': None,
+        }
+    )
+    return deadline
+
+
+def claim_due_deadlines(worker_id, limit=None, lease_seconds=None, now=None):
+    """
+    Claim up to `limit` due deadlines that are unclaimed or whose claim expired.
+    Returns the claimed deadlines.
+
+    Args:
+        worker_id: Identifier of the claiming worker
+        limit: Maximum number of deadlines to claim (default ROUND_DEADLINE_BATCH_SIZE)
+        lease_seconds: How long the claim lasts (default ROUND_DEADLINE_LEASE_SECONDS)
+        now: Current time (default timezone.now())
+    """
+    if limit is None:
+        limit = settings.ROUND_DEADLINE_BATCH_SIZE
+    if lease_seconds is None:
+        lease_seconds = settings.ROUND_DEADLINE_LEASE_SECONDS
+    if now is None:
+        now = timezone.now()
+    claimable = Q(due_at__lte=now) & (Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+
+    with transaction.atomic():
+        candidates = list(
+            RoundDeadline.objects.select_for_update(skip_locked=True)
+            .filter(claimable)
+            .order_by('due_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        claimed_ids = []
+        for deadline_id in candidates:
+            # Conditional update: also correct on backends without row locks (SQLite)
+            if RoundDeadline.objects.filter(claimable, id=deadline_id).update(
+                claimed_by=worker_id,
+                claimed_until=now + timedelta(seconds=lease_seconds)
+            ):
+                claimed_ids.append(deadline_id)
+    return list(RoundDeadline.objects.filter(id__in=claimed_ids).select_related('game_session').order_by('due_at'))
+
+
+def run_deadline(deadline, worker_id):
+    """
+    Apply the deadline (advance or close its round) and delete it, in one
+    transaction. Returns False if the deadline is no longer claimed by this worker.
+
+    Args:
+        deadline: A deadline claimed by this worker
+        worker_id: Identifier of the worker
+    """
+    from .utils import advance_round
+    from .views.game_session_view import close_round
+    with transaction.atomic():
+        claimed = RoundDeadline.objects.select_for_update().filter(
+            id=deadline.id, claimed_by=worker_id
+        ).first()
+        if claimed is None:
+            return False
+        if deadline.kind == RoundDeadline.EXPIRE:
+            close_round(deadline.game_session, deadline.round_number)
+        else:
+            advance_round(str(deadline.game_session.room_id), deadline.round_number)
+        claimed.delete()
+    return True
+
+
+def release_deadline(deadline, worker_id):
+    """
+    Give up this worker's claim on a deadline so any worker can retry it.
+
+    Args:
+        deadline: A deadline claimed by this worker
+        worker_id: Identifier of the worker
+    """
+    RoundDeadline.objects.filter(id=deadline.id, claimed_by=worker_id).update(
+        claimed_by=None, claimed_until=None
+    )
+
+
+def process_due_deadlines(worker_id=None, limit=None, lease_seconds=None):
+    """
+    Claim and run due deadlines. Returns the number of deadlines applied.
+
+    Args:
+        worker_id: Identifier of the worker (default get_worker_id())
+        limit: Maximum number of deadlines to claim
+        lease_seconds: How long the claims last
+    """
+    if worker_id is None:
+        worker_id = get_worker_id()
+    processed = 0
+    for deadline in claim_due_deadlines(worker_id, limit=limit, lease_seconds=lease_seconds):
+        try:
+            if run_deadline(deadline, worker_id):
+                processed += 1
+        except Exception as e:
+            import traceback
+            print(f"Error running round deadline {deadline.id}: {e}")
+            traceback.print_exc()
+            try:
+                release_deadline(deadline, worker_id)
+            except Exception:
+                # The claim expires after its lease anyway
+                pass
+    return processed
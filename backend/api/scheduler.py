@@ -0,0 +1,224 @@
+"""
+Asyncio timer scheduler for round advancement.
+
+A single heap of deadlines is served by one task on an event loop (the ASGI
+server loop when bound with bind_loop(), otherwise a dedicated background loop
+thread), instead of one OS thread per timer. Due callbacks run in a bounded
+thread pool, since they do blocking database work.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+# Heap entry fields
+DUE, SEQ, KEY, FUNC, ARGS, CANCELLED = range(6)
+
+
+class RoundScheduler:
+    """
+    Keyed one-shot timers with O(log n) schedule and O(1) cancel.
+
+    Scheduling a key that already has a pending timer replaces it. Cancelled
+    entries stay in the heap until they reach the top (or the heap is
+    compacted), so cancelling never needs a heap search.
+
+    Args:
+        max_workers: Maximum number of callbacks running at once, or None to
+            use settings.ROUND_SCHEDULER_WORKERS
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._heap = []
+        self._entries = {}
+        self._seq = itertools.count()
+        self._loop = None
+        self._thread = None
+        self._runner_loop = None
+        self._runner = None
+        self._wakeup = None
+        self._executor = None
+        self._running = 0
+        self.stats = {
+            'scheduled': 0,
+            'cancelled': 0,
+            'fired': 0,
+            'failed': 0,
+            'last_lag': 0.0,
+            'max_lag': 0.0,
+            'total_lag': 0.0,
+        }
+
+    def bind_loop(self, loop):
+        """
+        Run the scheduler on the given (running) event loop from now on.
+
+        Args:
+            loop: The ASGI server event loop
+        """
+        with self._lock:
+            self._loop = loop
+
+    def schedule(self, key, delay_seconds, func, *args):
+        """
+        Call func(*args) after delay_seconds, replacing any pending timer for key.
+
+        Args:
+            key: Timer key (e.g. the room ID)
+            delay_seconds: Delay in seconds
+            func: Blocking callable, run in the scheduler's thread pool
+            *args: Arguments for func
+        """
+        entry = [time.monotonic() + delay_seconds, next(self._seq), key, func, args, False]
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                old_entry[CANCELLED] = True
+                self.stats['cancelled'] += 1
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            self.stats['scheduled'] += 1
+            self._compact()
+        self._wake()
+
+    def cancel(self, key):
+        """
+        Cancel the pending timer for key. Returns whether a timer was cancelled.
+
+        Args:
+            key: Timer key
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            entry[CANCELLED] = True
+            self.stats['cancelled'] += 1
+            self._compact()
+        return True
+
+    def close(self):
+        """
+        Drop pending timers and stop the runner, the scheduler's own loop thread
+        (if it started one) and the worker pool.
+        """
+        with self._lock:
+            self._heap = []
+            self._entries.clear()
+            loop, thread, runner = self._runner_loop, self._thread, self._runner
+            self._runner_loop = self._runner = self._thread = None
+            if thread is not None:
+                self._loop = None
+        if loop is not None and loop.is_running() and runner is not None:
+            asyncio.run_coroutine_threadsafe(self._stop_runner(runner), loop).result()
+        if thread is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def get_stats(self):
+        """
+        Return scheduler metrics: counters, pending and running timers, and timer
+        lag (seconds between a deadline and its callback being started).
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._entries)
+            stats['running'] = self._running
+        stats['avg_lag'] = stats['total_lag'] / stats['fired'] if stats['fired'] else 0.0
+        return stats
+
+    def _compact(self):
+        # Drop cancelled entries once they make up most of the heap
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._heap = [entry for entry in self._heap if not entry[CANCELLED]]
+            heapq.heapify(self._heap)
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None or self._loop.is_closed() or not self._loop.is_running():
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name='round-scheduler', daemon=True)
+                self._thread.start()
+                self._loop = loop
+            loop = self._loop
+            start_runner = self._runner_loop is not loop
+            self._runner_loop = loop
+        if start_runner:
+            loop.call_soon_threadsafe(self._start_runner, loop)
+        return loop
+
+    def _wake(self):
+        loop = self._get_loop()
+        loop.call_soon_threadsafe(self._notify, loop)
+
+    def _start_runner(self, loop):
+        self._wakeup = asyncio.Event()
+        self._runner = loop.create_task(self._run(loop))
+
+    def _notify(self, loop):
+        if self._runner_loop is loop and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self, loop):
+        wakeup = self._wakeup
+        while self._runner_loop is loop:
+            wakeup.clear()
+            now = time.monotonic()
+            due_entries = []
+            with self._lock:
+                while self._heap and (self._heap[0][CANCELLED] or self._heap[0][DUE] <= now):
+                    entry = heapq.heappop(self._heap)
+                    if entry[CANCELLED]:
+                        continue
+                    del self._entries[entry[KEY]]
+                    due_entries.append(entry)
+                timeout = self._heap[0][DUE] - now if self._heap else None
+            for entry in due_entries:
+                loop.create_task(self._fire(loop, entry))
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _stop_runner(self, runner):
+        runner.cancel()
+        try:
+            await runner
+        except asyncio.CancelledError:
+            pass
+
+    async def _fire(self, loop, entry):
+        if self._executor is None:
+            workers = self.max_workers or getattr(settings, 'ROUND_SCHEDULER_WORKERS', 4)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='round-worker')
+        lag = max(time.monotonic() - entry[DUE], 0.0)
+        with self._lock:
+            self._running += 1
+            self.stats['fired'] += 1
+            self.stats['last_lag'] = lag
+            self.stats['max_lag'] = max(self.stats['max_lag'], lag)
+            self.stats['total_lag'] += lag
+        try:
+            await loop.run_in_executor(self._executor, entry[FUNC], *entry[ARGS])
+        except Exception as e:
+            # Log error but keep the scheduler running
+            import traceback
+            with self._lock:
+                self.stats['failed'] += 1
+            print(f"Error running scheduled task {entry[KEY]}: {e}")
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                self._running -= 1
+
+
+round_scheduler = RoundScheduler()
@@ -0,0 +1,218 @@
+"""
+Pure-Python scoring engine for a single game round.
+
+Works on plain dicts so it can be used (and tested) without the database.
+Scoring rules:
+- If answer doesn't start with the letter: 0 points
+- If only one player answered a category: 15 points
+- If answer is unique (only one player has it): 10 points
+- If answer is repeating (multiple players have it): 5 points each
+"""
+
+ONLY_ANSWER_POINTS = 15
+UNIQUE_ANSWER_POINTS = 10
+REPEATED_ANSWER_POINTS = 5
+
+
+def normalize_answer(answer, letter):
+    """
+    Returns the comparable form of an answer, or None if it scores nothing.
+
+    Args:
+        answer: Raw answer value as submitted by the player
+        letter: Round letter (uppercase)
+    """
+    if not answer or not isinstance(answer, str):
+        return None
+    answer_clean = answer.strip()
+    # Check if answer starts with the correct letter
+    if answer_clean and answer_clean[0].upper() == letter:
+        return answer_clean.lower()
+    return None
+
+
+def build_histograms(round_answers, letter):
+    """
+    Builds per-category answer histograms in a single pass.
+
+    Args:
+        round_answers: Dictionary mapping player key to that player's answers dict
+        letter: Round letter
+
+    Returns:
+        Tuple (normalized, histograms) where normalized maps player key to
+        {game_type: normalized answer} for valid answers only, and histograms
+        maps every game type seen in the round to {normalized answer: count}.
+    """
+    letter = letter.upper()
+    normalized = {}
+    histograms = {}
+    for key, answers in round_answers.items():
+        player_normalized = {}
+        for game_type, answer in answers.items():
+            histogram = histograms.setdefault(game_type, {})
+            answer_norm = normalize_answer(answer, letter)
+            if answer_norm is None:
+                continue
+            player_normalized[game_type] = answer_norm
+            histogram[answer_norm] = histogram.get(answer_norm, 0) + 1
+        normalized[key] = player_normalized
+    return normalized, histograms
+
+
+def category_points(answer_norm, histogram, valid_count):
+    """
+    Returns points for one normalized answer given its category histogram.
+
+    Args:
+        answer_norm: Normalized answer, or None if the answer is not valid
+        histogram: Dictionary mapping normalized answer to number of players
+        valid_count: Number of valid answers in the category
+    """
+    if answer_norm is None:
+        return 0
+    if valid_count == 1:
+        return ONLY_ANSWER_POINTS
+    if histogram.get(answer_norm, 0) == 1:
+        return UNIQUE_ANSWER_POINTS
+    return REPEATED_ANSWER_POINTS
+
+
+def points_from_histograms(normalized, histograms):
+    """
+    Materializes per-player points from normalized answers and histograms.
+
+    Args:
+        normalized: Dictionary mapping player key to {game_type: normalized answer}
+        histograms: Dictionary mapping game type to {normalized answer: count}
+
+    Returns:
+        Dictionary mapping player key to {'points': int, 'points_per_category': dict}
+    """
+    valid_counts = {
+        game_type: sum(histogram.values())
+        for game_type, histogram in histograms.items()
+    }
+    results = {}
+    for key, player_normalized in normalized.items():
+        points_per_category = {}
+        for game_type, histogram in histograms.items():
+            points_per_category[game_type] = category_points(
+                player_normalized.get(game_type), histogram, valid_counts[game_type]
+            )
+        results[key] = {
+            'points': sum(points_per_category.values()),
+            'points_per_category': points_per_category,
+        }
+    return results
+
+
+def score_round(round_answers, letter):
+    """
+    Scores a complete round.
+
+    Args:
+        round_answers: Dictionary mapping player key (e.g. PlayerAnswer id) to
+            that player's answers dict ({game_type: answer})
+        letter: Round letter
+
+    Returns:
+        Dictionary mapping player key to {'points': int, 'points_per_category': dict}
+    """
+    normalized, histograms = build_histograms(round_answers, letter)
+    return points_from_histograms(normalized, histograms)
+
+
+def empty_state():
+    """
+    Returns an empty incremental scoring state.
+
+    The state is a JSON-serializable dict with:
+        answers: number of submissions folded in (resubmissions not counted)
+        category_counts: game type -> number of submissions containing it
+        histograms: game type -> {normalized answer: count}
+
+    It holds nothing per player, so it stays O(categories x distinct answers);
+    a resubmission is undone from the player's previous answers.
+    """
+    return {'answers': 0, 'category_counts': {}, 'histograms': {}}
+
+
+def normalize_answers(answers, letter):
+    """
+    Returns {game_type: normalized answer or None} for one player's answers.
+
+    Args:
+        answers: Player's answers dict ({game_type: answer})
+        letter: Round letter
+    """
+    letter = letter.upper()
+    return {game_type: normalize_answer(answer, letter) for game_type, answer in answers.items()}
+
+
+def _add_contribution(state, contribution):
+    for game_type, answer_norm in contribution.items():
+        state['category_counts'][game_type] = state['category_counts'].get(game_type, 0) + 1
+        histogram = state['histograms'].setdefault(game_type, {})
+        if answer_norm is not None:
+            histogram[answer_norm] = histogram.get(answer_norm, 0) + 1
+
+
+def _remove_contribution(state, contribution):
+    for game_type, answer_norm in contribution.items():
+        histogram = state['histograms'].get(game_type, {})
+        if answer_norm is not None and answer_norm in histogram:
+            histogram[answer_norm] -= 1
+            if histogram[answer_norm] <= 0:
+                del histogram[answer_norm]
+        state['category_counts'][game_type] = state['category_counts'].get(game_type, 0) - 1
+        if state['category_counts'][game_type] <= 0:
+            # No submission mentions this category anymore
+            del state['category_counts'][game_type]
+            state['histograms'].pop(game_type, None)
+
+
+def apply_submission(state, answers, letter, previous_answers=None):
+    """
+    Adds one player's answers to an incremental scoring state, replacing
+    their previous answers on a resubmission. Runs in O(categories)
+    regardless of the number of players.
+
+    Args:
+        state: Incremental scoring state (see empty_state), updated in place
+        answers: Player's answers dict ({game_type: answer})
+        letter: Round letter
+        previous_answers: The answers the player submitted before (already in
+            the state), or None for a first submission
+    """
+    for field, value in empty_state().items():
+        state.setdefault(field, value)
+    if previous_answers is None:
+        state['answers'] += 1
+    else:
+        _remove_contribution(state, normalize_answers(previous_answers, letter))
+    _add_contribution(state, normalize_answers(answers, letter))
+    return state
+
+
+def materialize_state(state, round_answers, letter):
+    """
+    Computes final points from an incremental scoring state.
+
+    Args:
+        state: Incremental scoring state holding exactly round_answers
+        round_answers: Dictionary mapping player key to that player's answers dict
+        letter: Round letter
+
+    Returns:
+        Dictionary mapping player key to {'points': int, 'points_per_category': dict}
+    """
+    normalized = {
+        key: {
+            game_type: answer_norm
+            for game_type, answer_norm in normalize_answers(answers, letter).items()
+            if answer_norm is not None
+        }
+        for key, answers in round_answers.items()
+    }
+    return points_from_histograms(normalized, state.get('histograms', {}))
@@ -1,8 +1,47 @@
 from rest_framework import serializers
-from ..models import PlayerAnswer, GameSession, RoomPlayer
+from django.db.models import Count
+from ..models import PlayerAnswer, GameSession
+from ..counters import get_submission_counts
+
+
+def get_round_completeness(game_session, round_numbers=None):
+    """
+    Returns a dict mapping round number to whether all players have submitted.
+    The current round is answered from the submission counters (see
+    api.counters) in one query; other rounds cost one more grouped count,
+    regardless of the number of players or rounds.
+    
+    Args:
+        game_session: The game session object
+        round_numbers: Optional iterable of round numbers to include
+    """
+    current_round, submitted_count, total_players = get_submission_counts(game_session)
+    submitted_counts = {current_round: submitted_count} if submitted_count else {}
+    answers = PlayerAnswer.objects.filter(game_session=game_session).exclude(round_number=current_round)
+    if round_numbers is not None:
+        round_numbers = list(round_numbers)
+        answers = answers.filter(round_number__in=round_numbers)
+    if round_numbers is None or set(round_numbers) != {current_round}:
+        submitted_counts.update(
+            answers.order_by().values_list('round_number').annotate(submitted=Count('*'))
+        )
+    if round_numbers is None:
+        round_numbers = submitted_counts.keys()
+    return {
+        round_number: submitted_counts.get(round_number, 0) >= total_players
+        for round_number in round_numbers
+    }
 
 
 class PlayerAnswerSerializer(serializers.ModelSerializer):
+    """
+    Serializes a player's answers for a round. Points are hidden until all
+    players have submitted for that round.
+    
+    Pass a 'round_completeness' dict (see get_round_completeness) in the
+    serializer context to avoid per-answer COUNT queries; otherwise it is
+    computed once per round and cached in the context.
+    """
     player_username = serializers.CharField(source='player.user.username', read_only=True)
     player_game_name = serializers.CharField(source='player.user.first_name', read_only=True)
     points = serializers.SerializerMethodField()
@@ -13,31 +52,24 @@ class PlayerAnswerSerializer(serializers.ModelSerializer):
         fields = ('id', 'player', 'player_username', 'player_game_name', 'round_number', 'answers', 'points', 'points_per_category', 'submitted_at')
         read_only_fields = ('id', 'round_number', 'points', 'points_per_category', 'submitted_at')
     
+    def is_round_complete(self, obj):
+        """Check if all players have submitted for the answer's round"""
+        round_completeness = self.context.setdefault('round_completeness', {})
+        if obj.round_number not in round_completeness:
+            round_completeness.update(
+                get_round_completeness(obj.game_session, [obj.round_number])
+            )
+        return round_completeness[obj.round_number]
+    
     def get_points(self, obj):
         """Only return points if all players have submitted for current round"""
-        game_session = obj.game_session
-        room_players = game_session.room.players.all()
-        all_player_answers = PlayerAnswer.objects.filter(
-            game_session=game_session,
-            round_number=obj.round_number
-        )
-        
-        # Check if all players have submitted for this round
-        if all_player_answers.count() >= room_players.count():
+        if self.is_round_complete(obj):
             return obj.points
         return None  # Hide points until all players submit
     
     def get_points_per_category(self, obj):
         """Only return points_per_category if all players have submitted for current round"""
-        game_session = obj.game_session
-        room_players = game_session.room.players.all()
-        all_player_answers = PlayerAnswer.objects.filter(
-            game_session=game_session,
-            round_number=obj.round_number
-        )
-        
-        # Check if all players have submitted for this round
-        if all_player_answers.count() >= room_players.count():
+        if self.is_round_complete(obj):
             return obj.points_per_category
         return {}  # Hide points until all players submit
 
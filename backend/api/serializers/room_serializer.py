@@ -15,17 +15,25 @@ class RoomPlayerSerializer(serializers.ModelSerializer):
 
 
 class RoomSerializer(serializers.ModelSerializer):
+    """
+    Full room document. Load rooms with Room.objects.with_details() (or
+    utils.with_room_details) before serializing to avoid per-player queries.
+    """
     host_id = serializers.IntegerField(source='host.id', read_only=True)
     host_username = serializers.CharField(source='host.username', read_only=True)
     host_game_name = serializers.CharField(source='host.first_name', read_only=True)
     players = RoomPlayerSerializer(many=True, read_only=True)
-    player_count = serializers.IntegerField(source='players.count', read_only=True)
+    player_count = serializers.SerializerMethodField()
     game_session = GameSessionSerializer(read_only=True)
     
     class Meta:
         model = Room
         fields = ('id', 'name', 'host_id', 'host_username', 'host_game_name', 
                   'created_at', 'is_active', 'players', 'player_count', 'game_session')
+    
+    def get_player_count(self, obj):
+        """Count players from the (prefetched) players list instead of a COUNT query."""
+        return len(obj.players.all())
 
 
 class CreateRoomSerializer(serializers.ModelSerializer):
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .models import Room, RoomPlayer, GameSession, PlayerAnswer
+from .answer_drafts import discard_pending_drafts
+from .counters import add_players, add_submissions, remove_player_submissions
+from .room_cache import bump_room_version
+from .token_auth import invalidate_cached_user
+
+
+@receiver([post_save, post_delete], sender=Room)
+def room_changed(sender, instance, **kwargs):
+    """Invalidate the cached room snapshot when the room changes."""
+    bump_room_version(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=RoomPlayer)
+@receiver([post_save, post_delete], sender=GameSession)
+def room_member_changed(sender, instance, **kwargs):
+    """Invalidate the cached room snapshot when its players or game session change."""
+    bump_room_version(instance.room_id)
+
+
+@receiver(post_save, sender=RoomPlayer)
+def player_joined(sender, instance, created, **kwargs):
+    """Count a new player in Room.player_count."""
+    if created:
+        add_players(instance.room_id, 1)
+
+
+@receiver(pre_delete, sender=RoomPlayer)
+def player_leaving(sender, instance, **kwargs):
+    """Stop counting the answer of a player leaving mid-round, before it is deleted with them."""
+    remove_player_submissions(instance.room_id, instance.id)
+
+
+@receiver(post_delete, sender=RoomPlayer)
+def player_left(sender, instance, **kwargs):
+    """Stop counting a removed player in Room.player_count and drop their buffered drafts."""
+    add_players(instance.room_id, -1)
+    discard_pending_drafts(room_player_id=instance.id)
+
+
+@receiver(post_delete, sender=GameSession)
+def game_session_deleted(sender, instance, **kwargs):
+    """Drop the buffered drafts of a deleted game session."""
+    discard_pending_drafts(game_session_id=instance.id)
+
+
+@receiver(post_save, sender=PlayerAnswer)
+def answer_submitted(sender, instance, created, **kwargs):
+    """Count a new answer in GameSession.submitted_count (bulk inserts count themselves)."""
+    if created:
+        add_submissions(instance.game_session_id, instance.round_number, 1)
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    """Drop the user's cached WebSocket auth entries when the user changes (password, is_active, deletion)."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        # Logins only touch last_login; keep the cache warm for the connect that follows
+        return
+    invalidate_cached_user(instance.pk)
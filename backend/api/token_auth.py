@@ -0,0 +1,85 @@
+"""
+Access token authentication for WebSocket connects, with a short-lived user cache.
+
+The token is decoded and verified once (signature, expiry and token type, via
+simplejwt's AccessToken) on every connect, but the user row is only loaded
+from the database on a cache miss. Cached users are keyed by user ID, the
+token's jti and the user's auth stamp; any change to the user (password,
+is_active, deletion - see api/signals.py) replaces the stamp, so every cached
+entry of that user stops matching at once. This keeps reconnect storms (e.g.
+after a deploy) from turning into one user query per socket.
+"""
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+STAMP_KEY = 'ws_user_stamp:{user_id}'
+USER_KEY = 'ws_user:{user_id}:{stamp}:{jti}'
+
+
+def get_user_stamp(user_id):
+    """
+    Returns the user's current auth stamp, creating one if missing.
+
+    Args:
+        user_id: The user ID
+    """
+    key = STAMP_KEY.format(user_id=user_id)
+    stamp = cache.get(key)
+    if stamp is None:
+        # Time-based, so a stamp recreated after eviction never matches old entries
+        cache.add(key, time.time_ns(), timeout=None)
+        stamp = cache.get(key)
+    return stamp
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drops every cached user entry of a user (all tokens).
+
+    Args:
+        user_id: The user ID
+    """
+    cache.set(STAMP_KEY.format(user_id=user_id), time.time_ns(), timeout=None)
+
+
+def get_user_for_token(token):
+    """
+    Returns the active user an access token belongs to, or None if the token
+    is invalid or expired or the user does not exist or is inactive.
+
+    Args:
+        token: Encoded access token
+    """
+    try:
+        access_token = AccessToken(token)
+    except TokenError:
+        return None
+    user_id = access_token.get(settings.SIMPLE_JWT['USER_ID_CLAIM'])
+    if user_id is None:
+        return None
+
+    key = USER_KEY.format(
+        user_id=user_id,
+        stamp=get_user_stamp(user_id),
+        jti=access_token.get('jti') or access_token.get('iat')
+    )
+    user = cache.get(key)
+    if user is not None:
+        return user
+
+    User = get_user_model()
+    try:
+        user = User.objects.get(**{settings.SIMPLE_JWT['USER_ID_FIELD']: user_id})
+    except User.DoesNotExist:
+        return None
+    if not user.is_active:
+        return None
+    # Never cache past the token's own expiry
+    timeout = min(settings.WS_USER_CACHE_SECONDS, access_token['exp'] - int(time.time()))
+    if timeout > 0:
+        cache.set(key, user, timeout=timeout)
+    return user
@@ -1,40 +1,221 @@
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-import threading
-from .serializers.room_serializer import RoomSerializer
+from channels.db import database_sync_to_async
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+from .json_patch import make_patch
+from .room_cache import get_room_snapshot
+from .broadcasting import RoomBroadcastCoalescer, deliver, adeliver
+from .scheduler import round_scheduler
+
+# Broadcasts of a room form a chain of versions: every broadcast version gets
+# exactly one successor, claimed with cache.add, so concurrent broadcasts never
+# patch against the same base. LAST_BROADCAST_KEY only tells where to start
+# walking the chain. BROADCAST_SNAPSHOT_KEY holds a broadcast's document (and
+# the version before it) until its successor has patched against it; a link is
+# deleted once the chain has moved two versions past it
+LAST_BROADCAST_KEY = 'room_last_broadcast:{room_id}'
+NEXT_BROADCAST_KEY = 'room_next_broadcast:{room_id}:{version}'
+BROADCAST_SNAPSHOT_KEY = 'room_broadcast_snapshot:{room_id}:{version}'
+
+# Chain links followed before giving up and sending a full room_update
+MAX_BROADCAST_CHAIN_STEPS = 16
+
+# Returned by claim_broadcast_base for a version that was already broadcast,
+# or that a newer broadcast has overtaken
+ALREADY_BROADCAST = 'already_broadcast'
+
+
+def claim_broadcast_base(room_id, version, snapshot):
+    """
+    Append a room version to the room's broadcast chain and return the
+    version it follows, so the patch base and the new version advance together.
+
+    Returns (base_version, base_snapshot) if this broadcast is the successor of
+    base_version, ALREADY_BROADCAST if this version or a newer one was already
+    broadcast, or None if there is no usable base (first broadcast, expired
+    chain, or too many concurrent broadcasts).
+
+    Args:
+        room_id: The room ID
+        version: Room version being broadcast
+        snapshot: Snapshot JSON bytes of that version
+    """
+    timeout = settings.ROOM_SNAPSHOT_TIMEOUT
+    last_broadcast_key = LAST_BROADCAST_KEY.format(room_id=room_id)
+    snapshot_key = BROADCAST_SNAPSHOT_KEY.format(room_id=room_id, version=version)
+    if not cache.add(snapshot_key, (None, snapshot), timeout=timeout):
+        # Broadcast (or being broadcast) by someone else
+        return ALREADY_BROADCAST
+    
+    base_version = cache.get(last_broadcast_key)
+    if base_version is None:
+        # Start the chain (or follow whoever just started it)
+        if cache.add(last_broadcast_key, version, timeout=timeout):
+            return None
+        base_version = cache.get(last_broadcast_key)
+    
+    for _ in range(MAX_BROADCAST_CHAIN_STEPS):
+        if base_version is None:
+            return None
+        if base_version >= version:
+            cache.delete(snapshot_key)
+            return ALREADY_BROADCAST
+        if cache.add(NEXT_BROADCAST_KEY.format(room_id=room_id, version=base_version), version, timeout=timeout):
+            # Only a hint: a slower successor may set an older version, walking corrects it
+            cache.set(last_broadcast_key, version, timeout=timeout)
+            base_snapshot_key = BROADCAST_SNAPSHOT_KEY.format(room_id=room_id, version=base_version)
+            base_entry = cache.get(base_snapshot_key)
+            # No other broadcast patches against this base
+            cache.delete(base_snapshot_key)
+            if base_entry is None:
+                return None
+            previous_version, base_snapshot = base_entry
+            if previous_version is not None:
+                # Walks start at base_version or later from now on
+                cache.delete(NEXT_BROADCAST_KEY.format(room_id=room_id, version=previous_version))
+            cache.set(snapshot_key, (base_version, snapshot), timeout=timeout)
+            return base_version, base_snapshot
+        base_version = cache.get(NEXT_BROADCAST_KEY.format(room_id=room_id, version=base_version))
+    return None
+
+
+def build_room_message(room, full=False):
+    """
+    Build the channel layer event for a room update.
+    
+    Returns a 'room_patch' event with only the fields that changed since the
+    previous broadcast of the room (a JSON Patch from base_version to
+    version, see claim_broadcast_base), or a full 'room_update' event when
+    there is no usable previous snapshot or the patch would not be smaller
+    than the full document. Returns None if this version was already
+    broadcast (nothing changed) or a newer one overtook it, unless full is set.
+    Clients that miss a version fall back to a full resync.
+    
+    Args:
+        room: The room object, or its ID to load the room only on a cache miss
+        full: Always build a full 'room_update' event (still added to the
+            broadcast chain)
+    """
+    room_id = getattr(room, 'pk', room)
+    version, snapshot = get_room_snapshot(room_id, room if room_id is not room else None)
+    
+    base = claim_broadcast_base(room_id, version, snapshot)
+    if base == ALREADY_BROADCAST and not full:
+        return None
+    room_data = json.loads(snapshot)
+    
+    if not full and base is not None:
+        base_version, base_snapshot = base
+        ops = make_patch(json.loads(base_snapshot), room_data)
+        if len(json.dumps(ops)) < len(snapshot):
+            return {
+                'type': 'room_patch',
+                'version': version,
+                'base_version': base_version,
+                'ops': ops
+            }
+    
+    return {
+        'type': 'room_update',
+        'data': room_data,
+        'version': version
+    }
+
+
+def send_room_update(room_id, room=None):
+    """
+    Build a room update event and hand it to the broadcast outbox right away.
+    Callers should go through broadcast_room_update, which waits for the
+    transaction to commit and coalesces bursts.
+    
+    Args:
+        room_id: The room ID
+        room: Optional room object (saves a reload on a snapshot cache miss)
+    """
+    # Send room update (as a patch against the last broadcast when possible)
+    message = build_room_message(room if room is not None else room_id)
+    if message is not None:
+        deliver(f'room_{room_id}', message)
+
+
+# Merges room updates per room within ROOM_BROADCAST_COALESCE_SECONDS
+room_broadcaster = RoomBroadcastCoalescer(send_room_update)
+
+
+def player_removed_event(removed_user_id):
+    return {
+        'type': 'player_removed_notification',
+        'removed_user_id': removed_user_id
+    }
+
+
+def room_deleted_event(room_id):
+    return {
+        'type': 'room_deleted_notification',
+        'room_id': room_id
+    }
+
+
+def game_started_event(room, game_session):
+    from .serializers.game_session_serializer import GameSessionSerializer
+    return {
+        'type': 'game_started_notification',
+        'room_id': str(room.id),
+        'game_session': GameSessionSerializer(game_session).data
+    }
+
+
+def player_submitted_event(player_username, all_players_submitted):
+    return {
+        'type': 'player_submitted_notification',
+        'player_username': player_username,
+        'all_players_submitted': all_players_submitted
+    }
+
+
+def round_closed_event(round_number):
+    return {
+        'type': 'round_closed_notification',
+        'round_number': round_number
+    }
+
+
+def round_results_event(round_number, round_scores, total_scores=None, game_completed=False):
+    event = {
+        'type': 'round_results',
+        'round_number': round_number,
+        'round_scores': round_scores
+    }
+    if total_scores is not None:
+        # String keys, as in the GetPlayerScoresView response
+        event['total_scores'] = {str(room_player_id): points for room_player_id, points in total_scores.items()}
+        event['game_completed'] = game_completed
+    return event
 
 
 def broadcast_room_update(room, removed_user_id=None):
     """
     Broadcast room update to all WebSocket clients in the room.
     
+    The update is queued once the current transaction commits (so clients never
+    see uncommitted state) and sent without blocking the caller. Updates for the
+    same room within ROOM_BROADCAST_COALESCE_SECONDS are sent as a single event
+    built from the room state at send time.
+    
     Args:
         room: The room object to broadcast
         removed_user_id: Optional user ID of the player who was removed (for notification)
     """
-    channel_layer = get_channel_layer()
-    if channel_layer:
-        room_serializer = RoomSerializer(room)
-        room_data = room_serializer.data
-        
-        # Send room update
-        async_to_sync(channel_layer.group_send)(
-            f'room_{room.id}',
-            {
-                'type': 'room_update',
-                'data': room_data
-            }
-        )
-        
-        # If a player was removed, send a special notification
+    def send():
+        room_broadcaster.room_update(room.id, room)
+        # If a player was removed, send a special notification (after the room update)
         if removed_user_id:
-            async_to_sync(channel_layer.group_send)(
-                f'room_{room.id}',
-                {
-                    'type': 'player_removed_notification',
-                    'removed_user_id': removed_user_id
-                }
-            )
+            room_broadcaster.notify(room.id, player_removed_event(removed_user_id))
+    
+    transaction.on_commit(send)
 
 
 def broadcast_room_deleted(room_id):
@@ -44,16 +225,8 @@ def broadcast_room_deleted(room_id):
     Args:
         room_id: The room ID (as string) that was deleted
     """
-    channel_layer = get_channel_layer()
-    if channel_layer:
-        # Send room deleted notification to all clients in the room
-        async_to_sync(channel_layer.group_send)(
-            f'room_{room_id}',
-            {
-                'type': 'room_deleted_notification',
-                'room_id': room_id
-            }
-        )
+    # Send room deleted notification to all clients in the room
+    transaction.on_commit(lambda: room_broadcaster.notify(room_id, room_deleted_event(room_id)))
 
 
 def broadcast_game_started(room, game_session):
@@ -64,21 +237,9 @@ def broadcast_game_started(room, game_session):
         room: The room object
         game_session: The game session object with the final letter
     """
-    channel_layer = get_channel_layer()
-    if channel_layer:
-        from .serializers.game_session_serializer import GameSessionSerializer
-        game_serializer = GameSessionSerializer(game_session)
-        game_data = game_serializer.data
-        
-        # Send game started notification to all clients in the room
-        async_to_sync(channel_layer.group_send)(
-            f'room_{room.id}',
-            {
-                'type': 'game_started_notification',
-                'room_id': str(room.id),
-                'game_session': game_data
-            }
-        )
+    # Serialize now, while game_session reflects this request's changes
+    event = game_started_event(room, game_session)
+    transaction.on_commit(lambda: room_broadcaster.notify(room.id, event))
 
 
 def broadcast_player_submitted(room, player_username, all_players_submitted=False):
@@ -90,143 +251,297 @@ def broadcast_player_submitted(room, player_username, all_players_submitted=Fals
         player_username: Username of the player who submitted
         all_players_submitted: Whether all players have now submitted
     """
-    channel_layer = get_channel_layer()
-    if channel_layer:
-        async_to_sync(channel_layer.group_send)(
-            f'room_{room.id}',
-            {
-                'type': 'player_submitted_notification',
-                'player_username': player_username,
-                'all_players_submitted': all_players_submitted
-            }
-        )
+    event = player_submitted_event(player_username, all_players_submitted)
+    transaction.on_commit(lambda: room_broadcaster.notify(room.id, event))
 
 
-def advance_round_internal(room_id_str):
+def broadcast_round_closed(room, round_number):
     """
-    Internal function to advance round. Called from thread with proper Django setup.
+    Broadcast that the server closed a round whose timer ran out (all players
+    now have scored answers for it).
     
     Args:
-        room_id_str: Room ID as string
+        room: The room object
+        round_number: The round that was closed
+    """
+    event = round_closed_event(round_number)
+    transaction.on_commit(lambda: room_broadcaster.notify(room.id, event))
+
+
+def broadcast_round_results(room_id, round_number, round_scores, total_scores=None, game_completed=False):
+    """
+    Broadcast the scored answers of a finished round (and optionally the
+    players' running totals), so clients don't all fetch them at once.
+    
+    Args:
+        room_id: The room ID
+        round_number: The scored round
+        round_scores: Serialized PlayerAnswer data of the round (PlayerAnswerSerializer)
+        total_scores: Optional dictionary mapping RoomPlayer id to total points
+        game_completed: Whether the game session is completed
+    """
+    event = round_results_event(round_number, round_scores, total_scores, game_completed)
+    transaction.on_commit(lambda: room_broadcaster.notify(room_id, event))
+
+
+async def abroadcast_room_update(room, removed_user_id=None, full=False):
+    """
+    Async variant of broadcast_room_update for code running on the event loop.
+    Sends immediately (not coalesced) and returns once the event is sent.
+    
+    Args:
+        room: The room object (or its ID) to broadcast
+        removed_user_id: Optional user ID of the player who was removed (for notification)
+        full: Always send a full 'room_update' event
+    """
+    room_id = getattr(room, 'pk', room)
+    message = await database_sync_to_async(build_room_message)(room, full)
+    if message is not None:
+        await adeliver(f'room_{room_id}', message)
+    if removed_user_id:
+        await adeliver(f'room_{room_id}', player_removed_event(removed_user_id))
+
+
+async def abroadcast_room_deleted(room_id):
+    """
+    Async variant of broadcast_room_deleted.
+    
+    Args:
+        room_id: The room ID (as string) that was deleted
+    """
+    await adeliver(f'room_{room_id}', room_deleted_event(room_id))
+
+
+async def abroadcast_game_started(room, game_session):
     """
-    import os
-    import django
+    Async variant of broadcast_game_started.
     
-    # Ensure Django is set up in this thread
-    if not os.environ.get('DJANGO_SETTINGS_MODULE'):
-        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
-        django.setup()
+    Args:
+        room: The room object
+        game_session: The game session object with the final letter
+    """
+    await adeliver(f'room_{room.id}', game_started_event(room, game_session))
+
+
+async def abroadcast_player_submitted(room, player_username, all_players_submitted=False):
+    """
+    Async variant of broadcast_player_submitted.
     
-    from django.db import transaction, connection, close_old_connections
-    from .models import Room, GameSession, RoomPlayer, PlayerAnswer
+    Args:
+        room: The room object
+        player_username: Username of the player who submitted
+        all_players_submitted: Whether all players have now submitted
+    """
+    await adeliver(f'room_{room.id}', player_submitted_event(player_username, all_players_submitted))
+
+
+def advance_round(room_id_str, round_number=None):
+    """
+    Advance the room's game session to the next round (or complete it) if all
+    players have submitted. Runs in its own transaction, or as part of the
+    caller's. Returns whether the game session was advanced.
+    
+    Args:
+        room_id_str: Room ID as string
+        round_number: Only advance if this is still the current round (so a
+            late or repeated deadline never skips a round)
+    """
+    from .models import Room, GameSession
+    from .serializers.player_answer_serializer import get_round_completeness
     import random
     import string
     
-    print(f"advance_round_internal called for room {room_id_str}")
-    
-    try:
-        # Close old connections and ensure fresh connection
-        close_old_connections()
+    with transaction.atomic():
+        # Refresh room and game session from database
+        room_obj = Room.objects.select_for_update().get(id=room_id_str, is_active=True)
+        game_session = GameSession.objects.select_for_update().get(room=room_obj)
+        
+        # Check if game is still active and not completed
+        if game_session.is_completed:
+            return False
+        if round_number is not None and game_session.current_round != round_number:
+            return False
+        
+        # Check if all players have submitted
+        current_round = game_session.current_round
+        if not get_round_completeness(game_session, [current_round])[current_round]:
+            # Not all players submitted, cancel advancement
+            game_session.round_advance_scheduled = False
+            game_session.save()
+            return False
         
-        with transaction.atomic():
-            # Refresh room and game session from database
-            room_obj = Room.objects.select_for_update().get(id=room_id_str, is_active=True)
-            game_session = GameSession.objects.select_for_update().get(room=room_obj)
+        # Advance to next round
+        if game_session.current_round < game_session.total_rounds:
+            old_round = game_session.current_round
+            game_session.current_round += 1
             
-            # Check if game is still active and not completed
-            if game_session.is_completed:
-                close_old_connections()
-                return
+            # Generate random letter for new round
+            common_letters = list(string.ascii_uppercase)
+            rare_letters = ['Q', 'X', 'Y']
+            for letter in rare_letters:
+                if letter in common_letters:
+                    common_letters.remove(letter)
             
-            # Check if all players have submitted
-            room_players = RoomPlayer.objects.filter(room=room_obj)
-            all_player_answers = PlayerAnswer.objects.filter(
-                game_session=game_session,
-                round_number=game_session.current_round
-            )
+            round_letter = random.choice(common_letters)
+            game_session.letter = round_letter
+            game_session.round_letters.append(round_letter)
+            game_session.round_advance_scheduled = False
+            # Set round start time for timer
+            game_session.round_start_time = timezone.now()
+            game_session.save()
+            schedule_round_expiry(room_obj, game_session)
             
-            if all_player_answers.count() < room_players.count():
-                # Not all players submitted, cancel advancement
-                game_session.round_advance_scheduled = False
-                game_session.save()
-                close_old_connections()
-                return
+            # Broadcast room update to advance to next round
+            print(f"Successfully advanced room {room_id_str} from round {old_round} to round {game_session.current_round} with letter {round_letter}")
+            broadcast_room_update(room_obj)
+        else:
+            # Game completed
+            print(f"Game completed for room {room_id_str}")
+            game_session.is_completed = True
+            game_session.round_advance_scheduled = False
+            game_session.save()
             
-            # Advance to next round
-            if game_session.current_round < game_session.total_rounds:
-                old_round = game_session.current_round
-                game_session.current_round += 1
-                
-                # Generate random letter for new round
-                common_letters = list(string.ascii_uppercase)
-                rare_letters = ['Q', 'X', 'Y']
-                for letter in rare_letters:
-                    if letter in common_letters:
-                        common_letters.remove(letter)
-                
-                round_letter = random.choice(common_letters)
-                game_session.letter = round_letter
-                game_session.round_letters.append(round_letter)
-                game_session.round_advance_scheduled = False
-                game_session.save()
-                
-                # Broadcast room update to advance to next round
-                print(f"Successfully advanced room {room_id_str} from round {old_round} to round {game_session.current_round} with letter {round_letter}")
-                broadcast_room_update(room_obj)
-            else:
-                # Game completed
-                print(f"Game completed for room {room_id_str}")
-                game_session.is_completed = True
-                game_session.round_advance_scheduled = False
-                game_session.save()
-                
-                # Broadcast room update
-                broadcast_room_update(room_obj)
-                
-        # Close connection after transaction
+            # Broadcast room update
+            broadcast_room_update(room_obj)
+        return True
+
+
+def advance_round_internal(room_id_str, round_number=None):
+    """
+    Internal function to advance round. Called from a worker thread, so it
+    manages its own database connection and never raises.
+    
+    Args:
+        room_id_str: Room ID as string
+        round_number: Only advance if this is still the current round
+    """
+    from django.db import close_old_connections
+    
+    print(f"advance_round_internal called for room {room_id_str}")
+    
+    try:
+        # Close old connections and ensure fresh connection
         close_old_connections()
+        advance_round(room_id_str, round_number)
     except Exception as e:
         # Log error but don't crash
         import traceback
         print(f"Error advancing round for room {room_id_str}: {e}")
         traceback.print_exc()
+    finally:
         close_old_connections()
 
 
-# Store active timers to prevent garbage collection
-_active_timers = {}
+def process_round_deadlines_internal():
+    """
+    Apply due round deadlines (see api.round_deadlines). Called from a round
+    scheduler worker thread, so it manages its own database connection and
+    never raises.
+    """
+    from django.db import close_old_connections
+    from .round_deadlines import process_due_deadlines
+    
+    try:
+        close_old_connections()
+        process_due_deadlines()
+    except Exception as e:
+        # Log error but don't crash; the deadlines stay in the database
+        import traceback
+        print(f"Error processing round deadlines: {e}")
+        traceback.print_exc()
+    finally:
+        close_old_connections()
+
 
 def schedule_round_advancement(room, delay_seconds=10):
     """
     Schedule automatic round advancement after delay.
+    Replaces any advancement already scheduled for the room's current round.
+    
+    The deadline is stored in the database, so any worker can apply it (even if
+    this one dies); the local timer only makes this worker check right on time.
     
     Args:
         room: The room object
         delay_seconds: Delay in seconds before advancing (default 10)
     """
+    from .models import GameSession
+    from .round_deadlines import schedule_round_deadline
+    
     room_id_str = str(room.id)
+    print(f"Scheduling round advancement for room {room_id_str} in {delay_seconds} seconds")
+    schedule_round_deadline(GameSession.objects.get(room=room), delay_seconds)
+    transaction.on_commit(
+        lambda: round_scheduler.schedule(room_id_str, delay_seconds, process_round_deadlines_internal)
+    )
+
+
+def get_round_end_time(game_session):
+    """
+    Returns when the current round's timer runs out, or None if no round timer is running.
     
-    # Cancel any existing timer for this room
-    if room_id_str in _active_timers:
-        old_timer = _active_timers[room_id_str]
-        old_timer.cancel()
+    Args:
+        game_session: The game session object
+    """
+    if not game_session.round_start_time:
+        return None
+    return game_session.round_start_time + timedelta(seconds=game_session.round_timer_seconds)
+
+
+def is_round_expired(game_session):
+    """
+    Returns whether the current round's timer (plus ROUND_EXPIRY_GRACE_SECONDS)
+    has run out, so the server closes or has closed the round.
     
-    # Schedule the advancement
-    print(f"Scheduling round advancement for room {room_id_str} in {delay_seconds} seconds")
-    timer = threading.Timer(delay_seconds, advance_round_internal, args=(room_id_str,))
-    timer.daemon = True  # Allow thread to exit when main program exits
+    Args:
+        game_session: The game session object
+    """
+    round_end_time = get_round_end_time(game_session)
+    if round_end_time is None:
+        return False
+    return timezone.now() > round_end_time + timedelta(seconds=settings.ROUND_EXPIRY_GRACE_SECONDS)
+
+
+def schedule_round_expiry(room, game_session):
+    """
+    Schedule closing the current round when its timer runs out, plus
+    ROUND_EXPIRY_GRACE_SECONDS for draft saves still in flight. Replaces any
+    expiry already scheduled for the round (e.g. when the timer is shortened).
     
-    # Store timer to prevent garbage collection
-    _active_timers[room_id_str] = timer
+    Args:
+        room: The room object
+        game_session: The game session object (with round_start_time set)
+    """
+    from .models import RoundDeadline
+    from .round_deadlines import schedule_round_deadline
     
-    timer.start()
-    print(f"Round advancement timer started for room {room_id_str}")
+    round_end_time = get_round_end_time(game_session)
+    if round_end_time is None:
+        return
+    delay_seconds = max((round_end_time - timezone.now()).total_seconds(), 0) + settings.ROUND_EXPIRY_GRACE_SECONDS
+    schedule_round_deadline(game_session, delay_seconds, kind=RoundDeadline.EXPIRE)
+    room_id_str = str(room.id)
+    transaction.on_commit(
+        lambda: round_scheduler.schedule(f'{room_id_str}:expire', delay_seconds, process_round_deadlines_internal)
+    )
+
+
+_deadline_poller_started = False
+
+
+def start_round_deadline_poller():
+    """
+    Periodically apply due round deadlines from this worker (every
+    ROUND_DEADLINE_POLL_SECONDS), picking up deadlines of workers that died.
+    Safe to call more than once.
+    """
+    global _deadline_poller_started
+    if _deadline_poller_started:
+        return
+    _deadline_poller_started = True
     
-    # Clean up timer reference after it executes
-    def cleanup_timer():
-        if room_id_str in _active_timers:
-            del _active_timers[room_id_str]
+    def poll():
+        process_round_deadlines_internal()
+        round_scheduler.schedule('round_deadline_poller', settings.ROUND_DEADLINE_POLL_SECONDS, poll)
     
-    cleanup_timer_thread = threading.Timer(delay_seconds + 1, cleanup_timer)
-    cleanup_timer_thread.daemon = True
-    cleanup_timer_thread.start()
+    round_scheduler.schedule('round_deadline_poller', settings.ROUND_DEADLINE_POLL_SECONDS, poll)
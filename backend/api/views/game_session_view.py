@@ -2,15 +2,29 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 import random
 import string
-from ..models import Room, GameSession, RoomPlayer, PlayerAnswer, GAME_TYPE_CHOICES
+from ..models import (
+    Room, GameSession, RoomPlayer, PlayerAnswer, RoundScoreState, PlayerScore, RoundDeadline, AnswerDraft,
+    GAME_TYPE_CHOICES
+)
 from ..serializers.game_session_serializer import GameSessionSerializer, UpdateGameSessionSerializer
-from ..serializers.player_answer_serializer import SubmitAnswerSerializer, PlayerAnswerSerializer
-from ..utils import broadcast_room_update, broadcast_game_started
+from ..serializers.player_answer_serializer import (
+    SubmitAnswerSerializer, PlayerAnswerSerializer, get_round_completeness
+)
+from ..utils import (
+    broadcast_room_update, broadcast_game_started, broadcast_round_closed, broadcast_round_results,
+    schedule_round_expiry, is_round_expired
+)
+from ..answer_drafts import clean_answers, save_draft, get_drafts, clear_drafts
+from ..scoring import apply_submission, empty_state, materialize_state
+from ..player_scores import record_round_points
+from ..counters import add_submissions, reset_submissions
 
 
 class GetGameTypesView(APIView):
@@ -67,9 +81,7 @@ class UpdateGameSessionView(APIView):
         
         if serializer.is_valid():
             serializer.save()
-            # Refresh room to get updated game session
-            room.refresh_from_db()
-            # Broadcast update to all clients
+            # Broadcast update to all clients (reloads room with updated game session)
             broadcast_room_update(room)
             # Return full game session data
             full_serializer = GameSessionSerializer(game_session)
@@ -104,8 +116,13 @@ class StartGameSessionView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Delete all previous player answers for this game session
+        # Delete all previous player answers, scores, round deadlines and drafts for this game session
         PlayerAnswer.objects.filter(game_session=game_session).delete()
+        reset_submissions(game_session.id)
+        RoundScoreState.objects.filter(game_session=game_session).delete()
+        PlayerScore.objects.filter(game_session=game_session).delete()
+        RoundDeadline.objects.filter(game_session=game_session).delete()
+        AnswerDraft.objects.filter(game_session=game_session).delete()
         
         # Reset game state for new game
         game_session.current_round = 1
@@ -142,6 +159,9 @@ class StartGameSessionView(APIView):
         
         game_session.save()
         
+        # The server closes the round when the timer runs out
+        schedule_round_expiry(room, game_session)
+        
         # Broadcast game started message to all players
         broadcast_game_started(room, game_session)
         
@@ -150,6 +170,27 @@ class StartGameSessionView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+def record_submission(game_session, player_answer, previous_answers=None):
+    """
+    Fold one player's submission into the incremental scoring state of its round.
+    Each submit costs O(categories), so the last submit only has to materialize points.
+    
+    Args:
+        game_session: The game session object
+        player_answer: The saved PlayerAnswer
+        previous_answers: The player's answers before a resubmission, or None
+    """
+    with transaction.atomic():
+        score_state, created = RoundScoreState.objects.select_for_update().get_or_create(
+            game_session=game_session,
+            round_number=player_answer.round_number
+        )
+        score_state.state = apply_submission(
+            score_state.state, player_answer.answers, game_session.letter, previous_answers
+        )
+        score_state.save(update_fields=['state', 'updated_at'])
+
+
 def recalculate_all_scores(game_session, round_number=None):
     """
     Recalculate all player scores based on the game rules:
@@ -157,95 +198,192 @@ def recalculate_all_scores(game_session, round_number=None):
     - If only one player answered a category: 15 points
     - If answer is unique (only one player has it): 10 points
     - If answer is repeating (multiple players have it): 5 points each
+    
+    Points are materialized from the round's incremental scoring state
+    (see record_submission). If that state is missing or holds a different
+    number of answers than were submitted (e.g. a player left mid-round), it is
+    rebuilt from the PlayerAnswer rows first. Results are persisted with a single bulk update,
+    the players' running totals (PlayerScore) are updated, and the results are
+    pushed to the room as a round_results message (with the totals when
+    ROUND_RESULTS_INCLUDE_TOTALS is set).
     """
-    letter = game_session.letter.upper()
     if round_number is None:
         round_number = game_session.current_round
-    all_player_answers = PlayerAnswer.objects.filter(
+    # If not all players have submitted, don't recalculate yet
+    if not get_round_completeness(game_session, [round_number])[round_number]:
+        return
+    
+    # Loaded with their players, for the round_results message
+    player_answers = list(PlayerAnswer.objects.filter(
         game_session=game_session,
         round_number=round_number
-    )
+    ).select_related('player__user').order_by('id'))
     
-    # Get all players in the room
-    room_players = RoomPlayer.objects.filter(room=game_session.room)
-    total_players = room_players.count()
+    score_state = RoundScoreState.objects.filter(
+        game_session=game_session,
+        round_number=round_number
+    ).first()
+    state = score_state.state if score_state else {}
+    if state.get('answers') != len(player_answers):
+        state = empty_state()
+        for player_answer in player_answers:
+            apply_submission(state, player_answer.answers, game_session.letter)
+        RoundScoreState.objects.update_or_create(
+            game_session=game_session,
+            round_number=round_number,
+            defaults={'state': state}
+        )
     
-    # If not all players have submitted, don't recalculate yet
-    if all_player_answers.count() < total_players:
-        return
+    results = materialize_state(
+        state, {player_answer.id: player_answer.answers for player_answer in player_answers}, game_session.letter
+    )
     
-    # Organize answers by game type
-    answers_by_type = {}
-    for player_answer in all_player_answers:
-        for game_type, answer in player_answer.answers.items():
-            if game_type not in answers_by_type:
-                answers_by_type[game_type] = []
-            
-            # Clean and validate answer
-            if not answer or not isinstance(answer, str):
-                continue
-            answer_clean = answer.strip()
-            # Check if answer starts with the correct letter
-            if answer_clean and answer_clean[0].upper() == letter:
-                answers_by_type[game_type].append({
-                    'player_answer': player_answer,
-                    'answer': answer_clean.lower()
-                })
+    # Update all player answers with recalculated points
+    for player_answer in player_answers:
+        player_answer.points = results[player_answer.id]['points']
+        player_answer.points_per_category = results[player_answer.id]['points_per_category']
+    PlayerAnswer.objects.bulk_update(player_answers, ['points', 'points_per_category'])
     
-    # Calculate points for each player and per category
-    player_points = {}
-    player_points_per_category = {}
-    for player_answer in all_player_answers:
-        player_points[player_answer] = 0
-        player_points_per_category[player_answer] = {}
+    # Keep the players' running totals in sync with the finalized round
+    total_scores = record_round_points(game_session, round_number, {
+        player_answer.player_id: player_answer.points for player_answer in player_answers
+    })
     
-    # Score each category
-    for game_type, answer_list in answers_by_type.items():
-        if len(answer_list) == 0:
-            # No valid answers for this category - all players get 0 points
-            for player_answer in all_player_answers:
-                player_points_per_category[player_answer][game_type] = 0
-            continue
-        elif len(answer_list) == 1:
-            # Only one player answered this category: 15 points
-            player_answer = answer_list[0]['player_answer']
-            player_points[player_answer] += 15
-            player_points_per_category[player_answer][game_type] = 15
-            # Other players get 0 for this category
-            for pa in all_player_answers:
-                if pa != player_answer:
-                    player_points_per_category[pa][game_type] = 0
-        else:
-            # Multiple players answered, check for duplicates
-            answer_counts = {}
-            for item in answer_list:
-                answer_lower = item['answer']
-                if answer_lower not in answer_counts:
-                    answer_counts[answer_lower] = []
-                answer_counts[answer_lower].append(item['player_answer'])
-            
-            # Initialize all players with 0 for this category
-            for player_answer in all_player_answers:
-                player_points_per_category[player_answer][game_type] = 0
-            
-            # Score based on uniqueness
-            for answer_lower, players_with_answer in answer_counts.items():
-                if len(players_with_answer) == 1:
-                    # Unique answer: 10 points
-                    player_answer = players_with_answer[0]
-                    player_points[player_answer] += 10
-                    player_points_per_category[player_answer][game_type] = 10
-                else:
-                    # Repeating answer: 5 points each
-                    for player_answer in players_with_answer:
-                        player_points[player_answer] += 5
-                        player_points_per_category[player_answer][game_type] = 5
+    # Push the results once instead of every client fetching them at the same time
+    round_scores = PlayerAnswerSerializer(
+        player_answers,
+        many=True,
+        context={'round_completeness': {round_number: True}}
+    ).data
+    broadcast_round_results(
+        game_session.room_id,
+        round_number,
+        list(round_scores),
+        total_scores if settings.ROUND_RESULTS_INCLUDE_TOTALS else None,
+        game_session.is_completed
+    )
+
+
+def close_round(game_session, round_number):
+    """
+    Close a round whose timer ran out. Players who have not submitted get their
+    saved draft (or empty answers) as their answer, the round is scored once,
+    and clients are notified. Does nothing if the round is no longer current.
+    If everyone still in the room already submitted (e.g. the only late player
+    left), the round is just scored (again; scoring is idempotent). Returns the
+    number of answers created.
     
-    # Update all player answers with recalculated points
-    for player_answer in all_player_answers:
-        player_answer.points = player_points[player_answer]
-        player_answer.points_per_category = player_points_per_category[player_answer]
-        player_answer.save()
+    Args:
+        game_session: The game session object
+        round_number: The round whose timer ran out
+    """
+    with transaction.atomic():
+        game_session = GameSession.objects.select_for_update().select_related('room').get(pk=game_session.pk)
+        if game_session.is_completed or game_session.current_round != round_number:
+            return 0
+        
+        room_player_ids = list(
+            RoomPlayer.objects.filter(room_id=game_session.room_id).values_list('id', flat=True)
+        )
+        submitted_player_ids = set(PlayerAnswer.objects.filter(
+            game_session=game_session,
+            round_number=round_number
+        ).order_by().values_list('player_id', flat=True))
+        missing_player_ids = [
+            room_player_id for room_player_id in room_player_ids
+            if room_player_id not in submitted_player_ids
+        ]
+        if not missing_player_ids:
+            # Nobody's last submit scored the round if a late player left since
+            if submitted_player_ids:
+                recalculate_all_scores(game_session, round_number)
+            return 0
+        
+        # Late players' drafts become their answers. A submit that got in
+        # anyway (no row locks on SQLite) keeps its answer and counts itself
+        drafts = get_drafts(game_session.id, round_number, missing_player_ids)
+        round_answers = PlayerAnswer.objects.filter(game_session=game_session, round_number=round_number)
+        answers_before = round_answers.count()
+        PlayerAnswer.objects.bulk_create([
+            PlayerAnswer(
+                game_session=game_session,
+                player_id=room_player_id,
+                round_number=round_number,
+                answers=clean_answers(drafts.get(room_player_id, {}), game_session.selected_types)
+            )
+            for room_player_id in missing_player_ids
+        ], ignore_conflicts=True)
+        created = round_answers.count() - answers_before
+        add_submissions(game_session.id, round_number, created)
+        # The new answers are not in the scoring state: rebuild it once
+        RoundScoreState.objects.filter(game_session=game_session, round_number=round_number).delete()
+        
+        # Score the round once for everybody
+        recalculate_all_scores(game_session, round_number)
+        
+        transaction.on_commit(lambda: clear_drafts(game_session.id, round_number, room_player_ids))
+        broadcast_round_closed(game_session.room, round_number)
+        broadcast_room_update(game_session.room)
+    return created
+
+
+class SaveDraftView(APIView):
+    """
+    API view for players to save their in-progress answers for the current round.
+    Deliberately cheap (one query and a cache write, no scoring and no broadcasts;
+    the draft reaches the database with the next batch, see api.answer_drafts).
+    Connected clients can also stream drafts over the room WebSocket
+    (draft_answers message).
+    When the round's timer runs out, the drafts of players who did not submit
+    become their answers (see close_round).
+    """
+    permission_classes = (IsAuthenticated,)
+    
+    def post(self, request, room_id):
+        try:
+            room_player = RoomPlayer.objects.select_related('room__game_session').get(
+                room_id=room_id, room__is_active=True, user=request.user
+            )
+            game_session = room_player.room.game_session
+        except RoomPlayer.DoesNotExist:
+            return Response(
+                {'error': 'You are not a member of this room.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        except GameSession.DoesNotExist:
+            return Response(
+                {'error': 'Game has not started yet.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Validate that game has started (letter is set) and the round is still open
+        if not game_session.letter:
+            return Response(
+                {'error': 'Game has not started yet.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if game_session.is_completed:
+            return Response(
+                {'error': 'Game is already completed.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if is_round_expired(game_session):
+            return Response(
+                {'error': 'Round time is over.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = SubmitAnswerSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        save_draft(
+            game_session.id,
+            game_session.current_round,
+            room_player.id,
+            clean_answers(serializer.validated_data['answers'], game_session.selected_types)
+        )
+        return Response({'round_number': game_session.current_round}, status=status.HTTP_200_OK)
 
 
 class SubmitAnswerView(APIView):
@@ -281,36 +419,47 @@ class SubmitAnswerView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # After the timer runs out the server closes the round from the drafts
+        if is_round_expired(game_session):
+            return Response(
+                {'error': 'Round time is over.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         serializer = SubmitAnswerSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        answers = serializer.validated_data['answers']
-        letter = game_session.letter.upper()
-        
         # Validate and clean answers
-        validated_answers = {}
-        for game_type, answer in answers.items():
-            if game_type not in game_session.selected_types:
-                continue
-            # Clean answer (handle None, empty strings, and non-strings)
-            if not answer or not isinstance(answer, str):
-                answer_clean = ""
-            else:
-                answer_clean = answer.strip()
-            # Store the answer as-is (we'll validate letter match during scoring)
-            validated_answers[game_type] = answer_clean
+        validated_answers = clean_answers(serializer.validated_data['answers'], game_session.selected_types)
         
         # Create or update player answer for current round (initially with 0 points)
-        player_answer, created = PlayerAnswer.objects.update_or_create(
-            game_session=game_session,
-            player=room_player,
-            round_number=game_session.current_round,
-            defaults={
-                'answers': validated_answers,
-                'points': 0  # Will be recalculated
-            }
-        )
+        with transaction.atomic():
+            # close_round creates late players' answers under the same lock: a
+            # round it closed while this request was on its way stays closed
+            game_session = GameSession.objects.select_for_update().get(pk=game_session.pk)
+            if is_round_expired(game_session):
+                return Response(
+                    {'error': 'Round time is over.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # A resubmission is taken out of the scoring state by its previous answers
+            previous_answers = PlayerAnswer.objects.filter(
+                game_session=game_session,
+                player=room_player,
+                round_number=game_session.current_round
+            ).values_list('answers', flat=True).first()
+            player_answer, created = PlayerAnswer.objects.update_or_create(
+                game_session=game_session,
+                player=room_player,
+                round_number=game_session.current_round,
+                defaults={
+                    'answers': validated_answers,
+                    'points': 0  # Will be recalculated
+                }
+            )
+            # Update the round's answer histograms incrementally
+            record_submission(game_session, player_answer, previous_answers)
         
         # Check if player completed all categories and reduce timer if needed
         if game_session.round_start_time and game_session.selected_types:
@@ -335,16 +484,14 @@ class SubmitAnswerView(APIView):
                     new_start_time = timezone.now() - timedelta(seconds=game_session.round_timer_seconds - reduce_timer_seconds)
                     game_session.round_start_time = new_start_time
                     game_session.save()
+                    # Close the round at the new end time
+                    schedule_round_expiry(room, game_session)
                     # Broadcast room update to notify all clients of timer change
                     broadcast_room_update(room)
         
         # Check if all players have submitted for current round
-        room_players = RoomPlayer.objects.filter(room=room)
-        all_player_answers = PlayerAnswer.objects.filter(
-            game_session=game_session,
-            round_number=game_session.current_round
-        )
-        all_players_submitted = all_player_answers.count() >= room_players.count()
+        round_number = game_session.current_round
+        all_players_submitted = get_round_completeness(game_session, [round_number])[round_number]
         
         # Recalculate all scores for current round (this will only update if all players have submitted)
         recalculate_all_scores(game_session, game_session.current_round)
@@ -359,13 +506,19 @@ class SubmitAnswerView(APIView):
         # Broadcast room update to show scores
         broadcast_room_update(room)
         
-        response_serializer = PlayerAnswerSerializer(player_answer)
+        response_serializer = PlayerAnswerSerializer(
+            player_answer,
+            context={'round_completeness': {player_answer.round_number: all_players_submitted}}
+        )
         return Response(response_serializer.data, status=status.HTTP_200_OK)
 
 
 class GetPlayerScoresView(APIView):
     """
     API view to get all player scores for a game session.
+    Query params:
+    - include_totals=true: include total scores across all rounds
+    - include_rounds=true: also include points per round for every player
     """
     permission_classes = (IsAuthenticated,)
     
@@ -383,36 +536,47 @@ class GetPlayerScoresView(APIView):
         
         # Check if requesting total scores (for completed games)
         include_totals = request.query_params.get('include_totals', 'false').lower() == 'true'
+        # Check if requesting per-round points breakdown (implies totals)
+        include_rounds = request.query_params.get('include_rounds', 'false').lower() == 'true'
         
         # Get answers for current round
         player_answers = PlayerAnswer.objects.filter(
             game_session=game_session,
             round_number=game_session.current_round
-        )
+        ).select_related('player__user', 'game_session__room')
         
-        serializer = PlayerAnswerSerializer(player_answers, many=True)
+        # Check round completeness once instead of per serialized answer
+        round_completeness = get_round_completeness(game_session, [game_session.current_round])
+        serializer = PlayerAnswerSerializer(
+            player_answers, many=True, context={'round_completeness': round_completeness}
+        )
         response_data = serializer.data
         
         # If game is completed, include total scores across all rounds
-        if include_totals or game_session.is_completed:
-            room_players = RoomPlayer.objects.filter(room=room)
-            total_scores = {}
-            
-            for room_player in room_players:
-                total_points = 0
-                all_round_answers = PlayerAnswer.objects.filter(
-                    game_session=game_session,
-                    player=room_player
-                )
-                for answer in all_round_answers:
-                    total_points += answer.points or 0
-                total_scores[room_player.id] = total_points
+        if include_totals or include_rounds or game_session.is_completed:
+            # Read running totals maintained per finalized round (players without a score get 0)
+            player_scores = PlayerScore.objects.filter(
+                game_session=game_session
+            ).values_list('room_player_id', 'total_points', 'round_points')
+            total_scores = dict.fromkeys(
+                RoomPlayer.objects.filter(room=room).values_list('id', flat=True), 0
+            )
+            round_breakdown = {room_player_id: {} for room_player_id in total_scores}
+            for room_player_id, total_points, round_points in player_scores:
+                total_scores[room_player_id] = total_points
+                round_breakdown[room_player_id] = {
+                    int(round_number): points for round_number, points in round_points.items()
+                }
             
             response_data = {
                 'round_scores': serializer.data,
                 'total_scores': total_scores,
                 'game_completed': game_session.is_completed
             }
+            
+            # Optionally include points per round for every player
+            if include_rounds:
+                response_data['round_breakdown'] = round_breakdown
         
         return Response(response_data, status=status.HTTP_200_OK)
 
@@ -444,13 +608,8 @@ class AdvanceRoundView(APIView):
             )
         
         # Check if all players have submitted for current round
-        room_players = RoomPlayer.objects.filter(room=room)
-        all_player_answers = PlayerAnswer.objects.filter(
-            game_session=game_session,
-            round_number=game_session.current_round
-        )
-        
-        if all_player_answers.count() < room_players.count():
+        round_number = game_session.current_round
+        if not get_round_completeness(game_session, [round_number])[round_number]:
             return Response(
                 {'error': 'Not all players have submitted their answers for this round.'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -476,6 +635,7 @@ class AdvanceRoundView(APIView):
             # Set round start time for timer
             game_session.round_start_time = timezone.now()
             game_session.save()
+            schedule_round_expiry(room, game_session)
             
             # Broadcast room update
             broadcast_room_update(room)
@@ -514,8 +674,13 @@ class EndGameSessionView(APIView):
         
         game_session = get_object_or_404(GameSession, room=room)
         
-        # Delete all player answers for this game session
+        # Delete all player answers, scores, round deadlines and drafts for this game session
         PlayerAnswer.objects.filter(game_session=game_session).delete()
+        reset_submissions(game_session.id)
+        RoundScoreState.objects.filter(game_session=game_session).delete()
+        PlayerScore.objects.filter(game_session=game_session).delete()
+        RoundDeadline.objects.filter(game_session=game_session).delete()
+        AnswerDraft.objects.filter(game_session=game_session).delete()
         
         # Reset game session state
         game_session.current_round = 1
@@ -2,12 +2,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from ..models import Room, RoomPlayer, GameSession
-from ..serializers.room_serializer import (
-    RoomSerializer, CreateRoomSerializer, JoinRoomSerializer, RoomPlayerSerializer
-)
+from ..serializers.room_serializer import CreateRoomSerializer, JoinRoomSerializer
 from ..utils import broadcast_room_update, broadcast_room_deleted
+from ..room_cache import get_room_data
 
 
 class CreateRoomView(APIView):
@@ -17,10 +17,8 @@ class CreateRoomView(APIView):
         serializer = CreateRoomSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             room = serializer.save()
-            room.refresh_from_db()
             broadcast_room_update(room)
-            room_serializer = RoomSerializer(room)
-            return Response(room_serializer.data, status=status.HTTP_201_CREATED)
+            return Response(get_room_data(room.pk), status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -35,12 +33,9 @@ class JoinRoomView(APIView):
         if serializer.is_valid():
             room_player = serializer.save()
             room = room_player.room
-            # Refresh room to get updated players
-            room.refresh_from_db()
-            # Broadcast update to all clients
+            # Broadcast update to all clients (serializes the room with updated players)
             broadcast_room_update(room)
-            room_serializer = RoomSerializer(room)
-            return Response(room_serializer.data, status=status.HTTP_200_OK)
+            return Response(get_room_data(room.pk), status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -61,11 +56,8 @@ class LeaveRoomView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        room = room_player.room
         room_player.delete()
-        # Refresh room to get updated players
-        room.refresh_from_db()
-        # Broadcast update to all clients
+        # Broadcast update to all clients (reloads room with updated players)
         broadcast_room_update(room)
         return Response({'message': 'Left room successfully'}, status=status.HTTP_200_OK)
 
@@ -77,9 +69,11 @@ class RoomDetailView(APIView):
     permission_classes = (IsAuthenticated,)
     
     def get(self, request, room_id):
-        room = get_object_or_404(Room, id=room_id)
-        serializer = RoomSerializer(room)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        try:
+            room_data = get_room_data(room_id)
+        except Room.DoesNotExist:
+            raise Http404
+        return Response(room_data, status=status.HTTP_200_OK)
 
 
 class DeletePlayerView(APIView):
@@ -100,19 +94,16 @@ class DeletePlayerView(APIView):
         
         # Cannot delete host
         room_player = get_object_or_404(RoomPlayer, id=player_id, room=room)
-        if room_player.user == room.host:
+        if room_player.user_id == room.host_id:
             return Response(
                 {'error': 'Cannot delete the host.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Store the removed user ID before deleting
-        removed_user_id = room_player.user.id
-        room = room_player.room
+        removed_user_id = room_player.user_id
         room_player.delete()
-        # Refresh room to get updated players
-        room.refresh_from_db()
-        # Broadcast update to all clients with removal notification
+        # Broadcast update to all clients with removal notification (reloads room with updated players)
         broadcast_room_update(room, removed_user_id=removed_user_id)
         return Response({'message': 'Player removed successfully'}, status=status.HTTP_200_OK)
 
@@ -0,0 +1,326 @@
+"""
+Wire formats for RoomConsumer frames.
+
+Clients that offer the MSGPACK_SUBPROTOCOL WebSocket subprotocol get binary
+MessagePack frames; everybody else gets JSON text frames. Clients that offer
+JSON_DEFLATE_SUBPROTOCOL get JSON too, but frames of WS_COMPRESSION_THRESHOLD
+bytes or more are sent as zlib-compressed binary frames (application-level
+compression; Daphne does not negotiate permessage-deflate). Broadcast events
+carry their frames pre-encoded (see attach_frames, called once per broadcast by
+api.broadcasting) instead of the message itself, so consumers only forward
+bytes and a room of N sockets costs one encode per format instead of N. Only
+the JSON frame and the frames of the wire formats sockets in this process have
+negotiated are encoded; sockets in other processes that need another format
+encode it from the JSON frame.
+
+JSON frames are produced by the encoder named in settings.WS_JSON_ENCODER,
+picked from a small registry: the standard library 'json', plus 'ujson' and
+'orjson' when they are installed. Other encoders can be added with
+register_json_encoder().
+"""
+import collections
+import json
+import threading
+import zlib
+import msgpack
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+JSON_FORMAT = 'json'
+MSGPACK_SUBPROTOCOL = 'lettergame.msgpack.v1'
+JSON_DEFLATE_SUBPROTOCOL = 'lettergame.json+deflate.v1'
+
+# Largest decompressed frame accepted from clients
+MAX_INBOUND_FRAME_BYTES = 64 * 1024
+
+# Event key holding pre-encoded frames by wire format; never sent to clients
+FRAMES_KEY = 'frames'
+
+# Event keys kept next to the frames: channel layer routing and the fields
+# consumer handlers read
+ROUTING_KEYS = ('type', 'version', 'removed_user_id')
+
+# Wire format -> number of open sockets using it in this process
+_formats_in_use = collections.Counter()
+_formats_lock = threading.Lock()
+
+# (wire format, JSON frame) -> frame this process encoded for a broadcast the
+# sender did not pre-encode in that format, reused by the other sockets that
+# receive their own copy of the event
+MAX_ENCODED_FRAMES = 64
+_encoded_frames = collections.OrderedDict()
+_encoded_frames_lock = threading.Lock()
+
+# JSON encoder name -> callable(message) returning the text frame
+JSON_ENCODERS = {
+    'json': json.dumps,
+}
+
+try:
+    import ujson
+except ImportError:
+    pass
+else:
+    JSON_ENCODERS['ujson'] = lambda message: ujson.dumps(
+        message, ensure_ascii=False, escape_forward_slashes=False
+    )
+
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    JSON_ENCODERS['orjson'] = lambda message: orjson.dumps(message).decode('utf-8')
+
+
+def register_json_encoder(name, encode):
+    """
+    Make a JSON encoder selectable with settings.WS_JSON_ENCODER.
+
+    Args:
+        name: Encoder name
+        encode: Callable taking a message dict and returning a str
+    """
+    JSON_ENCODERS[name] = encode
+
+
+def encode_json(message):
+    """
+    Encode a client message as a JSON text frame with the configured encoder.
+
+    Args:
+        message: Message dict
+
+    Raises:
+        ImproperlyConfigured: If WS_JSON_ENCODER names an unknown or missing encoder
+    """
+    try:
+        encode = JSON_ENCODERS[settings.WS_JSON_ENCODER]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"WS_JSON_ENCODER {settings.WS_JSON_ENCODER!r} is not available "
+            f"(choose from {', '.join(sorted(JSON_ENCODERS))})"
+        )
+    return encode(message)
+
+
+def encode_msgpack(message):
+    """
+    Encode a client message as a MessagePack frame.
+
+    Args:
+        message: Message dict
+    """
+    return msgpack.packb(message, use_bin_type=True)
+
+
+def compress_frame(frame):
+    """
+    Returns a text frame as a zlib-compressed binary frame if it is at least
+    WS_COMPRESSION_THRESHOLD bytes long (0 never compresses), else unchanged.
+
+    Args:
+        frame: Text frame
+    """
+    data = frame.encode('utf-8')
+    threshold = settings.WS_COMPRESSION_THRESHOLD
+    if threshold <= 0 or len(data) < threshold:
+        return frame
+    return zlib.compress(data, settings.WS_COMPRESSION_LEVEL)
+
+
+# Wire format -> callable(message) returning the frame (str for text, bytes for binary)
+WIRE_FORMATS = {
+    JSON_FORMAT: encode_json,
+    MSGPACK_SUBPROTOCOL: encode_msgpack,
+}
+
+# Compressed wire format -> the wire format whose frames it compresses
+COMPRESSED_FORMATS = {
+    JSON_DEFLATE_SUBPROTOCOL: JSON_FORMAT,
+}
+
+
+def negotiate(subprotocols):
+    """
+    Returns the wire format for a socket: the first subprotocol its client
+    offered that the server supports, or JSON.
+
+    Args:
+        subprotocols: Subprotocols from the WebSocket scope
+    """
+    for subprotocol in subprotocols:
+        if subprotocol in WIRE_FORMATS or subprotocol in COMPRESSED_FORMATS:
+            return subprotocol
+    return JSON_FORMAT
+
+
+def base_format(wire_format):
+    """
+    Returns the uncompressed wire format a wire format is built on.
+
+    Args:
+        wire_format: A wire format
+    """
+    return COMPRESSED_FORMATS.get(wire_format, wire_format)
+
+
+def finish_frame(frame, wire_format):
+    """
+    Turn a frame of the base format into a frame of wire_format (compressing it if needed).
+
+    Args:
+        frame: Frame in base_format(wire_format)
+        wire_format: The socket's wire format
+    """
+    if wire_format in COMPRESSED_FORMATS:
+        return compress_frame(frame)
+    return frame
+
+
+def use_wire_format(wire_format):
+    """
+    Record that a socket in this process uses a wire format, so broadcasts pre-encode it.
+
+    Args:
+        wire_format: The socket's wire format
+    """
+    with _formats_lock:
+        _formats_in_use[wire_format] += 1
+
+
+def release_wire_format(wire_format):
+    """
+    Record that a socket using a wire format has closed.
+
+    Args:
+        wire_format: The socket's wire format
+    """
+    with _formats_lock:
+        _formats_in_use[wire_format] -= 1
+        if _formats_in_use[wire_format] <= 0:
+            del _formats_in_use[wire_format]
+
+
+def get_wire_formats_in_use():
+    """Returns the wire formats of the sockets open in this process."""
+    with _formats_lock:
+        return set(_formats_in_use)
+
+
+def decode_frame(text_data, bytes_data, wire_format):
+    """
+    Decode a frame sent by a client: JSON text, MessagePack bytes on
+    MessagePack sockets, zlib-compressed JSON bytes otherwise.
+
+    Args:
+        text_data: Text frame, or None
+        bytes_data: Binary frame, or None
+        wire_format: The socket's wire format
+
+    Raises:
+        ValueError: If the frame cannot be decoded
+    """
+    if bytes_data is None:
+        return json.loads(text_data)
+    if wire_format == MSGPACK_SUBPROTOCOL:
+        try:
+            return msgpack.unpackb(bytes_data, raw=False)
+        except (ValueError, msgpack.StackError) as e:
+            raise ValueError(str(e)) from e
+    try:
+        decompressor = zlib.decompressobj()
+        data = decompressor.decompress(bytes_data, MAX_INBOUND_FRAME_BYTES)
+    except zlib.error as e:
+        raise ValueError(str(e)) from e
+    if decompressor.unconsumed_tail:
+        raise ValueError('Frame too large')
+    return json.loads(data)
+
+
+def client_message(event):
+    """
+    Returns the message clients receive for a channel layer event: the event
+    itself, or the message of its JSON frame if frames are attached.
+
+    Args:
+        event: Event dict
+    """
+    if FRAMES_KEY not in event:
+        return event
+    return json.loads(event[FRAMES_KEY][JSON_FORMAT])
+
+
+def encode_frame(message, wire_format):
+    """
+    Encode a client message in a wire format.
+
+    Args:
+        message: Message dict
+        wire_format: A wire format (see negotiate)
+    """
+    return finish_frame(WIRE_FORMATS[base_format(wire_format)](message), wire_format)
+
+
+def attach_frames(event, wire_formats=None):
+    """
+    Returns the event as sent over the channel layer: its ROUTING_KEYS and its
+    frames, without the rest of the message (the JSON frame holds it). The
+    JSON frame is always encoded; other wire formats only if requested.
+    Compressed frames are built from the already encoded base frames.
+
+    Args:
+        event: Event dict
+        wire_formats: Wire formats to pre-encode besides JSON, or None for the
+            formats of the sockets open in this process
+    """
+    if wire_formats is None:
+        wire_formats = get_wire_formats_in_use()
+    message = client_message(event)
+    frames = {JSON_FORMAT: WIRE_FORMATS[JSON_FORMAT](message)}
+    for wire_format in wire_formats:
+        base = base_format(wire_format)
+        if base not in frames:
+            frames[base] = WIRE_FORMATS[base](message)
+        if wire_format not in frames:
+            frames[wire_format] = finish_frame(frames[base], wire_format)
+    framed = {key: message[key] for key in ROUTING_KEYS if key in message}
+    framed[FRAMES_KEY] = frames
+    return framed
+
+
+def get_frame(event, wire_format):
+    """
+    Returns the pre-encoded frame of an event. A frame missing from a framed
+    event is encoded once per process (from the pre-encoded base frame when
+    there is one) and stored in the event's frames, which sockets of this
+    process receiving the same event share, and in a small per-process cache
+    keyed by the JSON frame for channel layers that copy events per socket.
+
+    Args:
+        event: Event dict
+        wire_format: The socket's wire format
+    """
+    if FRAMES_KEY not in event:
+        return encode_frame(event, wire_format)
+    frames = event[FRAMES_KEY]
+    frame = frames.get(wire_format)
+    if frame is not None:
+        return frame
+    key = (wire_format, frames[JSON_FORMAT])
+    with _encoded_frames_lock:
+        frame = _encoded_frames.get(key)
+        if frame is not None:
+            _encoded_frames.move_to_end(key)
+    if frame is None:
+        base = frames.get(base_format(wire_format))
+        if base is not None:
+            frame = finish_frame(base, wire_format)
+        else:
+            frame = encode_frame(client_message(event), wire_format)
+        with _encoded_frames_lock:
+            _encoded_frames[key] = frame
+            if len(_encoded_frames) > MAX_ENCODED_FRAMES:
+                _encoded_frames.popitem(last=False)
+    frames[wire_format] = frame
+    return frame
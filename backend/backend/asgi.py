@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
@@ -19,6 +20,9 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django_asgi_app = get_asgi_application()
 
 from api import routing
+from api.broadcasting import broadcast_outbox
+from api.scheduler import round_scheduler
+from api.utils import start_round_deadline_poller
 
 # In development, allow all origins for WebSocket connections
 # In production, use AllowedHostsOriginValidator
@@ -33,7 +37,17 @@ else:
         )
     )
 
-application = ProtocolTypeRouter({
+protocol_router = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": websocket_application,
 })
+
+
+async def application(scope, receive, send):
+    # Let sync views hand broadcasts and round timers to the server event loop
+    # instead of blocking on async_to_sync or starting threads
+    loop = asyncio.get_running_loop()
+    broadcast_outbox.bind_loop(loop)
+    round_scheduler.bind_loop(loop)
+    start_round_deadline_poller()
+    return await protocol_router(scope, receive, send)
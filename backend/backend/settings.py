@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -75,8 +76,12 @@ ASGI_APPLICATION = 'backend.asgi.application'
 
 # Channel layers configuration
 # For production, use Redis: 'channels_redis.core.RedisChannelLayer'
-# Set CHANNEL_LAYER_BACKEND env var to 'redis' for production
+# Set CHANNEL_LAYER_BACKEND env var to 'redis' for production, or to 'broker' to
+# share groups between the workers of one host through local brokers
+# (python manage.py run_channel_broker, one per socket) without Redis
 channel_layer_backend = env('CHANNEL_LAYER_BACKEND', default='memory')
+# Unix socket paths of the channel brokers; groups are sharded across them
+CHANNEL_BROKER_SOCKETS = env.list('CHANNEL_BROKER_SOCKETS', default=['/tmp/lettergame-channels.sock'])
 if channel_layer_backend == 'redis':
     CHANNEL_LAYERS = {
         'default': {
@@ -86,6 +91,15 @@ if channel_layer_backend == 'redis':
             },
         },
     }
+elif channel_layer_backend == 'broker':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'api.channel_layer.BrokerChannelLayer',
+            'CONFIG': {
+                'sockets': CHANNEL_BROKER_SOCKETS,
+            },
+        },
+    }
 else:
     CHANNEL_LAYERS = {
         'default': {
@@ -93,6 +107,117 @@ else:
         }
     }
 
+# Cache configuration (used for the room snapshot cache, room versions and patch bases)
+# Set CACHE_BACKEND env var to 'redis', 'db' (run python manage.py createcachetable)
+# or 'file' to share the cache between workers
+cache_backend = env('CACHE_BACKEND', default='locmem')
+if cache_backend == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': f"redis://{env('REDIS_HOST', default='localhost')}:{env.int('REDIS_PORT', default=6379)}",
+        }
+    }
+elif cache_backend == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': env('CACHE_LOCATION', default='lettergame_cache'),
+        }
+    }
+elif cache_backend == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': env('CACHE_LOCATION', default='/tmp/lettergame-cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {
+                # Django's default of 300 entries culls room version keys of
+                # active rooms, restarting their versions below what clients hold
+                'MAX_ENTRIES': env.int('CACHE_MAX_ENTRIES', default=100000),
+            },
+        }
+    }
+
+# The broker and Redis layers run several worker processes, which must agree
+# on room versions and the last broadcast of every room; a per-process cache
+# would serve stale rooms and send patches against bases clients never saw
+if channel_layer_backend in ('broker', 'redis') and cache_backend == 'locmem':
+    raise ImproperlyConfigured(
+        f"CHANNEL_LAYER_BACKEND={channel_layer_backend} needs a cache shared between workers: "
+        "set CACHE_BACKEND to 'db', 'file' or 'redis'."
+    )
+
+# Seconds a user authenticated by a WebSocket access token stays cached (0 disables)
+WS_USER_CACHE_SECONDS = env.int('WS_USER_CACHE_SECONDS', default=60)
+
+# Pre-encode the frames of every broadcast once (JSON, plus the wire formats
+# of the sockets open in this process), instead of encoding them once per socket
+WS_PREENCODE_FRAMES = env.bool('WS_PREENCODE_FRAMES', default=True)
+
+# JSON encoder for WebSocket text frames: 'json', 'ujson' or 'orjson' (see api.wire_format)
+WS_JSON_ENCODER = env('WS_JSON_ENCODER', default='ujson')
+
+# Clients using the lettergame.json+deflate.v1 subprotocol get frames of at least
+# this many bytes zlib-compressed (0 disables compression), at this zlib level.
+# Level 1 keeps most of the savings of level 6 at half the CPU
+# (benchmarks/bench_compression.py)
+WS_COMPRESSION_THRESHOLD = env.int('WS_COMPRESSION_THRESHOLD', default=1024)
+WS_COMPRESSION_LEVEL = env.int('WS_COMPRESSION_LEVEL', default=1)
+
+# Per-connection limit on inbound WebSocket messages: sustained messages per
+# second and burst size (0 rate disables the limit)
+WS_INBOUND_RATE = env.float('WS_INBOUND_RATE', default=10.0)
+WS_INBOUND_BURST = env.int('WS_INBOUND_BURST', default=20)
+
+# Frames a socket may have waiting to be sent before it is closed as a slow
+# consumer (the client reconnects and starts from a full room_update); pending
+# room_update/room_patch frames are collapsed first. 0 disables eviction
+WS_MAX_PENDING_FRAMES = env.int('WS_MAX_PENDING_FRAMES', default=64)
+
+# room_update/room_patch frames sent to a client that acks room versions
+# before further ones wait for its ack (they queue up and collapse, see
+# WS_MAX_PENDING_FRAMES). Clients that never ack are not limited. 0 disables
+WS_MAX_UNACKED_FRAMES = env.int('WS_MAX_UNACKED_FRAMES', default=4)
+
+# Seconds a serialized room snapshot stays cached (it is invalidated on every room change anyway)
+ROOM_SNAPSHOT_TIMEOUT = env.int('ROOM_SNAPSHOT_TIMEOUT', default=300)
+
+# Room updates for the same room within this many seconds are merged into one broadcast (0 disables)
+ROOM_BROADCAST_COALESCE_SECONDS = env.float('ROOM_BROADCAST_COALESCE_SECONDS', default=0.05)
+
+# Send broadcasts from a background outbox instead of blocking the request on the channel layer
+ROOM_BROADCAST_OUTBOX = env.bool('ROOM_BROADCAST_OUTBOX', default=True)
+
+# Maximum number of scheduled round advancements doing database work at once
+ROUND_SCHEDULER_WORKERS = env.int('ROUND_SCHEDULER_WORKERS', default=4)
+
+# Round deadlines (api.round_deadlines): how often each worker polls for due
+# deadlines, how long a claim lasts before another worker may retry it, and how
+# many deadlines are claimed at once
+ROUND_DEADLINE_POLL_SECONDS = env.float('ROUND_DEADLINE_POLL_SECONDS', default=1.0)
+ROUND_DEADLINE_LEASE_SECONDS = env.int('ROUND_DEADLINE_LEASE_SECONDS', default=30)
+ROUND_DEADLINE_BATCH_SIZE = env.int('ROUND_DEADLINE_BATCH_SIZE', default=50)
+
+# Seconds after a round's timer runs out before the server closes the round
+# (absorbs clock skew and draft saves still in flight)
+ROUND_EXPIRY_GRACE_SECONDS = env.float('ROUND_EXPIRY_GRACE_SECONDS', default=2.0)
+
+# Include the players' running totals in the round_results WebSocket message
+ROUND_RESULTS_INCLUDE_TOTALS = env.bool('ROUND_RESULTS_INCLUDE_TOTALS', default=True)
+
+# Seconds an answer draft is kept in the cache
+ANSWER_DRAFT_TIMEOUT = env.int('ANSWER_DRAFT_TIMEOUT', default=3600)
+
+# Seconds between batched database writes of answer drafts (0 writes every draft
+# immediately); keep below ROUND_EXPIRY_GRACE_SECONDS
+ANSWER_DRAFT_FLUSH_SECONDS = env.float('ANSWER_DRAFT_FLUSH_SECONDS', default=0.5)
+
 CORS_ALLOW_CREDENTIALS = True
 
 # Database configuration
@@ -0,0 +1,191 @@
+"""
+Load test for channel layers: InMemoryChannelLayer, BrokerChannelLayer
+(api.channel_layer, with a broker in its own process) and channels_redis
+against a local Redis server (REDIS_HOST / REDIS_PORT, skipped when
+channels_redis or the server is not available).
+
+1. One process: GROUPS groups of MEMBERS channels, MESSAGES group_sends per
+   group; time until every member has received every message.
+2. Several processes (not possible with InMemoryChannelLayer): WORKERS worker
+   processes each put MEMBERS channels in one group, the main process sends
+   MESSAGES group_sends; time until every worker has received them all.
+
+Run from the backend directory:
+    python benchmarks/bench_channel_layers.py
+"""
+import asyncio
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from channels.layers import InMemoryChannelLayer  # noqa: E402
+
+from api.channel_broker import ChannelBroker  # noqa: E402
+from api.channel_layer import BrokerChannelLayer  # noqa: E402
+from bench_wire_format import synthetic_room_update  # noqa: E402
+
+GROUPS = 10
+MEMBERS = 50
+MESSAGES = 100
+WORKERS = 4
+CAPACITY = MESSAGES * 2
+MESSAGE = synthetic_room_update(10)
+
+
+def run_broker(path):
+    asyncio.run(ChannelBroker(path).serve_forever())
+
+
+def start_broker(path):
+    process = multiprocessing.Process(target=run_broker, args=(path,), daemon=True)
+    process.start()
+    while not os.path.exists(path):
+        time.sleep(0.01)
+    return process
+
+
+def redis_address():
+    """Returns (host, port) of a reachable Redis server if channels_redis is installed, else None."""
+    try:
+        import channels_redis.core  # noqa: F401
+    except ImportError:
+        return None
+    address = (os.environ.get('REDIS_HOST', 'localhost'), int(os.environ.get('REDIS_PORT', 6379)))
+    try:
+        socket.create_connection(address, timeout=0.5).close()
+    except OSError:
+        return None
+    return address
+
+
+def make_layer(kind, target):
+    if kind == 'memory':
+        return InMemoryChannelLayer(capacity=CAPACITY)
+    if kind == 'broker':
+        return BrokerChannelLayer([target], capacity=CAPACITY)
+    from channels_redis.core import RedisChannelLayer
+    return RedisChannelLayer(hosts=[target], capacity=CAPACITY)
+
+
+def close_layer(layer):
+    if isinstance(layer, BrokerChannelLayer):
+        layer.close()
+
+
+async def subscribe(layer, groups):
+    """Adds MEMBERS channels to each group; returns receiver tasks finishing after MESSAGES messages each."""
+    async def receive_all(channel):
+        for _ in range(MESSAGES):
+            await layer.receive(channel)
+
+    receivers = []
+    for group in groups:
+        for _ in range(MEMBERS):
+            channel = await layer.new_channel()
+            await layer.group_add(group, channel)
+            receivers.append(asyncio.ensure_future(receive_all(channel)))
+    if isinstance(layer, BrokerChannelLayer):
+        await layer.sync()
+    return receivers
+
+
+async def single_process(kind, target):
+    layer = make_layer(kind, target)
+    try:
+        groups = [f'room_{i}' for i in range(GROUPS)]
+        receivers = await subscribe(layer, groups)
+        start = time.perf_counter()
+        for _ in range(MESSAGES):
+            for group in groups:
+                await layer.group_send(group, MESSAGE)
+        sent = time.perf_counter() - start
+        await asyncio.wait_for(asyncio.gather(*receivers), 60)
+        return sent, time.perf_counter() - start
+    finally:
+        close_layer(layer)
+
+
+def worker_process(kind, target, ready, done):
+    async def main():
+        layer = make_layer(kind, target)
+        try:
+            receivers = await subscribe(layer, ['room'])
+            ready.put(True)
+            await asyncio.wait_for(asyncio.gather(*receivers), 60)
+            done.put(time.time())
+        finally:
+            close_layer(layer)
+
+    asyncio.run(main())
+
+
+def multi_process(kind, target):
+    ready, done = multiprocessing.Queue(), multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=worker_process, args=(kind, target, ready, done))
+        for _ in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.get(timeout=60)
+
+    async def send_all():
+        layer = make_layer(kind, target)
+        try:
+            start = time.time()
+            for _ in range(MESSAGES):
+                await layer.group_send('room', MESSAGE)
+            if isinstance(layer, BrokerChannelLayer):
+                await layer.sync()
+            return start
+        finally:
+            close_layer(layer)
+
+    start = asyncio.run(send_all())
+    finished = max(done.get(timeout=60) for _ in workers)
+    for worker in workers:
+        worker.join()
+    return finished - start
+
+
+def main():
+    socket_dir = tempfile.mkdtemp(prefix='bench')
+    broker_path = f'{socket_dir}/broker.sock'
+    broker = start_broker(broker_path)
+    layers = [('memory', None), ('broker', broker_path)]
+    redis = redis_address()
+    if redis:
+        layers.append(('redis', redis))
+    try:
+        deliveries = GROUPS * MEMBERS * MESSAGES
+        print(f"one process: {GROUPS} groups x {MEMBERS} channels, {MESSAGES} group_sends per group")
+        print(f"{'layer':>8} {'group_send/s':>13} {'deliveries/s':>13} {'total (s)':>10}")
+        for kind, target in layers:
+            sent, total = asyncio.run(single_process(kind, target))
+            print(f"{kind:>8} {GROUPS * MESSAGES / sent:>13.0f} {deliveries / total:>13.0f} {total:>10.2f}")
+
+        deliveries = WORKERS * MEMBERS * MESSAGES
+        print(f"\n{WORKERS} worker processes x {MEMBERS} channels in one group, {MESSAGES} group_sends")
+        print(f"{'layer':>8} {'deliveries/s':>13} {'total (s)':>10}")
+        for kind, target in layers[1:]:
+            total = multi_process(kind, target)
+            print(f"{kind:>8} {deliveries / total:>13.0f} {total:>10.2f}")
+        if not redis:
+            print("\nredis: skipped (channels_redis not installed or no Redis server on REDIS_HOST:REDIS_PORT)")
+    finally:
+        broker.terminate()
+
+
+if __name__ == '__main__':
+    main()
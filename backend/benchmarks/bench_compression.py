@@ -0,0 +1,62 @@
+"""
+Benchmark for compressed room_update frames (lettergame.json+deflate.v1).
+
+For each room size and zlib level, prints the JSON frame size, the compressed
+size, the bandwidth saved, and the CPU spent compressing (once per broadcast,
+see api.wire_format.attach_frames) and decompressing (once per client).
+Player names and join times are randomized so the document is not
+unrealistically repetitive.
+
+Run from the backend directory:
+    python benchmarks/bench_compression.py
+"""
+import json
+import os
+import random
+import string
+import sys
+import timeit
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_wire_format import ROOM_SIZES, synthetic_room_update  # noqa: E402
+
+LEVELS = [1, 6, 9]
+
+
+def realistic_room_update(players, seed=0):
+    rng = random.Random(seed)
+    message = synthetic_room_update(players)
+    for player in message['data']['players']:
+        player['username'] = ''.join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(5, 12)))
+        player['game_name'] = ''.join(rng.choices(string.ascii_letters, k=rng.randint(3, 10)))
+        player['joined_at'] = f'2026-10-17T12:{rng.randrange(60):02d}:{rng.randrange(60):02d}.{rng.randrange(10 ** 6):06d}Z'
+    return message
+
+
+def per_call(func):
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=loops)) / loops
+
+
+def main():
+    print(
+        f"{'players':>8} {'level':>6} {'json bytes':>11} {'compressed':>11} {'saved':>7} "
+        f"{'compress (us)':>14} {'decompress (us)':>16}"
+    )
+    for players in ROOM_SIZES:
+        data = json.dumps(realistic_room_update(players)).encode('utf-8')
+        for level in LEVELS:
+            compressed = zlib.compress(data, level)
+            print(
+                f"{players:>8} {level:>6} {len(data):>11} {len(compressed):>11} "
+                f"{1 - len(compressed) / len(data):>7.0%} "
+                f"{per_call(lambda: zlib.compress(data, level)) * 1e6:>14.1f} "
+                f"{per_call(lambda: zlib.decompress(compressed)) * 1e6:>16.1f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Microbenchmark for the round scoring engine (api.scoring).
+
+Run from the backend directory:
+    python benchmarks/bench_scoring.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.scoring import score_round  # noqa: E402
+
+CATEGORIES = [
+    'panstwo', 'miasto', 'imie', 'zwierze', 'rzecz', 'roslina', 'kolor',
+    'owoc_warzywo', 'marka_samochodu', 'czesc_ciala', 'celebryta',
+    'slowo_powyzej_8', 'slowo_ponizej_5',
+]
+ROOM_SIZES = [2, 10, 50, 100, 250, 500]
+
+
+def synthetic_round(players, letter='K', seed=0):
+    """Builds a round where roughly a third of the answers collide."""
+    rng = random.Random(seed)
+    round_answers = {}
+    for player in range(players):
+        round_answers[player] = {
+            category: f'{letter}{rng.randrange(players * 2)}' if rng.random() < 0.9 else ''
+            for category in CATEGORIES
+        }
+    return round_answers
+
+
+def main():
+    print(f"{'players':>8} {'per round (ms)':>16} {'per answer (us)':>16}")
+    for players in ROOM_SIZES:
+        round_answers = synthetic_round(players)
+        timer = timeit.Timer(lambda: score_round(round_answers, 'K'))
+        loops, _ = timer.autorange()
+        best = min(timer.repeat(repeat=5, number=loops)) / loops
+        print(f"{players:>8} {best * 1e3:>16.3f} {best * 1e6 / (players * len(CATEGORIES)):>16.3f}")
+
+
+if __name__ == '__main__':
+    main()
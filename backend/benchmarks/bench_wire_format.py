@@ -0,0 +1,104 @@
+"""
+Benchmark for RoomConsumer wire formats (api.wire_format).
+
+Compares the size and encode time of a full room_update frame as JSON text
+(with every encoder in the JSON_ENCODERS registry), MessagePack and CBOR, and
+the encode CPU of one broadcast to every member of the room, when the frame is
+encoded once per socket versus once per broadcast (pre-encoded frames).
+
+Run from the backend directory:
+    python benchmarks/bench_wire_format.py
+"""
+import os
+import sys
+import timeit
+import uuid
+
+import cbor2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.wire_format import JSON_ENCODERS, encode_msgpack  # noqa: E402
+
+ROOM_SIZES = [10, 100, 500]
+CATEGORIES = ['panstwo', 'miasto', 'imie', 'zwierze', 'rzecz', 'roslina', 'kolor']
+
+
+def synthetic_room_update(players):
+    """Builds a room_update message shaped like RoomSerializer output."""
+    timestamp = '2026-10-17T12:00:00.000000Z'
+    return {
+        'type': 'room_update',
+        'data': {
+            'id': str(uuid.uuid4()),
+            'name': 'Letter Game Room',
+            'host_id': 1,
+            'host_username': 'player0',
+            'host_game_name': 'Player 0',
+            'created_at': timestamp,
+            'is_active': True,
+            'players': [
+                {
+                    'id': i + 1,
+                    'user_id': i + 1,
+                    'username': f'player{i}',
+                    'game_name': f'Player {i}',
+                    'joined_at': timestamp,
+                }
+                for i in range(players)
+            ],
+            'player_count': players,
+            'game_session': {
+                'id': 1,
+                'letter': 'K',
+                'is_random_letter': True,
+                'selected_types': CATEGORIES,
+                'selected_types_display': [category.title() for category in CATEGORIES],
+                'final_letter': 'K',
+                'total_rounds': 5,
+                'current_round': 2,
+                'is_completed': False,
+                'round_letters': ['A', 'K'],
+                'round_advance_scheduled': False,
+                'round_timer_seconds': 60,
+                'reduce_timer_on_complete_seconds': 15,
+                'round_start_time': timestamp,
+                'created_at': timestamp,
+                'updated_at': timestamp,
+            },
+        },
+        'version': 42,
+    }
+
+
+def per_call(func):
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=loops)) / loops
+
+
+def main():
+    print(
+        f"{'players':>8} {'format':>14} {'bytes':>8} {'encode (us)':>12} "
+        f"{'per socket (ms)':>16} {'pre-encoded (ms)':>17}"
+    )
+    for players in ROOM_SIZES:
+        message = synthetic_room_update(players)
+        encoders = [
+            (f'json:{name}', lambda encode=encode: encode(message))
+            for name, encode in JSON_ENCODERS.items()
+        ]
+        encoders += [
+            ('msgpack', lambda: encode_msgpack(message)),
+            ('cbor', lambda: cbor2.dumps(message)),
+        ]
+        for name, encode in encoders:
+            seconds = per_call(encode)
+            print(
+                f"{players:>8} {name:>14} {len(encode()):>8} {seconds * 1e6:>12.1f} "
+                f"{seconds * players * 1e3:>16.3f} {seconds * 1e3:>17.3f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
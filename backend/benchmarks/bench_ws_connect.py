@@ -0,0 +1,114 @@
+"""
+Benchmark for WebSocket connect authentication (RoomConsumer.get_user_from_token).
+
+Compares the previous path (UntypedToken, a second jwt_decode and a user query
+on every connect) with api.token_auth (one decode, cached user): first the
+authentication step alone, then full connects through RoomConsumer.
+
+Runs against a throwaway test database. From the backend directory:
+    python benchmarks/bench_ws_connect.py
+"""
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from asgiref.sync import async_to_sync  # noqa: E402
+from channels.db import database_sync_to_async  # noqa: E402
+from channels.routing import URLRouter  # noqa: E402
+from channels.testing import WebsocketCommunicator  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.urls import re_path  # noqa: E402
+from jwt import decode as jwt_decode  # noqa: E402
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken, UntypedToken  # noqa: E402
+
+from api.consumers import RoomConsumer  # noqa: E402
+from api.models import Room, RoomPlayer, GameSession  # noqa: E402
+from api.room_cache import get_room_snapshot  # noqa: E402
+from api.token_auth import get_user_for_token  # noqa: E402
+
+CONNECTS = 300
+
+
+def legacy_get_user(token):
+    """The authentication done on every connect before api.token_auth."""
+    try:
+        UntypedToken(token)
+        decoded_data = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        return User.objects.get(id=decoded_data.get('user_id'))
+    except (InvalidToken, TokenError, User.DoesNotExist):
+        return None
+
+
+class LegacyRoomConsumer(RoomConsumer):
+    @database_sync_to_async
+    def load_connection_state(self):
+        user = legacy_get_user(self.get_token())
+        room_player = RoomPlayer.objects.get(room_id=self.room_id, user=user)
+        version, snapshot = get_room_snapshot(self.room_id)
+        return user, room_player.id, version, snapshot
+
+
+def per_call(func):
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=loops)) / loops
+
+
+def connects_per_second(consumer_class, room, token):
+    application = URLRouter([re_path(r'^ws/room/(?P<room_id>[0-9a-f-]+)/$', consumer_class.as_asgi())])
+
+    async def connect_many():
+        for _ in range(CONNECTS):
+            communicator = WebsocketCommunicator(application, f'/ws/room/{room.id}/?token={token}')
+            connected, _ = await communicator.connect()
+            assert connected
+            await communicator.receive_from()
+            await communicator.disconnect()
+
+    async_to_sync(connect_many)()  # warm up
+    start = time.perf_counter()
+    async_to_sync(connect_many)()
+    return CONNECTS / (time.perf_counter() - start)
+
+
+def main():
+    settings.ROOM_BROADCAST_COALESCE_SECONDS = 0
+    settings.ROOM_BROADCAST_OUTBOX = False
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = User.objects.create_user(username='bench', password='benchpass123')
+        room = Room.objects.create(host=user, name='Bench Room')
+        GameSession.objects.create(room=room, selected_types=['miasto'])
+        RoomPlayer.objects.create(room=room, user=user)
+        token = str(AccessToken.for_user(user))
+
+        def cold():
+            cache.clear()
+            get_user_for_token(token)
+
+        print("authentication per connect (us)")
+        print(f"{'legacy (2 decodes + query)':>32} {per_call(lambda: legacy_get_user(token)) * 1e6:>10.1f}")
+        print(f"{'token_auth, cold cache':>32} {per_call(cold) * 1e6:>10.1f}")
+        print(f"{'token_auth, warm cache':>32} {per_call(lambda: get_user_for_token(token)) * 1e6:>10.1f}")
+
+        print(f"\nfull RoomConsumer connects/sec ({CONNECTS} sequential connects)")
+        print(f"{'legacy':>32} {connects_per_second(LegacyRoomConsumer, room, token):>10.0f}")
+        print(f"{'token_auth':>32} {connects_per_second(RoomConsumer, room, token):>10.0f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -36,3 +36,103 @@ def existing_user(db):
         email='existing@example.com',
         password='existingpass123'
     )
+
+
+@pytest.fixture(autouse=True)
+def immediate_room_broadcasts(settings):
+    """
+    Send room broadcasts synchronously in tests. Coalesced updates are flushed
+    from a scheduler thread, which cannot see data from non-transactional tests,
+    and the outbox would make delivery asynchronous. Tests for the coalescer
+    and the outbox override these settings explicitly.
+    """
+    settings.ROOM_BROADCAST_COALESCE_SECONDS = 0
+    settings.ROOM_BROADCAST_OUTBOX = False
+
+
+@pytest.fixture(autouse=True)
+def immediate_draft_writes(settings):
+    """
+    Write answer drafts to the database as they are saved. Batched writes are
+    flushed from a scheduler thread, which cannot see data from
+    non-transactional tests; tests for batching override this explicitly.
+    """
+    settings.ANSWER_DRAFT_FLUSH_SECONDS = 0
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Start and end every test with an empty cache. Room snapshots, broadcast
+    versions and token lookups are cached, and the test database is not.
+    """
+    from django.core.cache import cache
+    from api.room_cache import reset_cache_stats
+    cache.clear()
+    reset_cache_stats()
+    yield
+    cache.clear()
+
+
+def create_room(players=2, prefix='player'):
+    """Creates a room with a game session and the given number of players; returns the room and its users."""
+    from django.contrib.auth import get_user_model
+    from api.models import Room, RoomPlayer, GameSession
+    User = get_user_model()
+
+    users = [User.objects.create(username=f'{prefix}{i}', first_name=f'Player{i}') for i in range(players)]
+    room = Room.objects.create(host=users[0], name='Test Room')
+    GameSession.objects.create(room=room, selected_types=['miasto'])
+    for user in users:
+        RoomPlayer.objects.create(room=room, user=user)
+    return room, users
+
+
+def create_game(players=3, seconds_left=30, total_rounds=2, prefix='player'):
+    """Creates a started game (letter K, round 1) whose timer ends in `seconds_left` seconds."""
+    from datetime import timedelta
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+    from api.models import Room, RoomPlayer, GameSession
+    User = get_user_model()
+
+    users = [User.objects.create(username=f'{prefix}{i}') for i in range(players)]
+    room = Room.objects.create(host=users[0], name='Test Room')
+    game_session = GameSession.objects.create(
+        room=room, selected_types=['miasto', 'kolor'], letter='K', round_letters=['K'],
+        total_rounds=total_rounds, round_timer_seconds=60,
+        round_start_time=timezone.now() - timedelta(seconds=60 - seconds_left)
+    )
+    room_players = [RoomPlayer.objects.create(room=room, user=user) for user in users]
+    return game_session, room_players
+
+
+def create_round(players=3, submitted=None, rounds=1, prefix='player'):
+    """
+    Creates a room with the given number of players and their scored answers.
+    The first `submitted` players submit for every round (all by default).
+    Returns the room, its game session and its room players.
+    """
+    from django.contrib.auth import get_user_model
+    from api.models import Room, RoomPlayer, GameSession, PlayerAnswer
+    from api.player_scores import rebuild_player_scores
+    User = get_user_model()
+
+    if submitted is None:
+        submitted = players
+    users = [User.objects.create(username=f'{prefix}{i}', first_name=f'Player{i}') for i in range(players)]
+    room = Room.objects.create(host=users[0], name='Test Room')
+    game_session = GameSession.objects.create(
+        room=room, letter='K', selected_types=['miasto'],
+        current_round=rounds, total_rounds=rounds
+    )
+    room_players = [RoomPlayer.objects.create(room=room, user=user) for user in users]
+    for round_number in range(1, rounds + 1):
+        for index, room_player in enumerate(room_players[:submitted]):
+            PlayerAnswer.objects.create(
+                game_session=game_session, player=room_player, round_number=round_number,
+                answers={'miasto': f'K{index}'}, points=10 * round_number,
+                points_per_category={'miasto': 10 * round_number}
+            )
+    rebuild_player_scores(game_session)
+    return room, game_session, room_players
@@ -0,0 +1,302 @@
+"""
+Tests for BrokerChannelLayer and the local channel broker.
+"""
+import asyncio
+import shutil
+import tempfile
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+
+from api.channel_broker import ChannelBroker, shard_for
+from api.channel_layer import BrokerChannelLayer
+
+
+@pytest.fixture
+def socket_dir():
+    # Unix socket paths are limited to ~100 characters, too short for pytest's tmp_path
+    path = tempfile.mkdtemp(prefix='chan')
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def run_with_brokers(socket_dir, body, shards=1):
+    """Runs body(brokers, sockets) with `shards` brokers listening on temporary sockets."""
+    sockets = [f'{socket_dir}/broker{i}.sock' for i in range(shards)]
+
+    async def main():
+        brokers = [ChannelBroker(path) for path in sockets]
+        for broker in brokers:
+            await broker.start()
+        try:
+            return await body(brokers, sockets)
+        finally:
+            for broker in brokers:
+                await broker.close()
+
+    return async_to_sync(main)()
+
+
+async def receive_or_none(layer, channel, timeout=0.1):
+    """Returns the next message of a channel, or None if nothing arrives in time."""
+    try:
+        return await asyncio.wait_for(layer.receive(channel), timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def wait_for(condition, timeout=2.0):
+    """Waits until condition() is true."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+class TestBrokerChannelLayer:
+    """Test suite for BrokerChannelLayer with workers in one process."""
+
+    def test_group_send_reaches_members_in_every_worker(self, socket_dir):
+        """Test that a group message reaches the group's channels in the sending and the other workers only."""
+        async def body(brokers, sockets):
+            first, second = BrokerChannelLayer(sockets), BrokerChannelLayer(sockets)
+            try:
+                local_a = await first.new_channel()
+                local_b = await first.new_channel()
+                remote = await second.new_channel()
+                outsider = await second.new_channel()
+                for layer, channel in [(first, local_a), (first, local_b), (second, remote)]:
+                    await layer.group_add('room', channel)
+                await first.sync()
+                await second.sync()
+
+                await first.group_send('room', {'type': 'room.update', 'version': 1})
+
+                received = [
+                    await receive_or_none(first, local_a, timeout=2),
+                    await receive_or_none(first, local_b, timeout=2),
+                    await receive_or_none(second, remote, timeout=2),
+                ]
+                return received, await receive_or_none(second, outsider)
+            finally:
+                first.close()
+                second.close()
+
+        received, outsider = run_with_brokers(socket_dir, body)
+
+        assert received == [{'type': 'room.update', 'version': 1}] * 3
+        assert outsider is None
+
+    def test_broker_indexes_member_workers(self, socket_dir):
+        """Test that the broker tracks which workers have members, and forgets them on their last discard."""
+        async def body(brokers, sockets):
+            first, second = BrokerChannelLayer(sockets), BrokerChannelLayer(sockets)
+            try:
+                channels = [await first.new_channel(), await first.new_channel(), await second.new_channel()]
+                await first.group_add('room', channels[0])
+                await first.group_add('room', channels[1])
+                await second.group_add('room', channels[2])
+                await first.sync()
+                await second.sync()
+                both = {group: set(workers) for group, workers in brokers[0].groups.items()}
+
+                await first.group_discard('room', channels[0])
+                await second.group_discard('room', channels[2])
+                await first.sync()
+                await second.sync()
+                return both, {group: set(workers) for group, workers in brokers[0].groups.items()}, first.worker_id, second.worker_id
+            finally:
+                first.close()
+                second.close()
+
+        both, after, first_id, second_id = run_with_brokers(socket_dir, body)
+
+        assert both == {'room': {first_id, second_id}}
+        assert after == {'room': {first_id}}
+
+    def test_full_queue_drops_group_messages(self, socket_dir):
+        """Test that channel queues are bounded: group messages beyond capacity are dropped, send() raises."""
+        from channels.exceptions import ChannelFull
+
+        async def body(brokers, sockets):
+            layer = BrokerChannelLayer(sockets, capacity=2)
+            try:
+                channel = await layer.new_channel()
+                await layer.group_add('room', channel)
+                for version in range(3):
+                    await layer.group_send('room', {'type': 'room.update', 'version': version})
+                with pytest.raises(ChannelFull):
+                    await layer.send(channel, {'type': 'room.update', 'version': 3})
+                received = [await receive_or_none(layer, channel) for _ in range(3)]
+                return received, layer.get_stats()
+            finally:
+                layer.close()
+
+        received, stats = run_with_brokers(socket_dir, body)
+
+        assert [message and message['version'] for message in received] == [0, 1, None]
+        assert stats['dropped_full'] == 1
+
+    def test_send_to_channel_of_other_worker(self, socket_dir):
+        """Test that send() to another worker's channel is routed through the broker."""
+        async def body(brokers, sockets):
+            first, second = BrokerChannelLayer(sockets), BrokerChannelLayer(sockets)
+            try:
+                channel = await second.new_channel()
+                await second.sync()
+                await first.send(channel, {'type': 'ping', 'payload': b'\x00\x01'})
+                return await receive_or_none(second, channel, timeout=2)
+            finally:
+                first.close()
+                second.close()
+
+        assert run_with_brokers(socket_dir, body) == {'type': 'ping', 'payload': b'\x00\x01'}
+
+    def test_groups_sharded_across_brokers(self, socket_dir):
+        """Test that each group is indexed by one broker only, and messages still reach every worker."""
+        groups = [f'room_{i}' for i in range(8)]
+
+        async def body(brokers, sockets):
+            first, second = BrokerChannelLayer(sockets), BrokerChannelLayer(sockets)
+            try:
+                channels = {}
+                for group in groups:
+                    channels[group] = await second.new_channel()
+                    await second.group_add(group, channels[group])
+                await second.sync()
+                for group in groups:
+                    await first.group_send(group, {'type': 'room.update', 'group': group})
+                received = {group: await receive_or_none(second, channels[group], timeout=2) for group in groups}
+                return [set(broker.groups) for broker in brokers], received
+            finally:
+                first.close()
+                second.close()
+
+        indexed, received = run_with_brokers(socket_dir, body, shards=2)
+
+        assert indexed == [
+            {group for group in groups if shard_for(group, 2) == shard} for shard in range(2)
+        ]
+        assert all(indexed)
+        assert received == {group: {'type': 'room.update', 'group': group} for group in groups}
+
+    def test_closed_worker_leaves_groups(self, socket_dir):
+        """Test that the broker forgets the groups of a worker that disconnects."""
+        async def body(brokers, sockets):
+            layer = BrokerChannelLayer(sockets)
+            await layer.group_add('room', await layer.new_channel())
+            await layer.sync()
+            indexed = {group: set(workers) for group, workers in brokers[0].groups.items()}
+            layer.close()
+            await wait_for(lambda: not brokers[0].groups)
+            return indexed, layer.worker_id
+
+        indexed, worker_id = run_with_brokers(socket_dir, body)
+
+        assert indexed == {'room': {worker_id}}
+
+    def test_messages_queued_until_broker_available(self, socket_dir):
+        """Test that a worker started before its broker subscribes and sends once the broker is up."""
+        async def body(brokers, sockets):
+            await brokers[0].close()
+            first, second = BrokerChannelLayer(sockets), BrokerChannelLayer(sockets)
+            try:
+                channel = await first.new_channel()
+                await first.group_add('room', channel)
+                await asyncio.sleep(0.05)
+                await brokers[0].start()
+                await first.sync()
+                await second.group_send('room', {'type': 'room.update'})
+                return await receive_or_none(first, channel, timeout=3)
+            finally:
+                first.close()
+                second.close()
+
+        assert run_with_brokers(socket_dir, body) == {'type': 'room.update'}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRoomConsumerOverBroker:
+    """Test suite for RoomConsumer with the broker channel layer."""
+
+    def test_broadcast_from_other_worker(self, settings, socket_dir):
+        """Test that a broadcast sent by another worker reaches the room's sockets."""
+        import json
+        from channels.layers import get_channel_layer
+        from api.utils import round_closed_event
+        from api.wire_format import attach_frames
+        from tests.conftest import create_room
+        from tests.test_room_consumer import communicator_for
+        cache.clear()
+        room, users = create_room()
+
+        async def body(brokers, sockets):
+            settings.CHANNEL_LAYERS = {
+                'default': {
+                    'BACKEND': 'api.channel_layer.BrokerChannelLayer',
+                    'CONFIG': {'sockets': sockets},
+                },
+            }
+            layer = get_channel_layer()
+            other_worker = BrokerChannelLayer(sockets)
+            try:
+                socket = communicator_for(room, users[0])
+                await socket.connect()
+                await socket.receive_from()
+                await layer.sync()
+                await other_worker.group_send(f'room_{room.id}', attach_frames(round_closed_event(2)))
+                frame = await socket.receive_from(timeout=2)
+                await socket.disconnect()
+                return frame
+            finally:
+                other_worker.close()
+                layer.close()
+
+        frame = run_with_brokers(socket_dir, body)
+
+        assert json.loads(frame) == {'type': 'round_closed_notification', 'round_number': 2}
+
+
+class TestBrokerSettings:
+    """Test suite for the cache requirements of the multi-worker channel layers."""
+
+    def load_settings(self, **environ):
+        """Imports the settings module in a fresh interpreter with the given environment."""
+        import os
+        import subprocess
+        import sys
+        from django.conf import settings
+        return subprocess.run(
+            [sys.executable, '-c', 'import backend.settings'],
+            cwd=settings.BASE_DIR, env={**os.environ, **environ}, capture_output=True, text=True
+        )
+
+    def test_per_process_cache_refused(self):
+        """Test that the broker layer with the default locmem cache fails at startup."""
+        result = self.load_settings(CHANNEL_LAYER_BACKEND='broker', CACHE_BACKEND='locmem')
+
+        assert result.returncode != 0
+        assert 'ImproperlyConfigured' in result.stderr
+        assert 'CACHE_BACKEND' in result.stderr
+
+    def test_redis_layer_with_per_process_cache_refused(self):
+        """Test that the Redis layer with the locmem cache fails at startup too."""
+        result = self.load_settings(CHANNEL_LAYER_BACKEND='redis', CACHE_BACKEND='locmem')
+
+        assert result.returncode != 0
+        assert 'CHANNEL_LAYER_BACKEND=redis' in result.stderr
+
+    def test_locmem_cache_holds_many_rooms(self):
+        """Test that the locmem cache is not capped at Django's default of 300 entries."""
+        from django.conf import settings
+        cache_settings = settings.CACHES['default']
+
+        if cache_settings['BACKEND'].endswith('LocMemCache'):
+            assert cache_settings['OPTIONS']['MAX_ENTRIES'] >= 10000
+
+    def test_shared_cache_accepted(self):
+        """Test that the broker layer loads with a database cache."""
+        result = self.load_settings(CHANNEL_LAYER_BACKEND='broker', CACHE_BACKEND='db')
+
+        assert result.returncode == 0, result.stderr
+
@@ -0,0 +1,102 @@
+"""
+Tests for the denormalized PlayerScore table and its management commands.
+"""
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+
+@pytest.mark.django_db
+class TestPlayerScoreTable:
+    """Test suite for PlayerScore maintenance."""
+
+    def _create_game(self, players=3, rounds=2):
+        from django.contrib.auth import get_user_model
+        from api.models import Room, RoomPlayer, GameSession
+        User = get_user_model()
+
+        users = [User.objects.create(username=f'player{i}') for i in range(players)]
+        room = Room.objects.create(host=users[0], name='Test Room')
+        game_session = GameSession.objects.create(
+            room=room, letter='K', selected_types=['miasto'], total_rounds=rounds
+        )
+        room_players = [RoomPlayer.objects.create(room=room, user=user) for user in users]
+        return game_session, room_players
+
+    def _play_round(self, game_session, room_players, answers):
+        from api.models import PlayerAnswer
+        from api.views.game_session_view import recalculate_all_scores, record_submission
+
+        for room_player, answer in zip(room_players, answers):
+            player_answer = PlayerAnswer.objects.create(
+                game_session=game_session, player=room_player,
+                round_number=game_session.current_round, answers={'miasto': answer}
+            )
+            record_submission(game_session, player_answer)
+        recalculate_all_scores(game_session, game_session.current_round)
+
+    def test_running_totals_updated_per_round(self):
+        """Test that finalizing rounds accumulates totals and round counts."""
+        from api.models import PlayerScore
+        game_session, room_players = self._create_game()
+
+        self._play_round(game_session, room_players, ['Kraków', 'Kraków', 'Kalisz'])
+        game_session.current_round = 2
+        game_session.letter = 'W'
+        game_session.save()
+        self._play_round(game_session, room_players, ['Warszawa', '', 'Wrocław'])
+
+        scores = {
+            player_score.room_player_id: player_score
+            for player_score in PlayerScore.objects.filter(game_session=game_session)
+        }
+        assert scores[room_players[0].id].total_points == 15
+        assert scores[room_players[0].id].rounds_played == 2
+        assert scores[room_players[1].id].total_points == 5
+        assert scores[room_players[2].id].total_points == 20
+        assert scores[room_players[2].id].round_points == {'1': 10, '2': 10}
+
+    def test_rescoring_round_is_idempotent(self):
+        """Test that scoring the same round twice does not double count."""
+        from api.models import PlayerScore
+        from api.views.game_session_view import recalculate_all_scores
+        game_session, room_players = self._create_game(players=2)
+
+        self._play_round(game_session, room_players, ['Kraków', 'Kalisz'])
+        recalculate_all_scores(game_session, 1)
+
+        assert set(PlayerScore.objects.values_list('total_points', 'rounds_played')) == {(10, 1)}
+
+    def test_unfinished_round_not_counted(self):
+        """Test that nothing is recorded until every player has submitted."""
+        from api.models import PlayerScore
+        game_session, room_players = self._create_game()
+
+        self._play_round(game_session, room_players[:2], ['Kraków', 'Kalisz'])
+
+        assert not PlayerScore.objects.exists()
+
+    def test_check_and_rebuild_commands(self):
+        """Test that the checker detects drift and the rebuild command fixes it."""
+        from api.models import PlayerScore
+        game_session, room_players = self._create_game()
+        self._play_round(game_session, room_players, ['Kraków', 'Kraków', 'Kalisz'])
+
+        output = StringIO()
+        call_command('check_player_scores', stdout=output)
+        assert 'consistent' in output.getvalue()
+
+        PlayerScore.objects.filter(room_player=room_players[2]).update(total_points=999)
+        PlayerScore.objects.filter(room_player=room_players[0]).delete()
+        output = StringIO()
+        with pytest.raises(CommandError):
+            call_command('check_player_scores', stdout=output)
+        assert f'player {room_players[0].id}' in output.getvalue()
+        assert f'player {room_players[2].id}' in output.getvalue()
+
+        call_command('rebuild_player_scores', stdout=StringIO())
+
+        call_command('check_player_scores', stdout=StringIO())
+        assert PlayerScore.objects.get(room_player=room_players[2]).total_points == 10
+        assert PlayerScore.objects.get(room_player=room_players[0]).total_points == 5
@@ -0,0 +1,113 @@
+"""
+Tests for Get Player Scores endpoint functionality.
+"""
+import pytest
+from rest_framework import status
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.conftest import create_round
+
+
+@pytest.mark.django_db
+class TestGetPlayerScoresView:
+    """Test suite for GetPlayerScoresView."""
+
+    def _get_scores(self, api_client, room, query=''):
+        api_client.force_authenticate(user=room.host)
+        return api_client.get(f'/api/rooms/{room.id}/game-session/scores/{query}')
+
+    def test_points_visible_when_all_submitted(self, api_client):
+        """Test that points are returned once every player has submitted."""
+        room, _, _ = create_round(3)
+
+        response = self._get_scores(api_client, room)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 3
+        assert all(answer['points'] == 10 for answer in response.data)
+        assert all(answer['points_per_category'] == {'miasto': 10} for answer in response.data)
+        assert {answer['player_game_name'] for answer in response.data} == {'Player0', 'Player1', 'Player2'}
+
+    def test_points_hidden_until_all_submitted(self, api_client):
+        """Test that points are hidden while players are still missing."""
+        room, _, _ = create_round(3, submitted=2)
+
+        response = self._get_scores(api_client, room)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 2
+        assert all(answer['points'] is None for answer in response.data)
+        assert all(answer['points_per_category'] == {} for answer in response.data)
+
+    def test_non_member_forbidden(self, api_client):
+        """Test that users outside the room cannot read scores."""
+        from django.contrib.auth import get_user_model
+        room, _, _ = create_round(2)
+        outsider = get_user_model().objects.create(username='outsider')
+
+        api_client.force_authenticate(user=outsider)
+        response = api_client.get(f'/api/rooms/{room.id}/game-session/scores/')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    @pytest.mark.parametrize('submitted_ratio', [1, 0.5])
+    def test_query_count_independent_of_room_size(self, api_client, submitted_ratio):
+        """Test that the number of queries does not grow with the number of players."""
+        query_counts = []
+        for players in (3, 30):
+            room, _, _ = create_round(players, submitted=int(players * submitted_ratio), prefix=f'room{players}_')
+            with CaptureQueriesContext(connection) as context:
+                response = self._get_scores(api_client, room)
+            assert response.status_code == status.HTTP_200_OK
+            query_counts.append(len(context.captured_queries))
+
+        assert query_counts[0] == query_counts[1]
+        assert query_counts[1] <= 7
+
+    def test_total_scores_summed_across_rounds(self, api_client):
+        """Test that include_totals sums points over all rounds."""
+        room, _, room_players = create_round(3, rounds=3)
+
+        response = self._get_scores(api_client, room, '?include_totals=true')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['round_scores']) == 3
+        assert response.data['total_scores'] == {room_player.id: 60 for room_player in room_players}
+        assert 'round_breakdown' not in response.data
+
+    def test_total_scores_include_players_without_answers(self, api_client):
+        """Test that players who never submitted get a total of 0."""
+        room, _, room_players = create_round(3, submitted=2)
+
+        response = self._get_scores(api_client, room, '?include_totals=true')
+
+        assert response.data['total_scores'][room_players[2].id] == 0
+
+    def test_round_breakdown(self, api_client):
+        """Test that include_rounds returns points per finalized round for every player."""
+        room, _, room_players = create_round(3, submitted=2, rounds=2)
+
+        response = self._get_scores(api_client, room, '?include_rounds=true')
+
+        assert response.status_code == status.HTTP_200_OK
+        # Round 2 is still waiting for the third player, so only round 1 counts
+        assert response.data['total_scores'] == {
+            room_players[0].id: 10, room_players[1].id: 10, room_players[2].id: 0
+        }
+        assert response.data['round_breakdown'] == {
+            room_players[0].id: {1: 10}, room_players[1].id: {1: 10}, room_players[2].id: {}
+        }
+
+    def test_totals_query_count_independent_of_room_size(self, api_client):
+        """Test that totals and breakdown do not issue one query per player."""
+        query_counts = []
+        for players in (3, 30):
+            room, _, _ = create_round(players, rounds=3, prefix=f'room{players}_')
+            with CaptureQueriesContext(connection) as context:
+                response = self._get_scores(api_client, room, '?include_rounds=true')
+            assert response.status_code == status.HTTP_200_OK
+            query_counts.append(len(context.captured_queries))
+
+        assert query_counts[0] == query_counts[1]
+        assert query_counts[1] <= 9
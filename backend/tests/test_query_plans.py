@@ -0,0 +1,143 @@
+"""
+Query-plan tests for the hot lookups on PlayerAnswer, RoomPlayer and Room.
+
+Each test runs the query the way the app does, captures the SQL it executed
+and asks the database for its plan: `EXPLAIN QUERY PLAN` on SQLite, `EXPLAIN`
+on PostgreSQL. The plan must use the expected index, and a covering index
+where the query only needs indexed columns ("USING COVERING INDEX" on SQLite,
+"Index Only Scan" on PostgreSQL).
+
+The test tables hold a handful of rows, where PostgreSQL would rightly prefer a
+sequential scan, so sequential scans are disabled for the plan there
+(SET LOCAL, undone with the test's transaction). SQLite has no statistics for
+the test tables and picks indexes from the query shape alone.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.conftest import create_round
+
+
+def query_plan(func):
+    """Runs func and returns the plan of the last query it executed, one line per plan row."""
+    with CaptureQueriesContext(connection) as context:
+        func()
+    sql = context.captured_queries[-1]['sql']
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+        else:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def uses_index(plan, name, covering=False):
+    """Whether a plan reads through the named index (without touching the table if covering)."""
+    if connection.vendor == 'postgresql':
+        if covering:
+            return f'Index Only Scan using {name}' in plan
+        return f'using {name}' in plan or f'Bitmap Index Scan on {name}' in plan
+    return f"{'COVERING INDEX' if covering else 'INDEX'} {name}" in plan
+
+
+def scans_table(plan, table):
+    """Whether a plan reads a whole table."""
+    if connection.vendor == 'postgresql':
+        return f'Seq Scan on {table}' in plan
+    return any(line.split()[:2] == ['SCAN', table] for line in plan.splitlines())
+
+
+def unique_index_name(model, columns):
+    """Returns the name of the unique index the database created for the given columns."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return next(
+        name for name, constraint in constraints.items()
+        if constraint['unique'] and constraint['columns'] == columns and not constraint['primary_key']
+    )
+
+
+@pytest.mark.django_db
+class TestPlayerAnswerPlans:
+    """Test suite for the per-round PlayerAnswer lookups."""
+
+    def test_round_count_uses_covering_index(self):
+        """Test that counting a round's answers is answered from playeranswer_round_idx alone."""
+        from api.models import PlayerAnswer
+        _, game_session, _ = create_round(submitted=2)
+
+        plan = query_plan(
+            lambda: PlayerAnswer.objects.filter(game_session=game_session, round_number=1).count()
+        )
+
+        assert uses_index(plan, 'playeranswer_round_idx', covering=True), plan
+
+    def test_round_completeness_uses_covering_index(self):
+        """Test that the grouped per-round count of get_round_completeness is index-only."""
+        from api.serializers.player_answer_serializer import get_round_completeness
+        _, game_session, _ = create_round(submitted=2)
+
+        plan = query_plan(lambda: get_round_completeness(game_session, [1, 2]))
+
+        assert uses_index(plan, 'playeranswer_round_idx', covering=True), plan
+
+    def test_submitted_players_use_covering_index(self):
+        """Test that listing the players who submitted in a round is index-only."""
+        from api.models import PlayerAnswer
+        _, game_session, _ = create_round(submitted=2)
+
+        # As in close_round: without order_by() the default ordering forces a table read and a sort
+        plan = query_plan(lambda: set(PlayerAnswer.objects.filter(
+            game_session=game_session, round_number=1
+        ).order_by().values_list('player_id', flat=True)))
+
+        assert uses_index(plan, 'playeranswer_round_idx', covering=True), plan
+
+    def test_round_answers_use_index(self):
+        """Test that loading a round's answers for scoring searches an index instead of the table."""
+        from api.models import PlayerAnswer
+        _, game_session, _ = create_round(submitted=2)
+
+        plan = query_plan(lambda: list(PlayerAnswer.objects.filter(
+            game_session=game_session, round_number=1
+        ).select_related('player__user').order_by('id')))
+
+        # Ordered by id, SQLite without statistics may prefer the game_session index
+        # (rows already in id order) over playeranswer_round_idx; both are searches
+        assert not scans_table(plan, 'api_playeranswer'), plan
+
+
+@pytest.mark.django_db
+class TestRoomPlans:
+    """Test suite for the Room and RoomPlayer lookups."""
+
+    def test_membership_uses_unique_index(self):
+        """Test that the (room, user) membership check searches the unique_together index."""
+        from api.models import RoomPlayer
+        room, _, room_players = create_round(submitted=2)
+        index = unique_index_name(RoomPlayer, ['room_id', 'user_id'])
+
+        plan = query_plan(lambda: RoomPlayer.objects.filter(room=room, user=room_players[1].user).exists())
+
+        assert uses_index(plan, index), plan
+
+    def test_room_players_in_join_order_use_index(self):
+        """Test that a room's players are read in join order from roomplayer_room_joined_idx, without a sort."""
+        from api.models import RoomPlayer
+        room, _, _ = create_round(submitted=2)
+
+        plan = query_plan(lambda: list(RoomPlayer.objects.filter(room=room)))
+
+        assert uses_index(plan, 'roomplayer_room_joined_idx'), plan
+        assert 'TEMP B-TREE' not in plan and 'Sort' not in plan, plan
+
+    def test_active_room_lookup_uses_primary_key(self):
+        """Test that Room.objects.get(id=..., is_active=True) is a primary-key lookup."""
+        from api.models import Room
+        room, _, _ = create_round(submitted=2)
+
+        plan = query_plan(lambda: Room.objects.get(id=room.id, is_active=True))
+
+        assert not scans_table(plan, 'api_room'), plan
@@ -0,0 +1,313 @@
+"""
+Tests for per-room coalescing of WebSocket broadcasts.
+"""
+import time
+import pytest
+from asgiref.sync import async_to_sync
+
+from api.broadcasting import RoomBroadcastCoalescer
+from tests.conftest import create_room
+
+
+def listen(room):
+    """Subscribes a new channel to the room group and returns a function draining its client messages."""
+    from channels.layers import get_channel_layer
+    from api.wire_format import client_message
+    channel_layer = get_channel_layer()
+    channel_name = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)(f'room_{room.id}', channel_name)
+
+    def drain():
+        messages = []
+        while channel_name in channel_layer.channels and channel_layer.channels[channel_name].qsize():
+            messages.append(client_message(async_to_sync(channel_layer.receive)(channel_name)))
+        return messages
+
+    return drain
+
+
+class TestRoomBroadcastCoalescer:
+    """Test suite for RoomBroadcastCoalescer without a database."""
+
+    def test_burst_sent_once(self):
+        """Test that updates within the window are merged into one send."""
+        sent = []
+        coalescer = RoomBroadcastCoalescer(lambda room_id, room=None: sent.append(room_id), window=0.05)
+
+        for _ in range(20):
+            coalescer.room_update('room-a')
+        coalescer.room_update('room-b')
+        time.sleep(0.2)
+
+        assert sorted(sent) == ['room-a', 'room-b']
+        assert coalescer.stats['merged'] == 19
+        assert coalescer.stats['sent'] == 2
+
+    def test_deferred_send_runs_on_round_scheduler(self, monkeypatch):
+        """Test that a coalesced update is sent from the round scheduler, with database connections cleaned up."""
+        import api.broadcasting
+        from api.scheduler import round_scheduler
+        cleanups = []
+        monkeypatch.setattr(api.broadcasting, 'close_old_connections', lambda: cleanups.append(True))
+        sent = []
+        coalescer = RoomBroadcastCoalescer(lambda room_id, room=None: sent.append(room_id), window=0.05)
+        fired = round_scheduler.get_stats()['fired']
+
+        coalescer.room_update('room-a')
+        coalescer.room_update('room-a')
+        time.sleep(0.3)
+
+        assert sent == ['room-a']
+        assert round_scheduler.get_stats()['fired'] == fired + 1
+        assert len(cleanups) == 2
+
+    def test_zero_window_sends_immediately(self):
+        """Test that a zero window sends every update synchronously with the room object."""
+        sent = []
+        coalescer = RoomBroadcastCoalescer(lambda room_id, room=None: sent.append((room_id, room)), window=0)
+
+        coalescer.room_update('room-a', room='room object')
+        coalescer.room_update('room-a')
+
+        assert sent == [('room-a', 'room object'), ('room-a', None)]
+
+    def test_flush_all_sends_pending(self):
+        """Test that flush_all sends pending updates without waiting for the window."""
+        sent = []
+        coalescer = RoomBroadcastCoalescer(lambda room_id, room=None: sent.append(room_id), window=10)
+
+        coalescer.room_update('room-a')
+        coalescer.room_update('room-b')
+        coalescer.flush_all()
+        coalescer.flush_all()
+
+        assert sorted(sent) == ['room-a', 'room-b']
+
+    def test_room_locks_do_not_grow(self):
+        """Test that rooms share a fixed set of locks instead of getting one each."""
+        from api.broadcasting import ROOM_LOCK_STRIPES
+        sent = []
+        coalescer = RoomBroadcastCoalescer(lambda room_id, room=None: sent.append(room_id), window=0)
+
+        for i in range(ROOM_LOCK_STRIPES * 4):
+            coalescer.room_update(f'room-{i}')
+            coalescer.notify(f'room-{i}', {'type': 'player_submitted'})
+
+        assert len(sent) == ROOM_LOCK_STRIPES * 4
+        assert len(coalescer._room_locks) == ROOM_LOCK_STRIPES
+
+    def test_send_errors_do_not_propagate(self):
+        """Test that a failing send is logged instead of raised."""
+        def fail(room_id, room=None):
+            raise RuntimeError('boom')
+        coalescer = RoomBroadcastCoalescer(fail, window=0)
+
+        coalescer.room_update('room-a')
+
+        assert coalescer.stats['sent'] == 1
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCoalescedRoomBroadcasts:
+    """Test suite for coalesced room broadcasts through the channel layer."""
+
+    def test_burst_delivers_single_snapshot(self, settings):
+        """Test that a burst of room changes reaches clients as one up-to-date event."""
+        from django.contrib.auth import get_user_model
+        from api.models import RoomPlayer
+        from api.utils import broadcast_room_update
+        settings.ROOM_BROADCAST_COALESCE_SECONDS = 0.05
+        room, _ = create_room()
+        drain = listen(room)
+
+        for i in range(5):
+            RoomPlayer.objects.create(room=room, user=get_user_model().objects.create(username=f'joiner{i}'))
+            broadcast_room_update(room)
+        assert drain() == []
+        time.sleep(0.3)
+        messages = drain()
+
+        assert len(messages) == 1
+        assert messages[0]['type'] == 'room_update'
+        assert messages[0]['data']['player_count'] == 7
+
+    def test_notifications_stay_ordered(self, settings):
+        """Test that a notification flushes the pending room update before it is sent."""
+        from api.models import RoomPlayer
+        from api.utils import broadcast_room_update, broadcast_player_submitted
+        settings.ROOM_BROADCAST_COALESCE_SECONDS = 10
+        room, _ = create_room()
+        drain = listen(room)
+
+        broadcast_room_update(room)
+        broadcast_room_update(room)
+        broadcast_player_submitted(room, 'player1')
+        RoomPlayer.objects.filter(room=room).last().delete()
+        broadcast_room_update(room, removed_user_id=5)
+        messages = drain()
+
+        assert [message['type'] for message in messages] == [
+            'room_update',
+            'player_submitted_notification',
+            'room_patch',
+            'player_removed_notification',
+        ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBroadcastOutbox:
+    """Test suite for fire-and-forget delivery through the broadcast outbox."""
+
+    @pytest.fixture(autouse=True)
+    def use_outbox(self, settings):
+        from api.broadcasting import broadcast_outbox
+        settings.ROOM_BROADCAST_OUTBOX = True
+        yield
+        broadcast_outbox.wait_idle(timeout=5)
+        broadcast_outbox.bind_loop(None)
+
+    def test_events_delivered_in_order(self):
+        """Test that outbox events reach the group in the order they were queued."""
+        from api.broadcasting import broadcast_outbox
+        from api.utils import broadcast_room_update, broadcast_player_submitted
+        room, _ = create_room()
+        drain = listen(room)
+
+        broadcast_room_update(room)
+        for i in range(20):
+            broadcast_player_submitted(room, f'player{i}')
+        assert broadcast_outbox.wait_idle(timeout=5)
+        messages = drain()
+
+        assert messages[0]['type'] == 'room_update'
+        assert [message['player_username'] for message in messages[1:]] == [f'player{i}' for i in range(20)]
+
+    def test_nothing_sent_before_commit(self):
+        """Test that broadcasts inside a transaction wait for the commit and are dropped on rollback."""
+        from django.db import transaction
+        from api.broadcasting import broadcast_outbox
+        from api.utils import broadcast_player_submitted
+        room, _ = create_room()
+        drain = listen(room)
+
+        with transaction.atomic():
+            broadcast_player_submitted(room, 'committed')
+            assert broadcast_outbox.wait_idle(timeout=5)
+            assert drain() == []
+        try:
+            with transaction.atomic():
+                broadcast_player_submitted(room, 'rolled back')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        assert broadcast_outbox.wait_idle(timeout=5)
+
+        assert [message['player_username'] for message in drain()] == ['committed']
+
+    def test_drains_on_bound_loop(self):
+        """Test that events are sent from the bound event loop when it is running."""
+        import asyncio
+        import threading
+        from api.broadcasting import broadcast_outbox
+        from api.utils import broadcast_player_submitted
+        room, _ = create_room()
+        drain = listen(room)
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            broadcast_outbox.bind_loop(loop)
+            broadcast_player_submitted(room, 'player0')
+            assert broadcast_outbox.wait_idle(timeout=5)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+        assert [message['type'] for message in drain()] == ['player_submitted_notification']
+
+    def test_async_variants(self):
+        """Test that the async broadcast helpers send without going through the outbox."""
+        from api.utils import abroadcast_room_update, abroadcast_player_submitted
+
+        room, _ = create_room()
+        drain = listen(room)
+
+        async def body():
+            await abroadcast_room_update(room, removed_user_id=7)
+            await abroadcast_player_submitted(room, 'player1', True)
+
+        async_to_sync(body)()
+
+        assert [message['type'] for message in drain()] == [
+            'room_update',
+            'player_removed_notification',
+            'player_submitted_notification',
+        ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRoundResultsBroadcast:
+    """Test suite for the round_results message pushed when a round is scored."""
+
+    def _submit(self, room, answers):
+        """Submits one answer per room player (in join order) for the current round and scores the round."""
+        from api.models import PlayerAnswer
+        from api.views.game_session_view import recalculate_all_scores, record_submission
+        game_session = room.game_session
+        for room_player, answer in zip(room.players.order_by('id'), answers):
+            player_answer = PlayerAnswer.objects.create(
+                game_session=game_session, player=room_player,
+                round_number=game_session.current_round, answers={'miasto': answer}
+            )
+            record_submission(game_session, player_answer)
+        recalculate_all_scores(game_session, game_session.current_round)
+
+    def _start(self, room):
+        from api.models import GameSession
+        GameSession.objects.filter(room=room).update(letter='K', round_letters=['K'])
+        room.game_session.refresh_from_db()
+
+    def test_results_and_totals_pushed_once_round_scored(self):
+        """Test that scoring a round sends every player's points and running total to the room."""
+        room, _ = create_room(players=3)
+        self._start(room)
+        drain = listen(room)
+
+        self._submit(room, ['Kraków', 'Kraków', 'Kalisz'])
+        messages = drain()
+
+        room_player_ids = list(room.players.order_by('id').values_list('id', flat=True))
+        assert [message['type'] for message in messages] == ['round_results']
+        results = messages[0]
+        assert results['round_number'] == 1
+        assert [score['player'] for score in results['round_scores']] == room_player_ids
+        assert [score['points'] for score in results['round_scores']] == [5, 5, 10]
+        assert results['round_scores'][2]['points_per_category'] == {'miasto': 10}
+        assert results['round_scores'][2]['player_username'] == 'player2'
+        assert results['total_scores'] == dict(zip(map(str, room_player_ids), [5, 5, 10]))
+        assert results['game_completed'] is False
+
+    def test_totals_optional(self, settings):
+        """Test that ROUND_RESULTS_INCLUDE_TOTALS=False leaves the totals out."""
+        settings.ROUND_RESULTS_INCLUDE_TOTALS = False
+        room, _ = create_room(players=2)
+        self._start(room)
+        drain = listen(room)
+
+        self._submit(room, ['Kraków', 'Kalisz'])
+        results = drain()[0]
+
+        assert results['type'] == 'round_results'
+        assert 'total_scores' not in results
+        assert [score['points'] for score in results['round_scores']] == [10, 10]
+
+    def test_nothing_pushed_before_everyone_submitted(self):
+        """Test that no results are sent while players are still answering."""
+        room, _ = create_room(players=3)
+        self._start(room)
+        drain = listen(room)
+
+        self._submit(room, ['Kraków', 'Kalisz'])
+
+        assert drain() == []
@@ -0,0 +1,94 @@
+"""
+Tests for the versioned room snapshot cache.
+"""
+import json
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.conftest import create_room
+
+
+@pytest.mark.django_db
+class TestRoomSnapshotCache:
+    """Test suite for the room snapshot cache."""
+
+    def test_snapshot_reused_until_room_changes(self):
+        """Test that repeated reads are served from the cache without queries."""
+        from api.room_cache import get_room_snapshot, get_cache_stats
+        room, _ = create_room()
+
+        version, data = get_room_snapshot(room.id)
+        with CaptureQueriesContext(connection) as context:
+            cached_version, cached_data = get_room_snapshot(room.id)
+
+        assert len(context.captured_queries) == 0
+        assert (cached_version, cached_data) == (version, data)
+        assert json.loads(data)['player_count'] == 2
+        assert get_cache_stats()['hits'] == 1
+        assert get_cache_stats()['misses'] == 1
+
+    @pytest.mark.parametrize('mutation', ['add_player', 'remove_player', 'update_game_session', 'rename_room'])
+    def test_writes_bump_version(self, mutation):
+        """Test that Room, RoomPlayer and GameSession writes invalidate the snapshot."""
+        from django.contrib.auth import get_user_model
+        from api.models import RoomPlayer
+        from api.room_cache import get_room_data, get_room_version
+        room, _ = create_room()
+        get_room_data(room.id)
+        version = get_room_version(room.id)
+
+        if mutation == 'add_player':
+            RoomPlayer.objects.create(room=room, user=get_user_model().objects.create(username='newcomer'))
+        elif mutation == 'remove_player':
+            RoomPlayer.objects.filter(room=room).exclude(user=room.host).delete()
+        elif mutation == 'update_game_session':
+            room.game_session.total_rounds = 5
+            room.game_session.save()
+        else:
+            room.name = 'Renamed'
+            room.save()
+
+        assert get_room_version(room.id) > version
+        data = get_room_data(room.id)
+        assert data['player_count'] == {'add_player': 3, 'remove_player': 1}.get(mutation, 2)
+        assert data['game_session']['total_rounds'] == (5 if mutation == 'update_game_session' else 1)
+        assert data['name'] == ('Renamed' if mutation == 'rename_room' else 'Test Room')
+
+    def test_stale_snapshot_not_served_after_version_loss(self):
+        """Test that losing the version key never resurrects an old snapshot."""
+        from api.models import RoomPlayer
+        from api.room_cache import get_room_data, VERSION_KEY
+        room, _ = create_room()
+        get_room_data(room.id)
+
+        cache.delete(VERSION_KEY.format(room_id=room.id))
+        RoomPlayer.objects.filter(room=room).exclude(user=room.host).delete()
+
+        assert get_room_data(room.id)['player_count'] == 1
+
+    def test_missing_room(self):
+        """Test that a missing room raises DoesNotExist."""
+        import uuid
+        from api.models import Room
+        from api.room_cache import get_room_snapshot
+
+        with pytest.raises(Room.DoesNotExist):
+            get_room_snapshot(uuid.uuid4())
+
+    def test_broadcast_and_rest_share_snapshot(self, api_client, django_capture_on_commit_callbacks):
+        """Test that a broadcast and a REST read reuse a single serialization."""
+        from api.room_cache import get_cache_stats
+        from api.utils import broadcast_room_update
+        room, _ = create_room()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            broadcast_room_update(room)
+        api_client.force_authenticate(user=room.host)
+        response = api_client.get(f'/api/rooms/{room.id}/')
+
+        assert response.status_code == 200
+        assert response.data['player_count'] == 2
+        assert get_cache_stats()['misses'] == 1
+        assert get_cache_stats()['hits'] == 1
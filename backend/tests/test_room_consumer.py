@@ -0,0 +1,640 @@
+"""
+Tests for the RoomConsumer WebSocket endpoint.
+"""
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+
+from tests.conftest import create_room
+
+
+def communicator_for(room, user, token=None, subprotocols=None):
+    """Returns a WebsocketCommunicator connecting `user` (or the given access token) to the room's socket."""
+    from rest_framework_simplejwt.tokens import AccessToken
+    from api.routing import websocket_urlpatterns
+
+    if token is None:
+        token = str(AccessToken.for_user(user))
+    return WebsocketCommunicator(
+        URLRouter(websocket_urlpatterns),
+        f'/ws/room/{room.id}/?token={token}',
+        subprotocols=subprotocols
+    )
+
+
+def run(coroutine_function):
+    """Runs an async test body to completion."""
+    return async_to_sync(coroutine_function)()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRoomConsumer:
+    """Test suite for RoomConsumer."""
+
+    def test_connect_sends_room_update(self):
+        """Test that a member receives the full room document on connect."""
+        room, users = create_room()
+
+        async def body():
+            communicator = communicator_for(room, users[1])
+            connected, _ = await communicator.connect()
+            assert connected
+            message = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return message
+
+        message = run(body)
+
+        assert message['type'] == 'room_update'
+        assert message['data']['player_count'] == 2
+        assert message['version'] >= 1
+
+    def test_connect_not_broadcast_to_members(self):
+        """Test that the initial room_update goes only to the connecting socket."""
+        room, users = create_room()
+
+        async def body():
+            first = communicator_for(room, users[0])
+            await first.connect()
+            await first.receive_json_from()
+            second = communicator_for(room, users[1])
+            await second.connect()
+            initial = await second.receive_json_from()
+            nothing = await first.receive_nothing()
+            await first.disconnect()
+            await second.disconnect()
+            return initial, nothing
+
+        initial, nothing = run(body)
+
+        assert initial['type'] == 'room_update'
+        assert nothing is True
+
+    def test_connect_is_one_query_with_warm_caches(self):
+        """Test that a reconnect only queries the membership (user and snapshot come from the cache)."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework_simplejwt.tokens import AccessToken
+        room, users = create_room()
+        token = str(AccessToken.for_user(users[1]))
+
+        async def connect_once():
+            communicator = communicator_for(room, users[1], token)
+            connected, _ = await communicator.connect()
+            message = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return connected, message
+
+        run(connect_once)
+        with CaptureQueriesContext(connection) as context:
+            connected, message = run(connect_once)
+
+        assert connected
+        assert message['data']['player_count'] == 2
+        assert len(context.captured_queries) == 1
+
+    def test_non_member_rejected(self):
+        """Test that users outside the room cannot connect."""
+        from django.contrib.auth import get_user_model
+        room, _ = create_room()
+        outsider = get_user_model().objects.create(username='outsider')
+
+        async def body():
+            communicator = communicator_for(room, outsider)
+            connected, _ = await communicator.connect()
+            await communicator.disconnect()
+            return connected
+
+        assert run(body) is False
+
+    def test_resync_sends_full_document_to_requester(self):
+        """Test that a resync request is answered with a full room_update."""
+        room, users = create_room()
+
+        async def body():
+            communicator = communicator_for(room, users[0])
+            await communicator.connect()
+            initial = await communicator.receive_json_from()
+            await communicator.send_json_to({'type': 'resync'})
+            resync = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return initial, resync
+
+        initial, resync = run(body)
+
+        assert resync['type'] == 'room_update'
+        assert resync['data'] == initial['data']
+        assert resync['version'] == initial['version']
+
+    def test_draft_answers_saved_for_current_round(self):
+        """Test that a draft_answers message stores the player's draft and is acknowledged."""
+        from datetime import timedelta
+        from django.utils import timezone
+        from api.models import AnswerDraft, GameSession
+        from api.answer_drafts import get_drafts
+        room, users = create_room()
+        GameSession.objects.filter(room=room).update(
+            letter='K', round_letters=['K'], round_start_time=timezone.now() - timedelta(seconds=5)
+        )
+
+        async def body():
+            communicator = communicator_for(room, users[1])
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await communicator.send_json_to({
+                'type': 'draft_answers', 'answers': {'miasto': ' Kraków ', 'kolor': 'Khaki'}
+            })
+            ack = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return ack
+
+        ack = run(body)
+
+        room_player_id = room.players.get(user=users[1]).id
+        assert ack == {'type': 'draft_saved', 'round_number': 1}
+        assert get_drafts(room.game_session.id, 1, [room_player_id]) == {room_player_id: {'miasto': 'Kraków'}}
+        assert AnswerDraft.objects.get().player_id == room_player_id
+
+    def test_draft_reply_echoes_id(self):
+        """Test that the reply to a draft carries the ID the client sent with it."""
+        from datetime import timedelta
+        from channels.db import database_sync_to_async
+        from django.utils import timezone
+        from api.models import GameSession
+        room, users = create_room()
+
+        async def body():
+            communicator = communicator_for(room, users[1])
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await communicator.send_json_to({'type': 'draft_answers', 'id': 1, 'answers': {'miasto': 'Kraków'}})
+            error = await communicator.receive_json_from()
+            await database_sync_to_async(GameSession.objects.filter(room=room).update)(
+                letter='K', round_letters=['K'], round_start_time=timezone.now() - timedelta(seconds=5)
+            )
+            await communicator.send_json_to({'type': 'draft_answers', 'id': 2, 'answers': {'miasto': 'Kraków'}})
+            saved = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return error, saved
+
+        error, saved = run(body)
+
+        assert error == {'type': 'draft_error', 'error': 'Game has not started yet.', 'id': 1}
+        assert saved == {'type': 'draft_saved', 'round_number': 1, 'id': 2}
+
+    def test_draft_answers_rejected_before_start(self):
+        """Test that drafts are refused while the game has not started."""
+        from api.models import AnswerDraft
+        room, users = create_room()
+
+        async def body():
+            communicator = communicator_for(room, users[0])
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await communicator.send_json_to({'type': 'draft_answers', 'answers': {'miasto': 'Kraków'}})
+            reply = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return reply
+
+        assert run(body) == {'type': 'draft_error', 'error': 'Game has not started yet.'}
+        assert not AnswerDraft.objects.exists()
+
+    def test_draft_from_departed_player_rejected_and_closed(self):
+        """Test that a socket whose player left the room gets no draft saved and is closed for good."""
+        from datetime import timedelta
+        from channels.db import database_sync_to_async
+        from django.utils import timezone
+        from api.models import AnswerDraft, GameSession, RoomPlayer
+        from api.consumers import MEMBERSHIP_CLOSE_CODE, NOT_A_MEMBER
+        room, users = create_room()
+        GameSession.objects.filter(room=room).update(
+            letter='K', round_letters=['K'], round_start_time=timezone.now() - timedelta(seconds=5)
+        )
+
+        async def body():
+            communicator = communicator_for(room, users[1])
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await database_sync_to_async(RoomPlayer.objects.filter(room=room, user=users[1]).delete)()
+            await communicator.send_json_to({'type': 'draft_answers', 'answers': {'miasto': 'Kraków'}})
+            reply = await communicator.receive_json_from()
+            closed = await communicator.receive_output()
+            return reply, closed
+
+        reply, closed = run(body)
+
+        assert reply == {'type': 'draft_error', 'error': NOT_A_MEMBER}
+        assert closed == {'type': 'websocket.close', 'code': MEMBERSHIP_CLOSE_CODE}
+        assert not AnswerDraft.objects.exists()
+
+    def test_removed_player_socket_closed_after_notification(self):
+        """Test that the removed player's socket gets the notification and is then closed, other sockets stay open."""
+        from api.broadcasting import adeliver
+        from api.consumers import MEMBERSHIP_CLOSE_CODE
+        from api.utils import player_removed_event
+        room, users = create_room()
+
+        async def body():
+            host = communicator_for(room, users[0])
+            await host.connect()
+            await host.receive_json_from()
+            removed = communicator_for(room, users[1])
+            await removed.connect()
+            await removed.receive_json_from()
+            await adeliver(f'room_{room.id}', player_removed_event(users[1].id))
+            notifications = [await host.receive_json_from(), await removed.receive_json_from()]
+            closed = await removed.receive_output()
+            host_open = await host.receive_nothing()
+            await host.disconnect()
+            return notifications, closed, host_open
+
+        notifications, closed, host_open = run(body)
+
+        assert [notification['type'] for notification in notifications] == ['player_removed_notification'] * 2
+        assert closed == {'type': 'websocket.close', 'code': MEMBERSHIP_CLOSE_CODE}
+        assert host_open is True
+
+    def test_client_membership_events_only_resync_sender(self):
+        """Test that client-sent player_joined/left/removed refresh the sender only."""
+        room, users = create_room()
+
+        async def body():
+            first = communicator_for(room, users[0])
+            await first.connect()
+            await first.receive_json_from()
+            second = communicator_for(room, users[1])
+            await second.connect()
+            await second.receive_json_from()
+            replies = []
+            for message_type in ('player_joined', 'player_left', 'player_removed'):
+                await second.send_json_to({'type': message_type, 'player_id': 1})
+                replies.append(await second.receive_json_from())
+            nothing = await first.receive_nothing()
+            await first.disconnect()
+            await second.disconnect()
+            return replies, nothing
+
+        replies, nothing = run(body)
+
+        assert [reply['type'] for reply in replies] == ['room_update'] * 3
+        assert nothing is True
+
+    def test_inbound_messages_rate_limited_and_counted(self, settings):
+        """Test that messages over the per-connection limit are dropped and all are counted."""
+        from api.consumers import get_inbound_stats, reset_inbound_stats
+        settings.WS_INBOUND_RATE = 0.01
+        settings.WS_INBOUND_BURST = 3
+        room, users = create_room()
+        reset_inbound_stats()
+
+        async def body():
+            communicator = communicator_for(room, users[0])
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await communicator.send_to(text_data='not json')
+            await communicator.send_json_to({'type': 'bogus'})
+            for _ in range(4):
+                await communicator.send_json_to({'type': 'resync'})
+            replies = [await communicator.receive_json_from() for _ in range(2)]
+            nothing = await communicator.receive_nothing()
+            await communicator.disconnect()
+            return replies, nothing
+
+        replies, nothing = run(body)
+
+        assert [reply['type'] for reply in replies] == ['room_update'] * 2
+        assert nothing is True
+        assert get_inbound_stats() == {'invalid': 1, 'unknown': 1, 'resync': 2, 'rate_limited': 2}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBinarySubprotocol:
+    """Test suite for the MessagePack WebSocket subprotocol."""
+
+    def test_binary_client_gets_msgpack_frames(self):
+        """Test that a client offering the subprotocol gets the same messages as MessagePack."""
+        import msgpack
+        from api.wire_format import MSGPACK_SUBPROTOCOL
+        room, users = create_room()
+
+        async def body():
+            binary = communicator_for(room, users[0], subprotocols=[MSGPACK_SUBPROTOCOL])
+            connected, subprotocol = await binary.connect()
+            initial = await binary.receive_from()
+            await binary.send_to(bytes_data=msgpack.packb({'type': 'resync'}))
+            resync = await binary.receive_from()
+            text = communicator_for(room, users[1])
+            text_connected, text_subprotocol = await text.connect()
+            text_initial = await text.receive_json_from()
+            await binary.disconnect()
+            await text.disconnect()
+            return subprotocol, initial, resync, text_subprotocol, text_initial
+
+        subprotocol, initial, resync, text_subprotocol, text_initial = run(body)
+
+        assert subprotocol == MSGPACK_SUBPROTOCOL
+        assert text_subprotocol is None
+        assert isinstance(initial, bytes)
+        assert msgpack.unpackb(initial) == text_initial
+        assert msgpack.unpackb(resync) == text_initial
+
+    def test_broadcast_encoded_once(self, monkeypatch):
+        """Test that a broadcast is encoded once per wire format, however many sockets receive it."""
+        import msgpack
+        from api import wire_format
+        from api.broadcasting import adeliver
+        from api.utils import round_closed_event
+        room, users = create_room(players=4)
+        encodes = []
+        for name, encode in list(wire_format.WIRE_FORMATS.items()):
+            monkeypatch.setitem(
+                wire_format.WIRE_FORMATS, name,
+                lambda message, name=name, encode=encode: encodes.append(name) or encode(message)
+            )
+
+        async def body():
+            sockets = [
+                communicator_for(room, users[0], subprotocols=[wire_format.MSGPACK_SUBPROTOCOL]),
+                communicator_for(room, users[1], subprotocols=[wire_format.MSGPACK_SUBPROTOCOL]),
+                communicator_for(room, users[2]),
+                communicator_for(room, users[3]),
+            ]
+            for socket in sockets:
+                await socket.connect()
+                await socket.receive_from()
+            encodes.clear()
+            await adeliver(f'room_{room.id}', round_closed_event(2))
+            frames = [await socket.receive_from() for socket in sockets]
+            for socket in sockets:
+                await socket.disconnect()
+            return frames
+
+        frames = run(body)
+
+        expected = {'type': 'round_closed_notification', 'round_number': 2}
+        assert sorted(encodes) == sorted(wire_format.WIRE_FORMATS)
+        assert frames[0] == frames[1]
+        assert msgpack.unpackb(frames[0]) == expected
+        assert frames[2] == frames[3]
+        assert json.loads(frames[2]) == expected
+
+    def test_frames_encoded_per_socket_when_disabled(self, settings):
+        """Test that binary sockets still get frames when broadcasts are not pre-encoded."""
+        import msgpack
+        from api.broadcasting import adeliver
+        from api.utils import round_closed_event
+        from api.wire_format import MSGPACK_SUBPROTOCOL
+        settings.WS_PREENCODE_FRAMES = False
+        room, users = create_room()
+
+        async def body():
+            communicator = communicator_for(room, users[0], subprotocols=[MSGPACK_SUBPROTOCOL])
+            await communicator.connect()
+            await communicator.receive_from()
+            await adeliver(f'room_{room.id}', round_closed_event(1))
+            frame = await communicator.receive_from()
+            await communicator.disconnect()
+            return frame
+
+        assert msgpack.unpackb(run(body)) == {'type': 'round_closed_notification', 'round_number': 1}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCompressedSubprotocol:
+    """Test suite for the compressed JSON WebSocket subprotocol."""
+
+    def test_large_frames_compressed(self, settings):
+        """Test that frames above the threshold arrive compressed and small ones as text."""
+        import zlib
+        from api.wire_format import JSON_DEFLATE_SUBPROTOCOL
+        settings.WS_COMPRESSION_THRESHOLD = 300
+        room, users = create_room(players=5)
+
+        async def body():
+            compressed = communicator_for(room, users[0], subprotocols=[JSON_DEFLATE_SUBPROTOCOL])
+            connected, subprotocol = await compressed.connect()
+            initial = await compressed.receive_from()
+            await compressed.send_to(bytes_data=zlib.compress(b'{"type": "draft_answers", "answers": {}}'))
+            reply = await compressed.receive_from()
+            text = communicator_for(room, users[1])
+            await text.connect()
+            text_initial = await text.receive_json_from()
+            await compressed.disconnect()
+            await text.disconnect()
+            return subprotocol, initial, reply, text_initial
+
+        subprotocol, initial, reply, text_initial = run(body)
+
+        assert subprotocol == JSON_DEFLATE_SUBPROTOCOL
+        assert isinstance(initial, bytes)
+        assert json.loads(zlib.decompress(initial)) == text_initial
+        assert json.loads(reply) == {'type': 'draft_error', 'error': 'Game has not started yet.'}
+
+
+@pytest.fixture
+def stalled_sends(monkeypatch):
+    """Makes RoomConsumer frame sends wait while the returned event is cleared (it starts set)."""
+    import asyncio
+    from api.consumers import RoomConsumer
+    gate = {}
+    send_frame = RoomConsumer.send_frame
+
+    async def gated_send_frame(consumer, frame):
+        await gate['open'].wait()
+        await send_frame(consumer, frame)
+
+    monkeypatch.setattr(RoomConsumer, 'send_frame', gated_send_frame)
+
+    def make_gate():
+        gate['open'] = asyncio.Event()
+        gate['open'].set()
+        return gate['open']
+
+    return make_gate
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSlowConsumer:
+    """Test suite for per-socket backpressure in RoomConsumer."""
+
+    def test_pending_room_state_collapsed_to_latest_snapshot(self, stalled_sends):
+        """Test that room_patch frames queued behind a stalled send become one room_update of the latest snapshot."""
+        from api.broadcasting import adeliver
+        from api.consumers import get_outbound_stats, reset_outbound_stats
+        from api.utils import round_closed_event
+        room, users = create_room()
+
+        async def body():
+            gate = stalled_sends()
+            communicator = communicator_for(room, users[0])
+            await communicator.connect()
+            await communicator.receive_json_from()
+            reset_outbound_stats()
+            gate.clear()
+            for version in range(1, 4):
+                await adeliver(f'room_{room.id}', {
+                    'type': 'room_patch', 'base_version': version, 'version': version + 1, 'ops': []
+                })
+            await adeliver(f'room_{room.id}', round_closed_event(2))
+            await communicator.receive_nothing()
+            gate.set()
+            frames = [await communicator.receive_json_from() for _ in range(3)]
+            nothing = await communicator.receive_nothing()
+            await communicator.disconnect()
+            return frames, nothing
+
+        frames, nothing = run(body)
+
+        assert [frame['type'] for frame in frames] == ['room_patch', 'room_update', 'round_closed_notification']
+        assert frames[0]['version'] == 2
+        assert frames[1]['data']['id'] == str(room.id)
+        assert nothing is True
+        stats = get_outbound_stats()
+        assert stats['queued'] == 4
+        assert stats['collapsed'] == 1
+        assert stats['sent'] == 3
+        assert stats['max_depth'] == 2
+
+    def test_lagging_socket_evicted_with_resync_code(self, settings, stalled_sends):
+        """Test that a socket with WS_MAX_PENDING_FRAMES frames waiting is closed with the resync close code."""
+        from api.broadcasting import adeliver
+        from api.consumers import RESYNC_CLOSE_CODE, get_outbound_stats, reset_outbound_stats
+        from api.utils import round_closed_event
+        settings.WS_MAX_PENDING_FRAMES = 3
+        room, users = create_room()
+
+        async def body():
+            gate = stalled_sends()
+            communicator = communicator_for(room, users[0])
+            await communicator.connect()
+            await communicator.receive_json_from()
+            reset_outbound_stats()
+            gate.clear()
+            # The first frame is stuck being sent, the next three wait, the fifth is one too many
+            for round_number in range(5):
+                await adeliver(f'room_{room.id}', round_closed_event(round_number))
+            closed = await communicator.receive_output()
+            await communicator.wait()
+            return closed
+
+        closed = run(body)
+
+        assert closed == {'type': 'websocket.close', 'code': RESYNC_CLOSE_CODE}
+        stats = get_outbound_stats()
+        assert stats['evicted'] == 1
+        assert stats['discarded'] == 3
+        assert stats['depth'] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAckFlowControl:
+    """Test suite for holding room state frames until the client acks them."""
+
+    def test_unacked_room_frames_wait_and_collapse(self, settings):
+        """Test that room frames beyond the ack window wait, collapse, and go out once the client acks."""
+        from api.broadcasting import adeliver
+        from api.consumers import get_outbound_stats, reset_outbound_stats
+        from api.utils import round_closed_event
+        settings.WS_MAX_UNACKED_FRAMES = 1
+        room, users = create_room()
+
+        async def body():
+            communicator = communicator_for(room, users[0])
+            await communicator.connect()
+            snapshot = await communicator.receive_json_from()
+            await communicator.send_json_to({'type': 'ack', 'version': snapshot['version']})
+            reset_outbound_stats()
+            for version in range(1, 4):
+                await adeliver(f'room_{room.id}', {
+                    'type': 'room_patch', 'base_version': version, 'version': version + 1, 'ops': []
+                })
+            await adeliver(f'room_{room.id}', round_closed_event(2))
+            first = await communicator.receive_json_from()
+            held = await communicator.receive_nothing()
+            await communicator.send_json_to({'type': 'ack', 'version': first['version']})
+            released = [await communicator.receive_json_from() for _ in range(2)]
+            await communicator.disconnect()
+            return first, held, released
+
+        first, held, released = run(body)
+
+        assert (first['type'], first['version']) == ('room_patch', 2)
+        assert held is True
+        assert [frame['type'] for frame in released] == ['room_update', 'round_closed_notification']
+        assert released[0]['data']['id'] == str(room.id)
+        stats = get_outbound_stats()
+        assert stats['collapsed'] == 1
+        assert stats['stalled'] >= 1
+
+    def test_client_behind_on_acks_evicted(self, settings):
+        """Test that frames piling up behind a full ack window get the socket closed with the resync code."""
+        from api.broadcasting import adeliver
+        from api.consumers import RESYNC_CLOSE_CODE
+        from api.utils import round_closed_event
+        settings.WS_MAX_UNACKED_FRAMES = 1
+        settings.WS_MAX_PENDING_FRAMES = 3
+        room, users = create_room()
+
+        async def body():
+            communicator = communicator_for(room, users[0])
+            await communicator.connect()
+            snapshot = await communicator.receive_json_from()
+            await communicator.send_json_to({'type': 'ack', 'version': snapshot['version']})
+            await adeliver(f'room_{room.id}', {'type': 'room_patch', 'base_version': 1, 'version': 2, 'ops': []})
+            # Held behind the window: the room_update and two notifications; the third one is too many
+            await adeliver(f'room_{room.id}', {'type': 'room_patch', 'base_version': 2, 'version': 3, 'ops': []})
+            for round_number in range(3):
+                await adeliver(f'room_{room.id}', round_closed_event(round_number))
+            patch = await communicator.receive_json_from()
+            closed = await communicator.receive_output()
+            await communicator.wait()
+            return patch, closed
+
+        patch, closed = run(body)
+
+        assert patch['version'] == 2
+        assert closed == {'type': 'websocket.close', 'code': RESYNC_CLOSE_CODE}
+
+    def test_clients_without_acks_not_held(self, settings):
+        """Test that a client that never acks gets every frame (no flow control)."""
+        from api.broadcasting import adeliver
+        settings.WS_MAX_UNACKED_FRAMES = 1
+        room, users = create_room()
+
+        async def body():
+            communicator = communicator_for(room, users[0])
+            await communicator.connect()
+            await communicator.receive_json_from()
+            for version in range(1, 4):
+                await adeliver(f'room_{room.id}', {
+                    'type': 'room_patch', 'base_version': version, 'version': version + 1, 'ops': []
+                })
+            frames = [await communicator.receive_json_from() for _ in range(3)]
+            await communicator.disconnect()
+            return frames
+
+        assert [frame['version'] for frame in run(body)] == [2, 3, 4]
+
+
+class TestTokenBucket:
+    """Test suite for the per-connection rate limiter."""
+
+    def test_burst_then_refill(self, monkeypatch):
+        """Test that a full bucket allows a burst and then refills at the rate."""
+        from api import rate_limit
+        now = [100.0]
+        monkeypatch.setattr(rate_limit.time, 'monotonic', lambda: now[0])
+        bucket = rate_limit.TokenBucket(rate=2, burst=3)
+
+        assert [bucket.allow() for _ in range(4)] == [True, True, True, False]
+        now[0] += 0.5
+        assert [bucket.allow() for _ in range(2)] == [True, False]
+
+    def test_disabled(self):
+        """Test that a rate of 0 never limits."""
+        from api.rate_limit import TokenBucket
+        bucket = TokenBucket(rate=0, burst=1)
+
+        assert all(bucket.allow() for _ in range(100))
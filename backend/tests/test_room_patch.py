@@ -0,0 +1,194 @@
+"""
+Tests for delta-based room_patch WebSocket messages.
+"""
+import copy
+import json
+import random
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+
+from api.json_patch import make_patch, apply_patch
+from tests.conftest import create_room
+
+
+class TestJsonPatch:
+    """Test suite for the JSON Patch diff/apply helpers."""
+
+    def _random_document(self, rng, depth=0):
+        choice = rng.random()
+        if depth > 3 or choice < 0.3:
+            return rng.choice([1, 2, 'a', 'b', None, True])
+        if choice < 0.65:
+            return {rng.choice(['a', 'b', 'c/d', 'e~f']): self._random_document(rng, depth + 1) for _ in range(rng.randrange(4))}
+        return [self._random_document(rng, depth + 1) for _ in range(rng.randrange(5))]
+
+    def test_patch_round_trip(self):
+        """Test that applying a diff always reproduces the new document."""
+        rng = random.Random(3)
+        for _ in range(2000):
+            old = self._random_document(rng)
+            new = self._random_document(rng) if rng.random() < 0.5 else copy.deepcopy(old)
+            if isinstance(new, list) and rng.random() < 0.5:
+                new.insert(rng.randrange(len(new) + 1), self._random_document(rng))
+            ops = json.loads(json.dumps(make_patch(old, new)))
+
+            assert apply_patch(copy.deepcopy(old), ops) == new
+
+    def test_appended_player_is_single_operation(self):
+        """Test that adding one player to a list produces a single add operation."""
+        old = {'players': [{'id': i} for i in range(50)], 'player_count': 50}
+        new = {'players': [{'id': i} for i in range(51)], 'player_count': 51}
+
+        assert make_patch(old, new) == [
+            {'op': 'add', 'path': '/players/50', 'value': {'id': 50}},
+            {'op': 'replace', 'path': '/player_count', 'value': 51},
+        ]
+
+    def test_removed_player_is_single_operation(self):
+        """Test that removing a player from the middle of a list produces one remove."""
+        old = [{'id': i} for i in range(10)]
+        new = [item for item in old if item['id'] != 4]
+
+        assert make_patch(old, new) == [{'op': 'remove', 'path': '/4'}]
+
+
+@pytest.mark.django_db
+class TestRoomMessages:
+    """Test suite for choosing between room_patch and full room_update events."""
+
+    def test_first_broadcast_is_full_update(self):
+        """Test that a room without a previous broadcast gets a full room_update."""
+        from api.utils import build_room_message
+        room, _ = create_room()
+
+        message = build_room_message(room)
+
+        assert message['type'] == 'room_update'
+        assert message['data']['player_count'] == 2
+        assert message['version'] >= 1
+
+    def test_change_broadcast_as_patch(self):
+        """Test that a later broadcast carries only the changed fields."""
+        from api.utils import build_room_message
+        room, _ = create_room(players=20)
+        full = build_room_message(room)
+
+        room.game_session.round_timer_seconds = 90
+        room.game_session.save()
+        patch = build_room_message(room)
+
+        assert patch['type'] == 'room_patch'
+        assert patch['base_version'] == full['version']
+        assert patch['version'] > full['version']
+        paths = {op['path'] for op in patch['ops']}
+        assert '/game_session/round_timer_seconds' in paths
+        assert not any(path.startswith('/players') for path in paths)
+        patched = apply_patch(copy.deepcopy(full['data']), patch['ops'])
+        assert patched == build_room_message(room, full=True)['data']
+        assert len(json.dumps(patch)) < len(json.dumps(full)) / 4
+
+    def test_full_flag_forces_room_update(self):
+        """Test that full=True always builds a full document."""
+        from api.utils import build_room_message
+        room, _ = create_room()
+        build_room_message(room)
+
+        assert build_room_message(room, full=True)['type'] == 'room_update'
+
+    def test_unchanged_room_not_broadcast_again(self):
+        """Test that broadcasting a version that was already sent builds nothing, unless a full update is asked for."""
+        from api.utils import build_room_message
+        room, _ = create_room()
+        first = build_room_message(room)
+
+        assert build_room_message(room) is None
+        assert build_room_message(room, full=True)['version'] == first['version']
+
+    def test_overtaken_broadcast_dropped(self):
+        """Test that a broadcast of a version older than one already sent is dropped, not sent as a full update."""
+        from api.utils import build_room_message, claim_broadcast_base
+        room, _ = create_room()
+        current = build_room_message(room)
+        # Another worker broadcasts a newer version first
+        claim_broadcast_base(room.id, current['version'] + 1, b'{}')
+
+        assert build_room_message(room) is None
+
+    def test_concurrent_broadcasts_chain_bases(self):
+        """Test that broadcasts racing from the same last broadcast get distinct bases, in version order."""
+        import threading
+        from api.utils import claim_broadcast_base
+        room_id = 'race-room'
+        assert claim_broadcast_base(room_id, 1, b'{"v": 1}') is None
+        bases = {}
+        barrier = threading.Barrier(8)
+
+        def broadcast(version):
+            barrier.wait()
+            bases[version] = claim_broadcast_base(room_id, version, f'{{"v": {version}}}'.encode())
+
+        threads = [threading.Thread(target=broadcast, args=(version,)) for version in range(2, 10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        chained = {version: base[0] for version, base in bases.items() if isinstance(base, tuple)}
+        assert chained
+        assert len(set(chained.values())) == len(chained)
+        assert all(base < version for version, base in chained.items())
+        assert all(bases[version][1] == f'{{"v": {base}}}'.encode() for version, base in chained.items())
+
+    def test_stale_last_broadcast_hint_walks_chain(self):
+        """Test that a broadcast reading an outdated last broadcast still patches against the latest one."""
+        from django.core.cache import cache
+        from api.utils import claim_broadcast_base, LAST_BROADCAST_KEY, ALREADY_BROADCAST
+        room_id = 'stale-room'
+        claim_broadcast_base(room_id, 1, b'{"v": 1}')
+        claim_broadcast_base(room_id, 2, b'{"v": 2}')
+        cache.set(LAST_BROADCAST_KEY.format(room_id=room_id), 1)
+
+        assert claim_broadcast_base(room_id, 3, b'{"v": 3}') == (2, b'{"v": 2}')
+        assert claim_broadcast_base(room_id, 3, b'{"v": 3}') == ALREADY_BROADCAST
+        assert claim_broadcast_base(room_id, 2, b'{"v": 2}') == ALREADY_BROADCAST
+
+    def test_chain_links_deleted_behind_it(self):
+        """Test that only the newest links and snapshot of the broadcast chain stay in the cache."""
+        from django.core.cache import cache
+        from api.utils import claim_broadcast_base, NEXT_BROADCAST_KEY, BROADCAST_SNAPSHOT_KEY
+        room_id = 'long-room'
+        for version in range(1, 7):
+            claim_broadcast_base(room_id, version, f'{{"v": {version}}}'.encode())
+
+        links = [cache.get(NEXT_BROADCAST_KEY.format(room_id=room_id, version=version)) for version in range(1, 7)]
+        snapshots = [
+            version for version in range(1, 7)
+            if cache.get(BROADCAST_SNAPSHOT_KEY.format(room_id=room_id, version=version)) is not None
+        ]
+        assert links == [None, None, None, None, 6, None]
+        assert snapshots == [6]
+
+    def test_broadcast_delivers_patch_to_group(self, django_capture_on_commit_callbacks):
+        """Test that broadcast_room_update sends room_patch events through the channel layer."""
+        from channels.layers import get_channel_layer
+        from django.contrib.auth import get_user_model
+        from api.models import RoomPlayer
+        from api.utils import broadcast_room_update
+        from api.wire_format import client_message
+        room, _ = create_room()
+        channel_layer = get_channel_layer()
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(f'room_{room.id}', channel_name)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            broadcast_room_update(room)
+        first = client_message(async_to_sync(channel_layer.receive)(channel_name))
+        RoomPlayer.objects.create(room=room, user=get_user_model().objects.create(username='newcomer'))
+        with django_capture_on_commit_callbacks(execute=True):
+            broadcast_room_update(room)
+        second = client_message(async_to_sync(channel_layer.receive)(channel_name))
+
+        assert first['type'] == 'room_update'
+        assert second['type'] == 'room_patch'
+        assert apply_patch(first['data'], second['ops'])['player_count'] == 3
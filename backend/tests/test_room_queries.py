@@ -0,0 +1,81 @@
+"""
+Query-count tests for room serialization and broadcasts.
+"""
+import pytest
+from rest_framework import status
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.conftest import create_room
+
+
+def count_queries(func):
+    with CaptureQueriesContext(connection) as context:
+        result = func()
+    return len(context.captured_queries), result
+
+
+def broadcast_committed(capture_on_commit_callbacks, room):
+    """Broadcasts a room update and runs the on_commit callbacks it registered."""
+    from api.utils import broadcast_room_update
+    with capture_on_commit_callbacks(execute=True):
+        broadcast_room_update(room)
+
+
+@pytest.mark.django_db
+class TestRoomQueryCounts:
+    """Test suite pinning the number of queries needed to serialize a room."""
+
+    def test_serialize_room_with_details(self):
+        """Test that serializing a room loaded with with_details() is constant-cost."""
+        from api.models import Room
+        from api.serializers.room_serializer import RoomSerializer
+
+        counts = []
+        for players in (2, 20):
+            room, _ = create_room(players, prefix=f'room{players}_')
+            count, data = count_queries(
+                lambda: RoomSerializer(Room.objects.with_details().get(pk=room.pk)).data
+            )
+            assert data['player_count'] == players
+            assert len(data['players']) == players
+            assert data['game_session']['selected_types'] == ['miasto']
+            counts.append(count)
+
+        assert counts[0] == counts[1] == 2
+
+    def test_broadcast_room_update(self, django_capture_on_commit_callbacks):
+        """Test that broadcasting a room update does not issue per-player queries."""
+        from api.models import Room
+
+        counts = []
+        for players in (2, 20):
+            room, _ = create_room(players, prefix=f'room{players}_')
+            room = Room.objects.get(pk=room.pk)
+            count, _ = count_queries(lambda: broadcast_committed(django_capture_on_commit_callbacks, room))
+            counts.append(count)
+
+        assert counts[0] == counts[1] == 2
+
+    def test_broadcast_reuses_prefetched_room(self, django_capture_on_commit_callbacks):
+        """Test that a room already loaded with with_details() is not reloaded."""
+        from api.models import Room
+
+        room = Room.objects.with_details().get(pk=create_room(5)[0].pk)
+        count, _ = count_queries(lambda: broadcast_committed(django_capture_on_commit_callbacks, room))
+
+        assert count == 0
+
+    def test_room_detail_view(self, api_client):
+        """Test that the room detail endpoint is constant-cost."""
+        counts = []
+        for players in (2, 20):
+            room, _ = create_room(players, prefix=f'room{players}_')
+            api_client.force_authenticate(user=room.host)
+            count, response = count_queries(lambda: api_client.get(f'/api/rooms/{room.id}/'))
+            assert response.status_code == status.HTTP_200_OK
+            assert response.data['player_count'] == players
+            counts.append(count)
+
+        assert counts[0] == counts[1]
+        assert counts[1] <= 3
@@ -0,0 +1,164 @@
+"""
+Tests for durable, multi-worker round deadlines.
+"""
+import threading
+import time
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import OperationalError, close_old_connections
+from django.utils import timezone
+
+
+def create_games(count, prefix='host'):
+    """Creates rooms whose single player has submitted round 1 of 3; returns their game sessions."""
+    from django.contrib.auth import get_user_model
+    from api.models import Room, RoomPlayer, GameSession, PlayerAnswer
+    User = get_user_model()
+
+    game_sessions = []
+    for i in range(count):
+        user = User.objects.create(username=f'{prefix}{i}')
+        room = Room.objects.create(host=user, name=f'Room {i}')
+        game_session = GameSession.objects.create(
+            room=room, selected_types=['miasto'], total_rounds=3, letter='A', round_letters=['A']
+        )
+        room_player = RoomPlayer.objects.create(room=room, user=user)
+        PlayerAnswer.objects.create(game_session=game_session, player=room_player, round_number=1, answers={})
+        game_sessions.append(game_session)
+    return game_sessions
+
+
+def current_rounds(game_sessions):
+    from api.models import GameSession
+    rounds = dict(GameSession.objects.filter(id__in=[g.id for g in game_sessions]).values_list('id', 'current_round'))
+    return [rounds[g.id] for g in game_sessions]
+
+
+@pytest.mark.django_db
+class TestRoundDeadlines:
+    """Test suite for claiming and applying round deadlines."""
+
+    def test_workers_claim_disjoint_deadlines(self):
+        """Test that concurrent claims never hand the same deadline to two workers."""
+        from api.round_deadlines import schedule_round_deadline, claim_due_deadlines
+        for game_session in create_games(5):
+            schedule_round_deadline(game_session, 0)
+
+        claims = {worker: claim_due_deadlines(worker, limit=3) for worker in ('worker-a', 'worker-b', 'worker-c')}
+
+        claimed_ids = [deadline.id for deadlines in claims.values() for deadline in deadlines]
+        assert len(claims['worker-a']) == 3
+        assert len(claims['worker-b']) == 2
+        assert claims['worker-c'] == []
+        assert len(set(claimed_ids)) == 5
+
+    def test_future_deadline_not_claimed(self):
+        """Test that deadlines are not claimed before they are due."""
+        from api.round_deadlines import schedule_round_deadline, process_due_deadlines
+        game_sessions = create_games(1)
+        schedule_round_deadline(game_sessions[0], 60)
+
+        assert process_due_deadlines('worker-a') == 0
+        assert current_rounds(game_sessions) == [1]
+
+    def test_expired_claim_applied_exactly_once(self):
+        """Test that a dead worker's claim is taken over and the round advances once."""
+        from api.models import RoundDeadline
+        from api.round_deadlines import schedule_round_deadline, claim_due_deadlines, run_deadline
+        game_sessions = create_games(1)
+        schedule_round_deadline(game_sessions[0], 0)
+
+        [stale] = claim_due_deadlines('worker-a', lease_seconds=30)
+        assert claim_due_deadlines('worker-b') == []
+        later = timezone.now() + timedelta(seconds=31)
+        [taken_over] = claim_due_deadlines('worker-b', now=later)
+
+        assert run_deadline(taken_over, 'worker-b') is True
+        assert run_deadline(stale, 'worker-a') is False
+        assert current_rounds(game_sessions) == [2]
+        assert not RoundDeadline.objects.filter(kind=RoundDeadline.ADVANCE).exists()
+
+    def test_deadline_for_past_round_does_not_advance(self):
+        """Test that a deadline for a round that already ended is dropped without advancing."""
+        from api.models import RoundDeadline
+        from api.round_deadlines import schedule_round_deadline, process_due_deadlines
+        game_sessions = create_games(1)
+        schedule_round_deadline(game_sessions[0], 0)
+        schedule_round_deadline(game_sessions[0], 0)
+        game_sessions[0].current_round = 2
+        game_sessions[0].save()
+
+        assert process_due_deadlines('worker-a') == 1
+        assert current_rounds(game_sessions) == [2]
+        assert not RoundDeadline.objects.filter(kind=RoundDeadline.ADVANCE).exists()
+
+    def test_schedule_round_advancement_persists_deadline(self):
+        """Test that scheduling an advancement stores one deadline per round."""
+        from api.models import RoundDeadline
+        from api.utils import schedule_round_advancement
+        game_session = create_games(1)[0]
+
+        schedule_round_advancement(game_session.room, delay_seconds=10)
+        schedule_round_advancement(game_session.room, delay_seconds=20)
+
+        deadline = RoundDeadline.objects.get()
+        assert deadline.round_number == 1
+        assert deadline.due_at > timezone.now() + timedelta(seconds=15)
+
+    def test_management_command(self):
+        """Test that process_round_deadlines --once applies due deadlines."""
+        from api.round_deadlines import schedule_round_deadline
+        game_sessions = create_games(2)
+        for game_session in game_sessions:
+            schedule_round_deadline(game_session, 0)
+
+        output = StringIO()
+        call_command('process_round_deadlines', '--once', '--worker-id', 'cli', stdout=output)
+
+        assert 'cli: applied 2 round deadlines' in output.getvalue()
+        assert current_rounds(game_sessions) == [2, 2]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentDeadlineWorkers:
+    """Test suite running several deadline workers at once."""
+
+    def test_each_deadline_applied_once(self):
+        """Test that parallel workers share the deadlines and advance each round exactly once."""
+        from api.models import RoundDeadline
+        from api.round_deadlines import schedule_round_deadline, process_due_deadlines
+        game_sessions = create_games(20)
+        for game_session in game_sessions:
+            schedule_round_deadline(game_session, 0)
+        processed = {}
+        errors = []
+
+        def worker(worker_id):
+            try:
+                deadline = time.monotonic() + 20
+                while time.monotonic() < deadline:
+                    try:
+                        count = process_due_deadlines(worker_id, limit=3, lease_seconds=1)
+                        processed[worker_id] = processed.get(worker_id, 0) + count
+                        if not count and not RoundDeadline.objects.filter(kind=RoundDeadline.ADVANCE).exists():
+                            return
+                    except OperationalError:
+                        # SQLite test databases report lock contention instead of waiting
+                        time.sleep(0.01)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=worker, args=(f'worker-{i}',)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert sum(processed.values()) == 20
+        assert current_rounds(game_sessions) == [2] * 20
+        assert not RoundDeadline.objects.filter(kind=RoundDeadline.ADVANCE).exists()
@@ -0,0 +1,302 @@
+"""
+Tests for server-side round expiry and answer drafts.
+"""
+import time
+import pytest
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from tests.conftest import create_game
+
+
+@pytest.mark.django_db
+class TestSaveDraftView:
+    """Test suite for the answer draft endpoint."""
+
+    def test_draft_saved_without_answer_or_broadcast(self, api_client, settings, django_capture_on_commit_callbacks):
+        """Test that saving a draft only writes the draft store, and the database in a later batch."""
+        from api.models import PlayerAnswer, AnswerDraft
+        from api.answer_drafts import get_drafts, flush_drafts
+        settings.ANSWER_DRAFT_FLUSH_SECONDS = 60
+        game_session, room_players = create_game(2)
+        api_client.force_authenticate(user=room_players[1].user)
+
+        with CaptureQueriesContext(connection) as context, \
+                django_capture_on_commit_callbacks() as callbacks:
+            response = api_client.post(
+                f'/api/rooms/{game_session.room_id}/game-session/draft/',
+                {'answers': {'miasto': ' Kraków ', 'rzecz': 'Klucz'}},
+                format='json'
+            )
+
+        assert response.status_code == 200
+        assert response.data == {'round_number': 1}
+        assert len(context.captured_queries) == 1
+        assert callbacks == []
+        assert not PlayerAnswer.objects.exists()
+        assert get_drafts(game_session.id, 1, [room_players[1].id]) == {room_players[1].id: {'miasto': 'Kraków'}}
+        assert not AnswerDraft.objects.exists()
+
+        assert flush_drafts() == 1
+        assert AnswerDraft.objects.get().answers == {'miasto': 'Kraków'}
+
+    def test_non_member_rejected(self, api_client):
+        """Test that users outside the room cannot save drafts."""
+        from django.contrib.auth import get_user_model
+        game_session, _ = create_game(1)
+        api_client.force_authenticate(user=get_user_model().objects.create(username='outsider'))
+
+        response = api_client.post(
+            f'/api/rooms/{game_session.room_id}/game-session/draft/',
+            {'answers': {'miasto': 'Kraków'}},
+            format='json'
+        )
+
+        assert response.status_code == 403
+
+    @pytest.mark.parametrize('endpoint', ['draft', 'submit'])
+    def test_expired_round_rejected(self, api_client, endpoint):
+        """Test that drafts and submissions are refused once the round timer (and grace) ran out."""
+        game_session, room_players = create_game(1, seconds_left=-10)
+        api_client.force_authenticate(user=room_players[0].user)
+
+        response = api_client.post(
+            f'/api/rooms/{game_session.room_id}/game-session/{endpoint}/',
+            {'answers': {'miasto': 'Kraków'}},
+            format='json'
+        )
+
+        assert response.status_code == 400
+        assert response.data['error'] == 'Round time is over.'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestDraftBatching:
+    """Test suite for batched database writes of answer drafts."""
+
+    def test_drafts_written_in_one_batch(self, settings):
+        """Test that repeated saves are buffered and written once, latest draft per player."""
+        from api.models import AnswerDraft
+        from api.answer_drafts import save_draft
+        from api.scheduler import round_scheduler
+        settings.ANSWER_DRAFT_FLUSH_SECONDS = 0.05
+        game_session, room_players = create_game(2)
+        fired = round_scheduler.get_stats()['fired']
+
+        save_draft(game_session.id, 1, room_players[0].id, {'miasto': 'K'})
+        save_draft(game_session.id, 1, room_players[0].id, {'miasto': 'Kraków'})
+        save_draft(game_session.id, 1, room_players[1].id, {'kolor': 'Khaki'})
+
+        try:
+            # Wait on the scheduler rather than polling the database, which would
+            # compete with the flush for the SQLite test database lock
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                stats = round_scheduler.get_stats()
+                if stats['fired'] > fired and stats['running'] == 0:
+                    break
+                time.sleep(0.01)
+        finally:
+            round_scheduler.close()
+
+        assert round_scheduler.get_stats()['fired'] == fired + 1
+        drafts = dict(AnswerDraft.objects.values_list('player_id', 'answers'))
+        assert drafts == {room_players[0].id: {'miasto': 'Kraków'}, room_players[1].id: {'kolor': 'Khaki'}}
+
+
+    def test_drafts_of_deleted_player_dropped(self, settings):
+        """Test that a draft buffered for a player deleted since does not block the rest of the batch."""
+        from api.models import AnswerDraft, RoomPlayer
+        from api.answer_drafts import save_draft, flush_drafts, _pending_drafts
+        settings.ANSWER_DRAFT_FLUSH_SECONDS = 60
+        game_session, room_players = create_game(2)
+        save_draft(game_session.id, 1, room_players[0].id, {'miasto': 'Kraków'})
+        RoomPlayer.objects.filter(id=room_players[1].id).delete()
+        # A stale socket on another worker keeps saving drafts for the deleted player
+        save_draft(game_session.id, 1, room_players[1].id, {'miasto': 'Kalisz'})
+
+        assert flush_drafts() == 1
+        assert _pending_drafts == {}
+        assert dict(AnswerDraft.objects.values_list('player_id', 'answers')) == {room_players[0].id: {'miasto': 'Kraków'}}
+
+    def test_deleting_player_discards_buffered_drafts(self, settings):
+        """Test that deleting a player or game session drops this worker's buffered drafts for it."""
+        from api.models import AnswerDraft, GameSession, RoomPlayer
+        from api.answer_drafts import save_draft, flush_drafts
+        settings.ANSWER_DRAFT_FLUSH_SECONDS = 60
+        game_session, room_players = create_game(2)
+        save_draft(game_session.id, 1, room_players[0].id, {'miasto': 'Kraków'})
+        save_draft(game_session.id, 1, room_players[1].id, {'miasto': 'Kalisz'})
+
+        RoomPlayer.objects.filter(id=room_players[1].id).delete()
+        assert flush_drafts() == 1
+        save_draft(game_session.id, 1, room_players[0].id, {'miasto': 'Kutno'})
+        GameSession.objects.filter(id=game_session.id).delete()
+
+        assert flush_drafts() == 0
+        assert not AnswerDraft.objects.exists()
+
+
+@pytest.mark.django_db
+class TestCloseRound:
+    """Test suite for closing rounds when their timer runs out."""
+
+    def test_missing_answers_taken_from_drafts(self, django_capture_on_commit_callbacks):
+        """Test that late players' drafts are scored together with the submitted answers."""
+        from api.models import PlayerAnswer, PlayerScore, AnswerDraft
+        from api.answer_drafts import save_draft, get_drafts
+        from api.views.game_session_view import close_round
+        game_session, room_players = create_game(3, seconds_left=-3)
+        PlayerAnswer.objects.create(
+            game_session=game_session, player=room_players[0], round_number=1, answers={'miasto': 'Kraków'}
+        )
+        save_draft(game_session.id, 1, room_players[1].id, {'miasto': 'Kraków', 'kolor': 'Khaki'})
+
+        with django_capture_on_commit_callbacks(execute=True):
+            created = close_round(game_session, 1)
+
+        assert created == 2
+        answers = {
+            answer.player_id: answer
+            for answer in PlayerAnswer.objects.filter(game_session=game_session, round_number=1)
+        }
+        assert answers[room_players[1].id].answers == {'miasto': 'Kraków', 'kolor': 'Khaki'}
+        assert answers[room_players[2].id].answers == {}
+        assert [answers[room_player.id].points for room_player in room_players] == [5, 20, 0]
+        assert PlayerScore.objects.get(room_player=room_players[1]).total_points == 20
+        assert get_drafts(game_session.id, 1, [room_players[1].id]) == {}
+        assert not AnswerDraft.objects.exists()
+
+    def test_drafts_read_from_database_when_not_cached(self, django_capture_on_commit_callbacks):
+        """Test that drafts saved through another worker (only in the database) are scored."""
+        from api.models import PlayerAnswer
+        from api.answer_drafts import save_draft
+        from api.views.game_session_view import close_round
+        game_session, room_players = create_game(1, seconds_left=-3)
+        save_draft(game_session.id, 1, room_players[0].id, {'miasto': 'Kraków'})
+        cache.clear()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert close_round(game_session, 1) == 1
+
+        assert PlayerAnswer.objects.get(player=room_players[0]).answers == {'miasto': 'Kraków'}
+
+    def test_answer_submitted_while_closing_kept(self, monkeypatch, django_capture_on_commit_callbacks):
+        """Test that a submit landing while the round closes keeps its answer and is counted once."""
+        from api.models import PlayerAnswer
+        from api.counters import get_submission_counts
+        from api.views import game_session_view
+        game_session, room_players = create_game(2, seconds_left=-3)
+        get_drafts = game_session_view.get_drafts
+
+        def submit_then_get_drafts(*args):
+            PlayerAnswer.objects.create(
+                game_session=game_session, player=room_players[0], round_number=1, answers={'miasto': 'Kraków'}
+            )
+            return get_drafts(*args)
+
+        monkeypatch.setattr(game_session_view, 'get_drafts', submit_then_get_drafts)
+        with django_capture_on_commit_callbacks(execute=True):
+            created = game_session_view.close_round(game_session, 1)
+
+        assert created == 1
+        assert PlayerAnswer.objects.get(player=room_players[0]).answers == {'miasto': 'Kraków'}
+        assert PlayerAnswer.objects.get(player=room_players[1]).answers == {}
+        assert get_submission_counts(game_session) == (1, 2, 2)
+
+    def test_submit_rechecks_expiry_under_lock(self, api_client, monkeypatch):
+        """Test that a submit whose round expired after the first check is refused, not saved."""
+        from api.models import PlayerAnswer
+        from api.views import game_session_view
+        game_session, room_players = create_game(1, seconds_left=30)
+        checks = iter([False, True])
+        monkeypatch.setattr(game_session_view, 'is_round_expired', lambda game_session: next(checks))
+        api_client.force_authenticate(user=room_players[0].user)
+
+        response = api_client.post(
+            f'/api/rooms/{game_session.room_id}/game-session/submit/',
+            {'answers': {'miasto': 'Kraków'}},
+            format='json'
+        )
+
+        assert response.status_code == 400
+        assert response.data['error'] == 'Round time is over.'
+        assert not PlayerAnswer.objects.exists()
+
+    def test_round_scored_after_late_player_left(self, django_capture_on_commit_callbacks):
+        """Test that a round whose only late player left is scored when it closes."""
+        from api.models import PlayerAnswer, RoomPlayer
+        from api.views.game_session_view import close_round
+        game_session, room_players = create_game(3, seconds_left=-3)
+        for room_player, city in zip(room_players[:2], ['Kraków', 'Kalisz']):
+            PlayerAnswer.objects.create(
+                game_session=game_session, player=room_player, round_number=1, answers={'miasto': city}
+            )
+        RoomPlayer.objects.filter(pk=room_players[2].pk).delete()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert close_round(game_session, 1) == 0
+
+        points = PlayerAnswer.objects.filter(game_session=game_session).values_list('points', flat=True)
+        assert list(points) == [10, 10]
+
+    def test_nothing_to_close(self):
+        """Test that rounds that moved on or are fully submitted are left alone."""
+        from api.models import PlayerAnswer
+        from api.views.game_session_view import close_round
+        game_session, room_players = create_game(1, seconds_left=-3)
+
+        assert close_round(game_session, 2) == 0
+        PlayerAnswer.objects.create(game_session=game_session, player=room_players[0], round_number=1, answers={})
+        assert close_round(game_session, 1) == 0
+
+
+@pytest.mark.django_db
+class TestRoundExpiryDeadline:
+    """Test suite for scheduling round expiry."""
+
+    def test_start_schedules_expiry(self, api_client):
+        """Test that starting a game stores an expiry deadline at the end of the round timer."""
+        from api.models import RoundDeadline
+        game_session, room_players = create_game(1)
+        api_client.force_authenticate(user=room_players[0].user)
+
+        response = api_client.post(f'/api/rooms/{game_session.room_id}/game-session/start/')
+
+        assert response.status_code == 200
+        deadline = RoundDeadline.objects.get(game_session=game_session, kind=RoundDeadline.EXPIRE)
+        assert deadline.round_number == 1
+        expected = timezone.now() + timedelta(seconds=62)
+        assert abs((deadline.due_at - expected).total_seconds()) < 2
+
+    def test_completing_all_categories_moves_expiry(self, api_client):
+        """Test that shortening the timer also brings the expiry forward."""
+        from api.models import RoundDeadline
+        game_session, room_players = create_game(2, seconds_left=50)
+        api_client.force_authenticate(user=room_players[0].user)
+
+        response = api_client.post(
+            f'/api/rooms/{game_session.room_id}/game-session/submit/',
+            {'answers': {'miasto': 'Kraków', 'kolor': 'Khaki'}},
+            format='json'
+        )
+
+        assert response.status_code == 200
+        deadline = RoundDeadline.objects.get(game_session=game_session, kind=RoundDeadline.EXPIRE)
+        expected = timezone.now() + timedelta(seconds=15 + 2)
+        assert abs((deadline.due_at - expected).total_seconds()) < 2
+
+    def test_due_expiry_closes_round(self):
+        """Test that processing a due expiry deadline scores the round once."""
+        from api.models import RoundDeadline, PlayerAnswer
+        from api.round_deadlines import schedule_round_deadline, process_due_deadlines
+        game_session, room_players = create_game(2, seconds_left=-3)
+        schedule_round_deadline(game_session, 0, kind=RoundDeadline.EXPIRE)
+
+        assert process_due_deadlines('worker-a') == 1
+
+        assert PlayerAnswer.objects.filter(game_session=game_session, round_number=1).count() == 2
+        assert not RoundDeadline.objects.filter(kind=RoundDeadline.EXPIRE).exists()
@@ -0,0 +1,150 @@
+"""
+Tests for the asyncio round scheduler.
+"""
+import threading
+import time
+import pytest
+
+from api.scheduler import RoundScheduler
+
+
+def wait_for(condition, timeout=5):
+    """Polls until condition() is true or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def make_scheduler():
+    """Creates schedulers and closes them after the test."""
+    schedulers = []
+
+    def make(**kwargs):
+        scheduler = RoundScheduler(**kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.close()
+
+
+class TestRoundScheduler:
+    """Test suite for RoundScheduler."""
+
+    def test_fires_in_deadline_order(self, make_scheduler):
+        """Test that timers fire in order of their deadlines, not of scheduling."""
+        scheduler = make_scheduler(max_workers=1)
+        fired = []
+
+        for key, delay in [('c', 0.15), ('a', 0.05), ('b', 0.1)]:
+            scheduler.schedule(key, delay, fired.append, key)
+
+        assert wait_for(lambda: len(fired) == 3)
+        assert fired == ['a', 'b', 'c']
+        assert scheduler.get_stats()['pending'] == 0
+
+    def test_cancel_and_reschedule(self, make_scheduler):
+        """Test that cancelled timers never fire and rescheduling a key replaces its timer."""
+        scheduler = make_scheduler()
+        fired = []
+
+        scheduler.schedule('room-a', 0.05, fired.append, 'a-first')
+        scheduler.schedule('room-a', 0.1, fired.append, 'a-second')
+        scheduler.schedule('room-b', 0.05, fired.append, 'b')
+        assert scheduler.cancel('room-b') is True
+        assert scheduler.cancel('room-b') is False
+        time.sleep(0.3)
+
+        assert fired == ['a-second']
+        stats = scheduler.get_stats()
+        assert stats['cancelled'] == 2
+        assert stats['fired'] == 1
+
+    def test_many_timers_use_one_thread(self, make_scheduler):
+        """Test that thousands of pending timers do not start a thread each."""
+        scheduler = make_scheduler()
+        threads_before = threading.active_count()
+
+        for i in range(5000):
+            scheduler.schedule(f'room-{i}', 60, lambda: None)
+
+        assert scheduler.get_stats()['pending'] == 5000
+        assert threading.active_count() <= threads_before + 1
+        for i in range(5000):
+            scheduler.cancel(f'room-{i}')
+        assert scheduler.get_stats()['pending'] == 0
+
+    def test_worker_concurrency_is_bounded(self, make_scheduler):
+        """Test that no more than max_workers callbacks run at once."""
+        scheduler = make_scheduler(max_workers=2)
+        lock = threading.Lock()
+        running = []
+        peak = []
+        done = []
+
+        def work():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+                done.append(1)
+
+        for i in range(6):
+            scheduler.schedule(f'room-{i}', 0, work)
+
+        assert wait_for(lambda: len(done) == 6)
+        assert max(peak) == 2
+
+    def test_lag_and_failures_recorded(self, make_scheduler):
+        """Test that timer lag is measured and failing callbacks are counted."""
+        scheduler = make_scheduler()
+
+        def fail():
+            raise RuntimeError('boom')
+
+        scheduler.schedule('room-a', 0.02, fail)
+
+        assert wait_for(lambda: scheduler.get_stats()['failed'] == 1)
+        stats = scheduler.get_stats()
+        assert stats['fired'] == 1
+        assert 0 <= stats['last_lag'] < 1
+        assert stats['max_lag'] >= stats['last_lag']
+
+
+@pytest.mark.django_db(transaction=True)
+class TestScheduleRoundAdvancement:
+    """Test suite for schedule_round_advancement."""
+
+    def test_advances_round_when_all_submitted(self):
+        """Test that a scheduled advancement moves the room to the next round."""
+        from django.contrib.auth import get_user_model
+        from api.models import Room, RoomPlayer, GameSession, PlayerAnswer
+        from api.scheduler import round_scheduler
+        from api.utils import schedule_round_advancement
+        user = get_user_model().objects.create(username='host')
+        room = Room.objects.create(host=user, name='Test Room')
+        game_session = GameSession.objects.create(
+            room=room, selected_types=['miasto'], total_rounds=2, letter='A', round_letters=['A']
+        )
+        room_player = RoomPlayer.objects.create(room=room, user=user)
+        PlayerAnswer.objects.create(game_session=game_session, player=room_player, round_number=1, answers={})
+
+        fired = round_scheduler.get_stats()['fired']
+
+        schedule_round_advancement(room, delay_seconds=0.01)
+
+        try:
+            # Wait on the scheduler rather than polling the database, which would
+            # compete with the worker for the SQLite test database lock
+            assert wait_for(lambda: round_scheduler.get_stats()['fired'] == fired + 1 and round_scheduler.get_stats()['running'] == 0)
+        finally:
+            round_scheduler.close()
+
+        assert GameSession.objects.get(pk=game_session.pk).current_round == 2
@@ -0,0 +1,313 @@
+"""
+Tests for the round scoring engine.
+"""
+import random
+import pytest
+
+from api.scoring import score_round, empty_state, apply_submission, materialize_state
+
+
+def legacy_recalculate(round_answers, letter):
+    """
+    Reference copy of the original recalculate_all_scores algorithm,
+    working on plain dicts instead of PlayerAnswer rows.
+    """
+    letter = letter.upper()
+    answers_by_type = {}
+    for key, answers in round_answers.items():
+        for game_type, answer in answers.items():
+            if game_type not in answers_by_type:
+                answers_by_type[game_type] = []
+            if not answer or not isinstance(answer, str):
+                continue
+            answer_clean = answer.strip()
+            if answer_clean and answer_clean[0].upper() == letter:
+                answers_by_type[game_type].append({'key': key, 'answer': answer_clean.lower()})
+
+    player_points = {key: 0 for key in round_answers}
+    player_points_per_category = {key: {} for key in round_answers}
+
+    for game_type, answer_list in answers_by_type.items():
+        for key in round_answers:
+            player_points_per_category[key][game_type] = 0
+        if len(answer_list) == 1:
+            key = answer_list[0]['key']
+            player_points[key] += 15
+            player_points_per_category[key][game_type] = 15
+        elif len(answer_list) > 1:
+            answer_counts = {}
+            for item in answer_list:
+                answer_counts.setdefault(item['answer'], []).append(item['key'])
+            for keys in answer_counts.values():
+                value = 10 if len(keys) == 1 else 5
+                for key in keys:
+                    player_points[key] += value
+                    player_points_per_category[key][game_type] = value
+
+    return {
+        key: {'points': player_points[key], 'points_per_category': player_points_per_category[key]}
+        for key in round_answers
+    }
+
+
+def random_round(rng, players, categories, letter):
+    """Builds a synthetic round with a mix of valid, invalid, shared and empty answers."""
+    vocabulary = [f'{letter}{word}' for word in ('ab', 'cd', 'ef', 'gh')] + ['zzz', '', '  ', None]
+    round_answers = {}
+    for player in range(players):
+        answers = {}
+        for category in categories:
+            if rng.random() < 0.1:
+                continue
+            answer = rng.choice(vocabulary)
+            if isinstance(answer, str) and rng.random() < 0.3:
+                answer = f'  {answer.upper()} '
+            answers[category] = answer
+        round_answers[player] = answers
+    return round_answers
+
+
+class TestScoreRound:
+    """Test suite for the scoring engine."""
+
+    def test_only_answer_gets_15(self):
+        """Test that the only valid answer in a category gets 15 points."""
+        result = score_round({1: {'miasto': 'Kraków'}, 2: {'miasto': ''}}, 'K')
+
+        assert result[1] == {'points': 15, 'points_per_category': {'miasto': 15}}
+        assert result[2] == {'points': 0, 'points_per_category': {'miasto': 0}}
+
+    def test_unique_and_repeated_answers(self):
+        """Test unique answers get 10 points and repeated answers get 5 points each."""
+        result = score_round({
+            1: {'miasto': 'Kraków'},
+            2: {'miasto': ' kraków '},
+            3: {'miasto': 'Katowice'},
+        }, 'k')
+
+        assert result[1]['points'] == 5
+        assert result[2]['points'] == 5
+        assert result[3]['points'] == 10
+
+    def test_wrong_letter_scores_zero(self):
+        """Test that answers not starting with the letter score nothing."""
+        result = score_round({1: {'miasto': 'Warszawa'}, 2: {'miasto': 'Kraków'}}, 'K')
+
+        assert result[1]['points_per_category'] == {'miasto': 0}
+        assert result[2]['points_per_category'] == {'miasto': 15}
+
+    def test_category_missing_for_some_players(self):
+        """Test that players who skipped a category get 0 for it."""
+        result = score_round({1: {'miasto': 'Kraków', 'kolor': 'Karmin'}, 2: {'miasto': 'Kalisz'}}, 'K')
+
+        assert result[2]['points_per_category'] == {'miasto': 10, 'kolor': 0}
+
+    def test_empty_round(self):
+        """Test scoring a round without answers."""
+        assert score_round({}, 'K') == {}
+
+    @pytest.mark.parametrize('players', [1, 2, 3, 7, 30, 120])
+    def test_matches_legacy_algorithm(self, players):
+        """Test that the engine gives the same scores as the original algorithm."""
+        rng = random.Random(players)
+        categories = ['panstwo', 'miasto', 'imie', 'zwierze', 'rzecz', 'kolor']
+        for _ in range(20):
+            letter = rng.choice('ABK')
+            round_answers = random_round(rng, players, categories, letter)
+
+            assert score_round(round_answers, letter) == legacy_recalculate(round_answers, letter)
+
+
+class TestIncrementalState:
+    """Test suite for the incremental scoring state."""
+
+    def test_matches_full_recompute(self):
+        """Test that folding submissions one by one gives the full-recompute scores."""
+        rng = random.Random(7)
+        categories = ['panstwo', 'miasto', 'imie', 'kolor']
+        for players in (1, 2, 5, 40):
+            round_answers = random_round(rng, players, categories, 'K')
+            state = empty_state()
+            for answers in round_answers.values():
+                apply_submission(state, answers, 'K')
+
+            assert materialize_state(state, round_answers, 'K') == score_round(round_answers, 'K')
+
+    def test_resubmission_replaces_previous_answers(self):
+        """Test that resubmitting removes the player's earlier answers from the state."""
+        rng = random.Random(11)
+        categories = ['panstwo', 'miasto', 'imie', 'kolor']
+        round_answers = random_round(rng, 10, categories, 'A')
+        first_answers = random_round(rng, 10, categories + ['rzecz'], 'A')
+        state = empty_state()
+        for answers in first_answers.values():
+            apply_submission(state, answers, 'A')
+        for key, answers in round_answers.items():
+            apply_submission(state, answers, 'A', previous_answers=first_answers[key])
+
+        assert materialize_state(state, round_answers, 'A') == score_round(round_answers, 'A')
+        assert 'rzecz' not in state['histograms']
+        assert state['answers'] == 10
+
+    def test_state_is_json_serializable(self):
+        """Test that the state survives a JSON round trip (it is stored in a JSONField)."""
+        import json
+
+        state = empty_state()
+        apply_submission(state, {'miasto': 'Kraków'}, 'K')
+        state = json.loads(json.dumps(state))
+        apply_submission(state, {'miasto': 'Kalisz'}, 'K', previous_answers={'miasto': 'Kraków'})
+        apply_submission(state, {'miasto': 'kalisz'}, 'K')
+        round_answers = {1: {'miasto': 'Kalisz'}, 2: {'miasto': 'kalisz'}}
+
+        assert materialize_state(state, round_answers, 'K')[1]['points'] == 5
+
+    def test_state_size_independent_of_players(self):
+        """Test that the state holds no per-player data, only the histograms."""
+        import json
+
+        state = empty_state()
+        for _ in range(200):
+            apply_submission(state, {'miasto': 'Kraków', 'kolor': 'Khaki'}, 'K')
+
+        assert state == {
+            'answers': 200,
+            'category_counts': {'miasto': 200, 'kolor': 200},
+            'histograms': {'miasto': {'kraków': 200}, 'kolor': {'khaki': 200}},
+        }
+        assert len(json.dumps(state)) < 200
+
+
+@pytest.mark.django_db
+class TestRecalculateAllScores:
+    """Test suite for persisting engine results from recalculate_all_scores."""
+
+    def _create_round(self, usernames, answers):
+        from django.contrib.auth import get_user_model
+        from api.models import Room, RoomPlayer, GameSession, PlayerAnswer
+        User = get_user_model()
+
+        users = [User.objects.create(username=username) for username in usernames]
+        room = Room.objects.create(host=users[0], name='Test Room')
+        game_session = GameSession.objects.create(
+            room=room, letter='K', selected_types=['miasto', 'kolor'], current_round=1
+        )
+        player_answers = []
+        for user, player_answers_dict in zip(users, answers):
+            room_player = RoomPlayer.objects.create(room=room, user=user)
+            if player_answers_dict is not None:
+                player_answers.append(PlayerAnswer.objects.create(
+                    game_session=game_session, player=room_player,
+                    round_number=1, answers=player_answers_dict
+                ))
+        return game_session, player_answers
+
+    def test_scores_persisted_when_all_submitted(self):
+        """Test that scores are written once every player has submitted."""
+        from api.views.game_session_view import recalculate_all_scores
+
+        game_session, player_answers = self._create_round(
+            ['host', 'player1', 'player2'],
+            [{'miasto': 'Kraków', 'kolor': 'Karmin'}, {'miasto': 'kraków'}, {'miasto': 'Kalisz', 'kolor': ''}]
+        )
+
+        recalculate_all_scores(game_session, 1)
+
+        for player_answer in player_answers:
+            player_answer.refresh_from_db()
+        assert [pa.points for pa in player_answers] == [20, 5, 10]
+        assert player_answers[0].points_per_category == {'miasto': 5, 'kolor': 15}
+        assert player_answers[2].points_per_category == {'miasto': 10, 'kolor': 0}
+
+    def test_scores_not_persisted_until_all_submitted(self):
+        """Test that nothing is scored while players are still missing."""
+        from api.views.game_session_view import recalculate_all_scores
+
+        game_session, player_answers = self._create_round(
+            ['host', 'player1'], [{'miasto': 'Kraków'}, None]
+        )
+
+        recalculate_all_scores(game_session, 1)
+
+        player_answers[0].refresh_from_db()
+        assert player_answers[0].points == 0
+        assert player_answers[0].points_per_category == {}
+
+    def test_incremental_state_materialized_with_single_bulk_update(self, django_assert_max_num_queries):
+        """Test that the last submit only materializes points from the stored state."""
+        from api.views.game_session_view import recalculate_all_scores, record_submission
+
+        usernames = [f'player{i}' for i in range(20)]
+        game_session, player_answers = self._create_round(usernames, [{'miasto': f'K{i % 5}'} for i in range(20)])
+        for player_answer in player_answers:
+            record_submission(game_session, player_answer)
+
+        # round completeness, answers, state, bulk update, running totals (select + upsert in a savepoint)
+        with django_assert_max_num_queries(8):
+            recalculate_all_scores(game_session, 1)
+
+        for player_answer in player_answers:
+            player_answer.refresh_from_db()
+        assert {pa.points for pa in player_answers} == {5}
+
+    def test_stale_state_is_rebuilt(self):
+        """Test that a state out of sync with the submitted answers is rebuilt."""
+        from api.models import RoomPlayer, RoundScoreState
+        from api.views.game_session_view import recalculate_all_scores, record_submission
+
+        game_session, player_answers = self._create_round(
+            ['host', 'player1', 'player2'],
+            [{'miasto': 'Kraków'}, {'miasto': 'Kraków'}, {'miasto': 'Kalisz'}]
+        )
+        for player_answer in player_answers:
+            record_submission(game_session, player_answer)
+        # Player leaves mid-round; their answer is deleted by cascade
+        RoomPlayer.objects.filter(id=player_answers[1].player_id).delete()
+
+        recalculate_all_scores(game_session, 1)
+
+        player_answers[0].refresh_from_db()
+        player_answers[2].refresh_from_db()
+        assert player_answers[0].points == 10
+        assert player_answers[2].points == 10
+        state = RoundScoreState.objects.get(game_session=game_session, round_number=1).state
+        assert state['answers'] == 2
+        assert state['histograms'] == {'miasto': {'kraków': 1, 'kalisz': 1}}
+
+    def test_submit_view_updates_state(self, api_client):
+        """Test that submitting answers updates the round's scoring state."""
+        from api.models import RoundScoreState
+
+        game_session, player_answers = self._create_round(['host', 'player1'], [None, None])
+        room = game_session.room
+        host = room.host
+
+        api_client.force_authenticate(user=host)
+        response = api_client.post(
+            f'/api/rooms/{room.id}/game-session/submit/',
+            {'answers': {'miasto': 'Kraków', 'kolor': ''}},
+            format='json'
+        )
+
+        assert response.status_code == 200
+        assert response.data['points'] is None
+        state = RoundScoreState.objects.get(game_session=game_session, round_number=1).state
+        assert state['histograms'] == {'miasto': {'kraków': 1}, 'kolor': {}}
+
+    def test_resubmit_view_replaces_previous_answers(self, api_client):
+        """Test that resubmitting through the view swaps the player's answers in the state."""
+        from api.models import RoundScoreState
+
+        game_session, player_answers = self._create_round(['host', 'player1'], [None, None])
+        room = game_session.room
+
+        api_client.force_authenticate(user=room.host)
+        for answers in ({'miasto': 'Kraków'}, {'miasto': 'Kalisz'}):
+            response = api_client.post(
+                f'/api/rooms/{room.id}/game-session/submit/', {'answers': answers}, format='json'
+            )
+            assert response.status_code == 200
+
+        state = RoundScoreState.objects.get(game_session=game_session, round_number=1).state
+        assert state['answers'] == 1
+        assert state['histograms'] == {'miasto': {'kalisz': 1}}
@@ -0,0 +1,176 @@
+"""
+Tests for the Room.player_count and GameSession.submitted_count counters.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.conftest import create_game
+
+
+def submit(game_session, room_player, round_number=None):
+    from api.models import PlayerAnswer
+    return PlayerAnswer.objects.create(
+        game_session=game_session, player=room_player,
+        round_number=round_number or game_session.current_round, answers={'miasto': 'Kraków'}
+    )
+
+
+def counts(game_session):
+    from api.counters import get_submission_counts
+    return get_submission_counts(game_session)
+
+
+@pytest.mark.django_db
+class TestPlayerCount:
+    """Test suite for Room.player_count."""
+
+    def test_join_and_leave_update_count(self, api_client):
+        """Test that joining, leaving and being removed keep the player count in sync."""
+        from django.contrib.auth import get_user_model
+        from api.models import Room, RoomPlayer
+        game_session, room_players = create_game(players=2)
+        room = game_session.room
+        newcomer = get_user_model().objects.create(username='newcomer')
+
+        api_client.force_authenticate(user=newcomer)
+        assert api_client.post('/api/rooms/join/', {'room_id': str(room.id)}, format='json').status_code == 200
+        joined = Room.objects.get(pk=room.pk).player_count
+        assert api_client.post(f'/api/rooms/{room.id}/leave/', {}, format='json').status_code == 200
+        left = Room.objects.get(pk=room.pk).player_count
+        RoomPlayer.objects.filter(pk=room_players[1].pk).delete()
+
+        assert (joined, left, Room.objects.get(pk=room.pk).player_count) == (3, 2, 1)
+
+    def test_stale_save_keeps_count(self):
+        """Test that saving a room loaded before players joined does not overwrite the count."""
+        from django.contrib.auth import get_user_model
+        from api.models import Room, RoomPlayer
+        game_session, _ = create_game(players=2)
+        stale_room = Room.objects.get(pk=game_session.room_id)
+
+        RoomPlayer.objects.create(room=stale_room, user=get_user_model().objects.create(username='late'))
+        stale_room.name = 'Renamed'
+        stale_room.save()
+
+        room = Room.objects.get(pk=stale_room.pk)
+        assert (room.name, room.player_count) == ('Renamed', 3)
+
+
+@pytest.mark.django_db
+class TestSubmittedCount:
+    """Test suite for GameSession.submitted_count."""
+
+    def test_submit_view_counts_first_submission_only(self, api_client):
+        """Test that a submit counts once per player, and resubmitting does not count again."""
+        game_session, room_players = create_game(players=2)
+
+        api_client.force_authenticate(user=room_players[0].user)
+        url = f'/api/rooms/{game_session.room_id}/game-session/submit/'
+        for answer in ('Kraków', 'Kalisz'):
+            response = api_client.post(url, {'answers': {'miasto': answer}}, format='json')
+            assert response.status_code == 200
+            assert response.data['points'] is None
+
+        assert counts(game_session) == (1, 1, 2)
+
+    def test_new_round_starts_over(self):
+        """Test that answers to a newer current round restart the count, and other rounds are not counted."""
+        game_session, room_players = create_game()
+        for room_player in room_players[:2]:
+            submit(game_session, room_player)
+
+        game_session.current_round = 2
+        game_session.save()
+        between_rounds = counts(game_session)
+        submit(game_session, room_players[0])
+        submit(game_session, room_players[2], round_number=1)
+
+        assert between_rounds == (2, 0, 3)
+        assert counts(game_session) == (2, 1, 3)
+
+    def test_leaving_player_answer_uncounted(self):
+        """Test that a player leaving mid-round takes their answer out of the count."""
+        from api.models import RoomPlayer
+        from api.serializers.player_answer_serializer import get_round_completeness
+        game_session, room_players = create_game()
+        submit(game_session, room_players[0])
+        submit(game_session, room_players[1])
+
+        RoomPlayer.objects.filter(pk=room_players[1].pk).delete()
+
+        assert counts(game_session) == (1, 1, 2)
+        assert get_round_completeness(game_session, [1]) == {1: False}
+
+    def test_deleting_answers_is_one_query(self):
+        """Test that deleting a game's answers does not update the count once per answer."""
+        from api.models import PlayerAnswer
+        game_session, room_players = create_game(players=30)
+        for round_number in (1, 2):
+            for room_player in room_players:
+                submit(game_session, room_player, round_number=round_number)
+
+        with CaptureQueriesContext(connection) as context:
+            PlayerAnswer.objects.filter(game_session=game_session).delete()
+
+        assert not PlayerAnswer.objects.exists()
+        assert len(context.captured_queries) == 1
+
+    def test_ending_game_resets_count(self, api_client):
+        """Test that ending the game session stops counting the deleted answers."""
+        game_session, room_players = create_game(players=2)
+        for room_player in room_players:
+            submit(game_session, room_player)
+
+        api_client.force_authenticate(user=room_players[0].user)
+        response = api_client.post(f'/api/rooms/{game_session.room_id}/game-session/end/', {}, format='json')
+
+        assert response.status_code == 200
+        assert counts(game_session) == (1, 0, 2)
+
+    def test_closed_round_counts_bulk_created_answers(self):
+        """Test that answers created for late players when a round closes are counted."""
+        from api.views.game_session_view import close_round
+        game_session, room_players = create_game()
+        submit(game_session, room_players[0])
+
+        assert close_round(game_session, 1) == 2
+        assert counts(game_session) == (1, 3, 3)
+
+    def test_stale_save_keeps_count(self):
+        """Test that saving a game session loaded before a submit does not lose the submit."""
+        from api.models import GameSession
+        game_session, room_players = create_game(players=2)
+        stale_session = GameSession.objects.get(pk=game_session.pk)
+
+        submit(game_session, room_players[0])
+        stale_session.round_advance_scheduled = True
+        stale_session.save()
+
+        assert counts(game_session) == (1, 1, 2)
+
+    def test_current_round_completeness_is_one_query(self):
+        """Test that checking the current round costs one query, whatever the number of players."""
+        from api.serializers.player_answer_serializer import get_round_completeness
+        game_session, room_players = create_game(players=20)
+        for room_player in room_players:
+            submit(game_session, room_player)
+
+        with CaptureQueriesContext(connection) as context:
+            completeness = get_round_completeness(game_session, [1])
+
+        assert completeness == {1: True}
+        assert len(context.captured_queries) == 1
+
+    def test_completeness_of_past_rounds(self):
+        """Test that rounds other than the current one are still checked against their answers."""
+        from api.serializers.player_answer_serializer import get_round_completeness
+        game_session, room_players = create_game(players=2)
+        for room_player in room_players:
+            submit(game_session, room_player)
+        game_session.current_round = 2
+        game_session.save()
+        submit(game_session, room_players[0])
+
+        assert get_round_completeness(game_session, [1, 2]) == {1: True, 2: False}
+        assert get_round_completeness(game_session) == {1: True, 2: False}
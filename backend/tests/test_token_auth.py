@@ -0,0 +1,90 @@
+"""
+Tests for WebSocket access token authentication and its user cache.
+"""
+import pytest
+from datetime import timedelta
+from django.core.cache import cache
+
+
+@pytest.fixture
+def user(db):
+    from django.contrib.auth import get_user_model
+    return get_user_model().objects.create_user(username='player', password='secretpass123')
+
+
+def access_token_for(user):
+    from rest_framework_simplejwt.tokens import AccessToken
+    return str(AccessToken.for_user(user))
+
+
+@pytest.mark.django_db
+class TestGetUserForToken:
+    """Test suite for get_user_for_token."""
+
+    def test_user_cached_after_first_connect(self, user, django_assert_num_queries):
+        """Test that only the first lookup of a token queries the database."""
+        from api.token_auth import get_user_for_token
+        token = access_token_for(user)
+
+        with django_assert_num_queries(1):
+            assert get_user_for_token(token) == user
+        with django_assert_num_queries(0):
+            assert get_user_for_token(token) == user
+
+    def test_password_change_invalidates_cache(self, user, django_assert_num_queries):
+        """Test that changing the password drops the cached user for every token."""
+        from api.token_auth import get_user_for_token
+        tokens = [access_token_for(user), access_token_for(user)]
+        for token in tokens:
+            get_user_for_token(token)
+
+        user.set_password('anotherpass456')
+        user.save()
+
+        with django_assert_num_queries(2):
+            for token in tokens:
+                assert get_user_for_token(token) == user
+
+    def test_deactivated_user_rejected(self, user):
+        """Test that a cached user is rejected once deactivated."""
+        from api.token_auth import get_user_for_token
+        token = access_token_for(user)
+        get_user_for_token(token)
+
+        user.is_active = False
+        user.save()
+
+        assert get_user_for_token(token) is None
+
+    def test_login_keeps_cache(self, user, django_assert_num_queries):
+        """Test that updating last_login (done on every login) keeps the cache warm."""
+        from django.contrib.auth.models import update_last_login
+        from api.token_auth import get_user_for_token
+        token = access_token_for(user)
+        get_user_for_token(token)
+
+        update_last_login(None, user)
+
+        with django_assert_num_queries(0):
+            assert get_user_for_token(token) == user
+
+    def test_invalid_tokens_rejected(self, user):
+        """Test that malformed, expired and refresh tokens are rejected."""
+        from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+        from api.token_auth import get_user_for_token
+        expired = AccessToken.for_user(user)
+        expired.set_exp(lifetime=-timedelta(seconds=1))
+
+        assert get_user_for_token('not-a-token') is None
+        assert get_user_for_token(str(expired)) is None
+        assert get_user_for_token(str(RefreshToken.for_user(user))) is None
+
+    def test_cache_disabled(self, user, settings, django_assert_num_queries):
+        """Test that WS_USER_CACHE_SECONDS = 0 loads the user on every lookup."""
+        from api.token_auth import get_user_for_token
+        settings.WS_USER_CACHE_SECONDS = 0
+        token = access_token_for(user)
+
+        with django_assert_num_queries(2):
+            get_user_for_token(token)
+            get_user_for_token(token)
@@ -0,0 +1,176 @@
+"""
+Tests for WebSocket frame encoding (api.wire_format).
+"""
+import json
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+
+class TestJsonEncoders:
+    """Test suite for the JSON encoder registry."""
+
+    @pytest.mark.parametrize('name', ['json', 'ujson', 'orjson'])
+    def test_encoders_agree(self, settings, name):
+        """Test that every available encoder produces the same document."""
+        from api.wire_format import JSON_ENCODERS, encode_json
+        if name not in JSON_ENCODERS:
+            pytest.skip(f'{name} is not installed')
+        settings.WS_JSON_ENCODER = name
+        message = {'type': 'room_update', 'data': {'name': 'Żółta/pokój', 'players': [1, None, True]}, 'version': 3}
+
+        frame = encode_json(message)
+
+        assert isinstance(frame, str)
+        assert json.loads(frame) == message
+
+    def test_unknown_encoder(self, settings):
+        """Test that an unavailable encoder is reported as a configuration error."""
+        from api.wire_format import encode_json
+        settings.WS_JSON_ENCODER = 'missing'
+
+        with pytest.raises(ImproperlyConfigured):
+            encode_json({'type': 'resync'})
+
+    def test_register_encoder(self, settings, monkeypatch):
+        """Test that registered encoders can be selected."""
+        from api import wire_format
+        monkeypatch.setattr(wire_format, 'JSON_ENCODERS', dict(wire_format.JSON_ENCODERS))
+        wire_format.register_json_encoder('sorted', lambda message: json.dumps(message, sort_keys=True))
+        settings.WS_JSON_ENCODER = 'sorted'
+
+        assert wire_format.encode_json({'b': 1, 'a': 2}) == '{"a": 2, "b": 1}'
+
+
+class TestFrames:
+    """Test suite for pre-encoded event frames."""
+
+    def test_attach_frames(self):
+        """Test that events carry their requested frames instead of the message, and clients never see the frames."""
+        import msgpack
+        from api.wire_format import attach_frames, client_message, get_frame, JSON_FORMAT, MSGPACK_SUBPROTOCOL
+        event = {'type': 'player_submitted_notification', 'player_username': 'ala', 'all_players_submitted': False}
+
+        framed = attach_frames(event, [MSGPACK_SUBPROTOCOL])
+
+        assert set(framed) == {'type', 'frames'}
+        assert set(framed['frames']) == {JSON_FORMAT, MSGPACK_SUBPROTOCOL}
+        assert client_message(framed) == event
+        assert json.loads(get_frame(framed, JSON_FORMAT)) == event
+        assert msgpack.unpackb(get_frame(framed, MSGPACK_SUBPROTOCOL)) == event
+
+    def test_attach_frames_keeps_routing_keys(self):
+        """Test that the fields consumers read stay on the event next to the frames."""
+        from api.wire_format import attach_frames
+        event = {'type': 'room_patch', 'base_version': 3, 'version': 4, 'ops': [], 'removed_user_id': 7}
+
+        framed = attach_frames(event, [])
+
+        assert {key: value for key, value in framed.items() if key != 'frames'} == {
+            'type': 'room_patch', 'version': 4, 'removed_user_id': 7
+        }
+
+    def test_only_formats_in_use_encoded(self):
+        """Test that broadcasts encode JSON plus the wire formats of open sockets, and others are encoded on demand."""
+        import msgpack
+        from api.wire_format import (
+            attach_frames, get_frame, use_wire_format, release_wire_format, JSON_FORMAT, MSGPACK_SUBPROTOCOL
+        )
+        event = {'type': 'round_closed_notification', 'round_number': 2}
+
+        json_only = attach_frames(event)
+        use_wire_format(MSGPACK_SUBPROTOCOL)
+        try:
+            with_msgpack = attach_frames(event)
+        finally:
+            release_wire_format(MSGPACK_SUBPROTOCOL)
+
+        assert set(json_only['frames']) == {JSON_FORMAT}
+        assert set(with_msgpack['frames']) == {JSON_FORMAT, MSGPACK_SUBPROTOCOL}
+        assert msgpack.unpackb(get_frame(json_only, MSGPACK_SUBPROTOCOL)) == event
+        assert set(attach_frames(event)['frames']) == {JSON_FORMAT}
+
+    def test_missing_format_encoded_once_per_process(self, monkeypatch):
+        """Test that a format the sender did not pre-encode is encoded once, however many sockets need it."""
+        import copy
+        import msgpack
+        from api import wire_format
+        event = {'type': 'round_closed_notification', 'round_number': 4}
+        framed = wire_format.attach_frames(event, [])
+        encodes = []
+        encode = wire_format.WIRE_FORMATS[wire_format.MSGPACK_SUBPROTOCOL]
+        monkeypatch.setitem(
+            wire_format.WIRE_FORMATS, wire_format.MSGPACK_SUBPROTOCOL,
+            lambda message: encodes.append(message) or encode(message)
+        )
+
+        # Sockets sharing the event (broker layer) and sockets with their own copy (in-memory, Redis)
+        frames = [wire_format.get_frame(framed, wire_format.MSGPACK_SUBPROTOCOL) for _ in range(3)]
+        frames += [wire_format.get_frame(copy.deepcopy(framed), wire_format.MSGPACK_SUBPROTOCOL) for _ in range(3)]
+
+        assert len(encodes) == 1
+        assert all(msgpack.unpackb(frame) == event for frame in frames)
+
+    def test_negotiate(self):
+        """Test that MessagePack is used only when the client offers it."""
+        from api.wire_format import negotiate, JSON_FORMAT, MSGPACK_SUBPROTOCOL
+
+        assert negotiate(['other', MSGPACK_SUBPROTOCOL]) == MSGPACK_SUBPROTOCOL
+        assert negotiate([]) == JSON_FORMAT
+
+
+class TestCompression:
+    """Test suite for the compressed JSON wire format."""
+
+    def test_frames_compressed_above_threshold(self, settings):
+        """Test that only frames of at least WS_COMPRESSION_THRESHOLD bytes are compressed."""
+        import zlib
+        from api.wire_format import encode_frame, JSON_DEFLATE_SUBPROTOCOL
+        settings.WS_COMPRESSION_THRESHOLD = 200
+        small = {'type': 'draft_saved', 'round_number': 1}
+        large = {'type': 'room_update', 'data': {'players': [{'username': f'player{i}'} for i in range(50)]}}
+
+        small_frame = encode_frame(small, JSON_DEFLATE_SUBPROTOCOL)
+        large_frame = encode_frame(large, JSON_DEFLATE_SUBPROTOCOL)
+
+        assert json.loads(small_frame) == small
+        assert isinstance(large_frame, bytes)
+        assert json.loads(zlib.decompress(large_frame)) == large
+        assert len(large_frame) < len(json.dumps(large)) / 3
+
+    def test_compression_disabled(self, settings):
+        """Test that a threshold of 0 never compresses."""
+        from api.wire_format import compress_frame
+        settings.WS_COMPRESSION_THRESHOLD = 0
+
+        assert compress_frame('x' * 10000) == 'x' * 10000
+
+    def test_attach_frames_compresses_json_frame(self, settings):
+        """Test that the compressed frame of a broadcast is built from its JSON frame."""
+        import zlib
+        from api.wire_format import attach_frames, get_frame, JSON_FORMAT, JSON_DEFLATE_SUBPROTOCOL
+        settings.WS_COMPRESSION_THRESHOLD = 1
+        event = {'type': 'round_closed_notification', 'round_number': 3}
+
+        framed = attach_frames(event, [JSON_DEFLATE_SUBPROTOCOL])
+
+        assert zlib.decompress(framed['frames'][JSON_DEFLATE_SUBPROTOCOL]).decode() == get_frame(framed, JSON_FORMAT)
+
+    def test_decode_compressed_client_frames(self):
+        """Test that compressed client frames are decoded and decompression bombs rejected."""
+        import zlib
+        from api.wire_format import decode_frame, JSON_DEFLATE_SUBPROTOCOL
+
+        frame = zlib.compress(json.dumps({'type': 'resync'}).encode())
+        assert decode_frame(None, frame, JSON_DEFLATE_SUBPROTOCOL) == {'type': 'resync'}
+        bomb = zlib.compress(json.dumps({'type': 'x' * 1000000}).encode())
+        with pytest.raises(ValueError):
+            decode_frame(None, bomb, JSON_DEFLATE_SUBPROTOCOL)
+        with pytest.raises(ValueError):
+            decode_frame(None, b'not zlib', JSON_DEFLATE_SUBPROTOCOL)
+
+    def test_negotiate_prefers_client_order(self):
+        """Test that the first supported subprotocol the client offered is used."""
+        from api.wire_format import negotiate, JSON_DEFLATE_SUBPROTOCOL, MSGPACK_SUBPROTOCOL
+
+        assert negotiate([JSON_DEFLATE_SUBPROTOCOL, MSGPACK_SUBPROTOCOL]) == JSON_DEFLATE_SUBPROTOCOL
+        assert negotiate([MSGPACK_SUBPROTOCOL, JSON_DEFLATE_SUBPROTOCOL]) == MSGPACK_SUBPROTOCOL
@@ -1,4 +1,5 @@
-import { useQuery, useMutation } from '@tanstack/react-query';
+import { useCallback } from 'react';
+import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import * as api from '../api/index.api';
 
 export const useMeData = () => {
@@ -93,6 +94,12 @@ export const useMutationSubmitAnswer = () => {
   });
 };
 
+export const useMutationSaveAnswerDraft = () => {
+  return useMutation({
+    mutationFn: ({ roomId, data }) => api.saveAnswerDraft(roomId, data),
+  });
+};
+
 export const usePlayerScores = (roomId, includeTotals = false) => {
   return useQuery({
     queryKey: ['playerScores', roomId, includeTotals],
@@ -101,6 +108,25 @@ export const usePlayerScores = (roomId, includeTotals = false) => {
   });
 };
 
+// Store a round_results WebSocket message as the usePlayerScores data, so
+// clients don't all fetch the scores when a round ends
+export const useSetRoundResults = (roomId, includeTotals = false) => {
+  const queryClient = useQueryClient();
+  return useCallback((results) => {
+    queryClient.setQueryData(['playerScores', roomId, includeTotals], (previous) => {
+      const previousData = previous?.data || {};
+      return {
+        ...previous,
+        data: {
+          round_scores: results.round_scores,
+          total_scores: results.total_scores ?? previousData.total_scores ?? {},
+          game_completed: results.game_completed ?? previousData.game_completed ?? false,
+        },
+      };
+    });
+  }, [queryClient, roomId, includeTotals]);
+};
+
 export const useMutationAdvanceRound = () => {
   return useMutation({
     mutationFn: (roomId) => api.advanceRound(roomId),
@@ -1,3 +1,59 @@
+// Apply JSON Patch operations (add/remove/replace) produced by the backend
+// for room_patch messages (see backend/api/json_patch.py)
+const applyJsonPatch = (document, ops) => {
+  let result = document;
+  ops.forEach((op) => {
+    if (op.path === '') {
+      result = op.value;
+      return;
+    }
+    const tokens = op.path.split('/').slice(1).map(
+      (token) => token.replace(/~1/g, '/').replace(/~0/g, '~')
+    );
+    let parent = result;
+    tokens.slice(0, -1).forEach((token) => {
+      parent = Array.isArray(parent) ? parent[parseInt(token, 10)] : parent[token];
+    });
+    const last = tokens[tokens.length - 1];
+    if (Array.isArray(parent)) {
+      const index = last === '-' ? parent.length : parseInt(last, 10);
+      if (op.op === 'add') {
+        parent.splice(index, 0, op.value);
+      } else if (op.op === 'remove') {
+        parent.splice(index, 1);
+      } else {
+        parent[index] = op.value;
+      }
+    } else if (op.op === 'remove') {
+      delete parent[last];
+    } else {
+      parent[last] = op.value;
+    }
+  });
+  return result;
+};
+
+// Application-level compression (see backend/api/wire_format.py): large frames
+// arrive as zlib-compressed binary frames, small ones as JSON text
+const JSON_DEFLATE_SUBPROTOCOL = 'lettergame.json+deflate.v1';
+
+const supportsDeflate = () => typeof DecompressionStream !== 'undefined';
+
+// Close code of sockets the server dropped for falling behind (see
+// backend/api/consumers.py): reconnect right away to get a fresh room_update
+const RESYNC_CLOSE_CODE = 4008;
+
+// Close code of sockets of players no longer in the room: do not reconnect
+const MEMBERSHIP_CLOSE_CODE = 4003;
+
+const decodeFrame = (data) => {
+  if (typeof data === 'string') {
+    return Promise.resolve(data);
+  }
+  const stream = new Blob([data]).stream().pipeThrough(new DecompressionStream('deflate'));
+  return new Response(stream).text();
+};
+
 class WebSocketClient {
   constructor() {
     this.ws = null;
@@ -7,6 +63,11 @@ class WebSocketClient {
     this.maxReconnectAttempts = 5;
     this.reconnectDelay = 1000;
     this.listeners = new Map();
+    // Last full room document and its version, used to apply room_patch messages
+    this.roomData = null;
+    this.roomVersion = null;
+    // Frames are decoded in order, even when decompression is asynchronous
+    this.frameQueue = Promise.resolve();
   }
 
   connect(roomId, token) {
@@ -26,24 +87,33 @@ class WebSocketClient {
     this.roomId = roomId;
     this.token = token;
     this.reconnectAttempts = 0;
+    this.roomData = null;
+    this.roomVersion = null;
 
     // Get WebSocket URL from environment variable, default to localhost:8000 for development
     const WS_BASE_URL = process.env.REACT_APP_WS_URL || 'ws://localhost:8000';
     const wsUrl = `${WS_BASE_URL}/ws/room/${roomId}/?token=${token}`;
-    this.ws = new WebSocket(wsUrl);
+    this.ws = supportsDeflate() ? new WebSocket(wsUrl, [JSON_DEFLATE_SUBPROTOCOL]) : new WebSocket(wsUrl);
+    this.ws.binaryType = 'arraybuffer';
 
     this.ws.onopen = () => {
       this.reconnectAttempts = 0;
       this.emit('open', { roomId });
     };
 
+    const ws = this.ws;
     this.ws.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.emit('message', data);
-      } catch (error) {
-        // Ignore parse errors
-      }
+      this.frameQueue = this.frameQueue
+        .then(() => decodeFrame(event.data))
+        .then((text) => {
+          // Drop frames of a socket replaced while they were being decoded
+          if (this.ws === ws) {
+            this.handleMessage(text);
+          }
+        })
+        .catch(() => {
+          // Ignore undecodable frames
+        });
     };
 
     this.ws.onerror = (error) => {
@@ -54,11 +124,66 @@ class WebSocketClient {
       this.emit('close', { roomId, code: event.code, reason: event.reason });
       
       if (this.roomId === roomId) {
+        if (event.code === RESYNC_CLOSE_CODE) {
+          this.connect(roomId, this.token);
+          return;
+        }
+        if (event.code === MEMBERSHIP_CLOSE_CODE) {
+          return;
+        }
         this.attemptReconnect();
       }
     };
   }
 
+  handleMessage(text) {
+    try {
+      const data = JSON.parse(text);
+      if (data.type === 'room_update' || data.type === 'room_patch') {
+        // The server holds further room frames until the previous ones are acked
+        this.send({ type: 'ack', version: data.version });
+      }
+      if (data.type === 'room_patch') {
+        // Listeners only ever see full room_update messages
+        const roomUpdate = this.applyRoomPatch(data);
+        if (roomUpdate) {
+          this.emit('message', roomUpdate);
+        }
+        return;
+      }
+      if (data.type === 'room_update') {
+        // A broadcast overtaken by a newer one must not roll the room back
+        if (this.roomVersion !== null && data.version != null && data.version < this.roomVersion) {
+          return;
+        }
+        this.roomData = data.data;
+        this.roomVersion = data.version ?? null;
+      }
+      this.emit('message', data);
+    } catch (error) {
+      // Ignore parse errors
+    }
+  }
+
+  applyRoomPatch(patch) {
+    // Missed a version (or no full document yet): ask the server for a full room_update
+    if (!this.roomData || this.roomVersion === null || this.roomVersion !== patch.base_version) {
+      this.send({ type: 'resync' });
+      return null;
+    }
+    try {
+      const roomCopy = JSON.parse(JSON.stringify(this.roomData));
+      this.roomData = applyJsonPatch(roomCopy, patch.ops);
+      this.roomVersion = patch.version;
+    } catch (error) {
+      this.roomData = null;
+      this.roomVersion = null;
+      this.send({ type: 'resync' });
+      return null;
+    }
+    return { type: 'room_update', data: this.roomData, version: this.roomVersion };
+  }
+
   attemptReconnect() {
     if (this.reconnectAttempts < this.maxReconnectAttempts && this.roomId && this.token) {
       this.reconnectAttempts++;
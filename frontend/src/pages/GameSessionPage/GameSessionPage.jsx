@@ -3,7 +3,7 @@ import { useNavigate, useParams } from 'react-router-dom';
 import { useAuth } from '../../contexts/AuthContext';
 import { useNotification } from '../../contexts/NotificationContext';
 import { useLanguage } from '../../contexts/LanguageContext';
-import { useRoom, useGameSession, useMutationSubmitAnswer, usePlayerScores, useMutationAdvanceRound, useMutationEndGameSession, useGameTimer, useAnswerForm, useRoundManagement, useGameState } from '../../features/hooks/index.hooks';
+import { useRoom, useGameSession, useMutationSubmitAnswer, useMutationSaveAnswerDraft, usePlayerScores, useSetRoundResults, useMutationAdvanceRound, useMutationEndGameSession, useGameTimer, useAnswerForm, useRoundManagement, useGameState } from '../../features/hooks/index.hooks';
 import { wsClient } from '../../lib/websocket';
 import Button from '../../components/UI/Button/Button';
 import Text from '../../components/UI/Text/Text';
@@ -14,6 +14,11 @@ import PlayerList from '../../components/UI/PlayerList/PlayerList';
 import GameCompleted from '../../components/UI/GameCompleted/GameCompleted';
 import styles from './GameSessionPage.module.css';
 
+// How long an auto-submitted draft waits for draft_saved before the answers
+// are submitted over REST instead; well within the server's grace period
+// (ROUND_EXPIRY_GRACE_SECONDS) so the fallback still reaches an open round
+const DRAFT_ACK_TIMEOUT_MS = 1000;
+
 export default function GameSessionPage() {
   const navigate = useNavigate();
   const { user, isAuthenticated } = useAuth();
@@ -21,6 +26,7 @@ export default function GameSessionPage() {
   const { t } = useLanguage();
   const { roomId } = useParams();
   const lastWebSocketUpdateRef = useRef(null);
+  const autoSubmitDraftIdRef = useRef(0);
 
   // Use game state reducer
   const { state, actions } = useGameState();
@@ -38,10 +44,12 @@ export default function GameSessionPage() {
   } = state;
 
   const submitAnswerMutation = useMutationSubmitAnswer();
+  const saveAnswerDraftMutation = useMutationSaveAnswerDraft();
   const advanceRoundMutation = useMutationAdvanceRound();
   const endGameSessionMutation = useMutationEndGameSession();
   // Always include totals to show round/total format
   const { data: playerScoresData, refetch: refetchScores } = usePlayerScores(roomId, true);
+  const setRoundResults = useSetRoundResults(roomId, true);
 
   const { data: existingRoomData, isLoading: isLoadingRoom, error: roomError } = useRoom(roomId);
   const { data: gameSessionData, isLoading: isLoadingGameSession, refetch: refetchGameSession } = useGameSession(roomId);
@@ -90,19 +98,12 @@ export default function GameSessionPage() {
             ? currentScoresResponse 
             : (currentScoresResponse.round_scores || []);
           
-          const roundAdvanced = handleRoundAdvancement(oldRound, newRound, currentPlayerScores);
-          
-          if (!roundAdvanced) {
-            // Round didn't advance, refetch scores normally
-            refetchScores();
-          }
+          // Scores arrive with round_results; a new round starts with a fresh fetch
+          handleRoundAdvancement(oldRound, newRound, currentPlayerScores);
           
           // Update game session
           actions.updateGameSession(newGameSession);
         }
-      } else {
-        // No game session in update, refetch scores normally
-        refetchScores();
       }
     } else if (data.type === 'game_started_notification') {
       // Mark that we received a WebSocket update
@@ -129,9 +130,18 @@ export default function GameSessionPage() {
       actions.addSubmittedPlayer(data.player_username);
       // Show results when all players submit
       if (data.all_players_submitted) {
+        // The scored round arrives as a round_results message
         actions.setShowResults(true);
+      } else {
+        refetchScores();
       }
-      refetchScores();
+    } else if (data.type === 'round_closed_notification') {
+      // The server closed the round when the timer ran out and scored everyone's answers
+      actions.setIsSubmitted(true);
+      actions.setShowResults(true);
+    } else if (data.type === 'round_results') {
+      // Points of the finished round (and running totals), computed once by the server
+      setRoundResults(data);
     } else if (data.type === 'room_deleted_notification') {
       showError(t('game.roomNotFound'));
       wsClient.disconnect();
@@ -139,7 +149,7 @@ export default function GameSessionPage() {
       localStorage.removeItem('room_type');
       navigate('/');
     }
-  }, [navigate, roomId, refetchGameSession, refetchScores, handleRoundAdvancement, playerScoresData, actions, isGameCompleted, previousGameSessionId, gameSession, showError, t]);
+  }, [navigate, roomId, refetchGameSession, refetchScores, setRoundResults, handleRoundAdvancement, playerScoresData, actions, isGameCompleted, previousGameSessionId, gameSession, showError, t]);
 
   useEffect(() => {
     wsClient.on('message', handleWebSocketMessage);
@@ -354,7 +364,21 @@ export default function GameSessionPage() {
     }
   }, [gameSession?.is_completed, refetchScores]);
 
-  // Auto-submit function - submits answers when timer reaches 0
+  // Stream in-progress answers to the server as drafts over the room socket
+  // (debounced), so the server can score them if the timer runs out
+  useEffect(() => {
+    if (!gameSession?.letter || gameSession.is_completed || isSubmitted || Object.keys(answers).length === 0) {
+      return undefined;
+    }
+    const timeoutId = setTimeout(() => {
+      wsClient.send({ type: 'draft_answers', answers });
+    }, 500);
+    return () => clearTimeout(timeoutId);
+  }, [answers, gameSession?.letter, gameSession?.is_completed, isSubmitted]);
+
+  // Auto-submit function - when the timer reaches 0, saves the answers as a draft.
+  // The server closes the round itself and scores the drafts of players who did
+  // not submit, so players don't all POST a full submit in the same second.
   const handleAutoSubmit = useCallback(() => {
     if (!roomId || !gameSession || isSubmitted) {
       return;
@@ -366,24 +390,53 @@ export default function GameSessionPage() {
       answersToSubmit[type] = answers[type] || '';
     });
 
-    submitAnswerMutation.mutate(
-      { roomId, data: { answers: answersToSubmit } },
-      {
-        onSuccess: () => {
-          actions.setIsSubmitted(true);
-          refetchScores();
-          // Show notification that auto-submit happened
-          showWarning(t('game.timeUpAutoSubmitted'));
-        },
-        onError: (error) => {
-          const errorMessage = error.response?.data?.error || 
-                             error.response?.data?.detail ||
-                             t('game.failedToAutoSubmit');
-          showError(errorMessage);
+    const markAutoSubmitted = () => {
+      actions.setIsSubmitted(true);
+      // Show notification that auto-submit happened
+      showWarning(t('game.timeUpAutoSubmitted'));
+    };
+    const showAutoSubmitError = (error) => {
+      const errorMessage = error.response?.data?.error || 
+                         error.response?.data?.detail ||
+                         t('game.failedToAutoSubmit');
+      showError(errorMessage);
+    };
+
+    // Connected: the draft goes over the socket, no HTTP request needed. It only
+    // counts once the server acknowledges it; on draft_error, or no reply in
+    // time (dropped socket, rate limit), the answers are submitted over REST
+    if (wsClient.isConnected()) {
+      const draftId = ++autoSubmitDraftIdRef.current;
+      let timeoutId = null;
+      const handleDraftReply = (data) => {
+        if ((data.type !== 'draft_saved' && data.type !== 'draft_error') || data.id !== draftId) {
+          return;
         }
-      }
+        settle(data.type === 'draft_saved');
+      };
+      const settle = (saved) => {
+        clearTimeout(timeoutId);
+        wsClient.off('message', handleDraftReply);
+        if (saved) {
+          markAutoSubmitted();
+          return;
+        }
+        submitAnswerMutation.mutate(
+          { roomId, data: { answers: answersToSubmit } },
+          { onSuccess: markAutoSubmitted, onError: showAutoSubmitError }
+        );
+      };
+      wsClient.on('message', handleDraftReply);
+      timeoutId = setTimeout(() => settle(false), DRAFT_ACK_TIMEOUT_MS);
+      wsClient.send({ type: 'draft_answers', id: draftId, answers: answersToSubmit });
+      return;
+    }
+
+    saveAnswerDraftMutation.mutate(
+      { roomId, data: { answers: answersToSubmit } },
+      { onSuccess: markAutoSubmitted, onError: showAutoSubmitError }
     );
-  }, [roomId, gameSession, isSubmitted, answers, submitAnswerMutation, refetchScores, showWarning, showError, t]);
+  }, [roomId, gameSession, isSubmitted, answers, submitAnswerMutation, saveAnswerDraftMutation, actions, showWarning, showError, t]);
 
   // Use game timer hook to manage timer logic and auto-submit
   const remainingSeconds = useGameTimer(gameSession, isSubmitted, handleAutoSubmit);